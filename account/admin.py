@@ -3,6 +3,8 @@ from django.contrib import admin
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
+from utility.admin import ScalableModelAdmin
+
 from .models import *
 
 # class AccountAdminConfig():
@@ -18,7 +20,20 @@ from .models import *
 #         ('Permissions', {'fields': ('is_staff', 'is_active')}),
 #     )
     
-admin.site.register(Account)
+@admin.register(Account)
+class AccountAdmin(admin.ModelAdmin):
+    list_display = ('email', 'first_name', 'last_name', 'faculty_id', 'college', 'department', 'is_staff', 'is_active')
+    list_select_related = ('college', 'department')
+    list_filter = ('is_staff', 'is_active', 'college')
+    search_fields = ('^email', '=faculty_id', '^last_name')
+    ordering = ('-date_added',)
+    autocomplete_fields = ('currentrank',)
+
+    def formfield_for_manytomany(self, db_field, request, **kwargs):
+        # Permission.__str__ reads its content type.
+        if db_field.name == 'user_permissions':
+            kwargs['queryset'] = db_field.remote_field.model.objects.select_related('content_type')
+        return super().formfield_for_manytomany(db_field, request, **kwargs)
 
 admin.site.register(Department)
 admin.site.register(College)
@@ -30,5 +45,13 @@ admin.site.register(SalaryGrade)
 admin.site.register(FacultyRank)
 admin.site.register(EmploymentStatus)
 admin.site.register(HiringNature)
-admin.site.register(FacultyRankHistory)
+
+@admin.register(FacultyRankHistory)
+class FacultyRankHistoryAdmin(ScalableModelAdmin):
+    list_display = ('accountrankhistory_id', 'user', 'currentrank', 'targetrank', 'date_of_request', 'is_successful', 'date_of_promotion', 'is_active')
+    list_select_related = ('user', 'currentrank', 'targetrank')
+    list_filter = ('is_successful', 'is_active')
+    search_fields = ('^user__email', '=user__faculty_id')
+    autocomplete_fields = ('user',)
+
 # END: 6hj8d9f3k4s2
@@ -0,0 +1,83 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.cache import caches
+
+from utility.versioning import bump_version, get_version
+
+
+# Version of the lookup tables a cached identity joins (colleges, departments,
+# ranks, statuses); bumping it drops every cached identity at once.
+IDENTITY = 'identity'
+
+IDENTITY_RELATED = (
+    'college', 'department',
+    'currentrank__currentrank__rank', 'currentrank__currentrank__subrank', 'currentrank__currentrank__salarygrade',
+    'currentrank__targetrank__rank', 'currentrank__targetrank__subrank', 'currentrank__targetrank__salarygrade',
+    'currentrank__currentstatus', 'currentrank__currentnature',
+    'currentrank__targetstatus', 'currentrank__targetnature',
+)
+
+
+def _cache():
+    return caches[getattr(settings, 'IDENTITY_CACHE_ALIAS', 'default')]
+
+
+def _key(account_id):
+    return 'identity:%s' % account_id
+
+
+def load_identity(account_id):
+    """
+    Loads an account together with its college, department and current rank
+    request down to the rank and salary grade, in one query.
+    """
+    return get_user_model()._default_manager.select_related(*IDENTITY_RELATED).get(pk=account_id)
+
+
+def invalidate(*account_ids):
+    """
+    Drops the cached identities of the given accounts.
+    """
+    account_ids = [account_id for account_id in account_ids if account_id is not None]
+    if account_ids:
+        _cache().delete_many([_key(account_id) for account_id in account_ids])
+
+
+def invalidate_all():
+    bump_version(IDENTITY)
+
+
+class IdentityBackend(ModelBackend):
+    """
+    ModelBackend, except that the user of a request is loaded with
+    load_identity and kept in the cache for IDENTITY_CACHE_TIMEOUT seconds,
+    so a request costs no query for request.user or the relations pages
+    read from it. Entries are per account and shared by its sessions; the
+    account's signals drop them when it changes (see account.signals).
+
+    Django still compares the session's password hash with the cached
+    user's on every request, so a password change logs other sessions out
+    as soon as the entry is dropped.
+    """
+
+    def get_user(self, user_id):
+        timeout = getattr(settings, 'IDENTITY_CACHE_TIMEOUT', 60)
+        if not timeout:
+            return self._load(user_id)
+        cache = _cache()
+        version = get_version(IDENTITY)
+        cached = cache.get(_key(user_id))
+        if cached is not None and cached[0] == version:
+            return cached[1] if self.user_can_authenticate(cached[1]) else None
+        user = self._load(user_id)
+        if user is not None:
+            cache.set(_key(user_id), (version, user), timeout)
+        return user
+
+    def _load(self, user_id):
+        try:
+            user = load_identity(user_id)
+        except get_user_model().DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
@@ -0,0 +1,109 @@
+from collections import namedtuple
+
+from django.contrib.auth import get_user_model
+from django.db import connections, transaction
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.dispatch import Signal
+from django.utils import timezone
+
+from .models import FacultyRankHistory
+
+
+EffectiveRank = namedtuple('EffectiveRank', [
+    'account_id', 'history_id', 'facultyrank_id', 'hiringnature_id', 'empstatus_id', 'effective_date',
+])
+
+# Sent once the transaction that rebuilt Account.currentrank commits, with the
+# ids of the accounts whose pointer changed.
+currentrank_changed = Signal()
+
+_FIELDS = (
+    'user_id', 'pk', 'effective_date', 'is_successful',
+    'currentrank_id', 'currentnature_id', 'currentstatus_id',
+    'targetrank_id', 'targetnature_id', 'targetstatus_id',
+)
+
+
+def effective_date():
+    """
+    The date a history row takes effect: its promotion, or its request while
+    it is still pending. Matches the rankhistory_user_effective_idx index.
+    """
+    return Coalesce('date_of_promotion', 'date_of_request')
+
+
+def _history(at, account_ids):
+    histories = FacultyRankHistory.objects.filter(is_active=True).annotate(effective_date=effective_date())
+    histories = histories.filter(effective_date__lte=at)
+    if account_ids is not None:
+        histories = histories.filter(user_id__in=account_ids)
+    return histories
+
+
+def latest_history(at=None, account_ids=None):
+    """
+    Returns a values_list queryset with the latest active history row of
+    every account (or of the given accounts) as of the given datetime.
+    PostgreSQL picks the rows with DISTINCT ON in a single pass over the
+    index; other backends use a correlated subquery per account.
+    """
+    at = at or timezone.now()
+    histories = _history(at, account_ids)
+    if connections[histories.db].vendor == 'postgresql':
+        latest = histories.order_by('user_id', '-effective_date', '-pk').distinct('user_id')
+    else:
+        newest = _history(at, None).filter(user_id=OuterRef('user_id')).order_by('-effective_date', '-pk')
+        latest = histories.filter(pk=Subquery(newest.values('pk')[:1])).order_by('user_id')
+    return latest.values_list(*_FIELDS)
+
+
+def _effective(row):
+    (account_id, history_id, date, is_successful,
+     currentrank_id, currentnature_id, currentstatus_id,
+     targetrank_id, targetnature_id, targetstatus_id) = row
+    # A successful request means the faculty member now holds the target.
+    if is_successful:
+        return EffectiveRank(account_id, history_id, targetrank_id, targetnature_id, targetstatus_id, date)
+    return EffectiveRank(account_id, history_id, currentrank_id, currentnature_id, currentstatus_id, date)
+
+
+def effective_ranks(at=None, account_ids=None, chunk_size=2000):
+    """
+    Returns {account_id: EffectiveRank} for every account with rank history,
+    as of the given datetime (now by default).
+    """
+    rows = latest_history(at=at, account_ids=account_ids).iterator(chunk_size=chunk_size)
+    return {row[0]: _effective(row) for row in rows}
+
+
+def effective_rank(account, at=None):
+    """
+    Returns the EffectiveRank of a single account as of the given datetime,
+    or None when it has no rank history by then.
+    """
+    account_id = getattr(account, 'pk', account)
+    return effective_ranks(at=at, account_ids=[account_id]).get(account_id)
+
+
+def rebuild_current_ranks(batch_size=1000, dry_run=False):
+    """
+    Points Account.currentrank of every account at its latest history row as
+    of now, and clears it for accounts without history. Returns the ids of the
+    accounts whose pointer changed.
+    """
+    Account = get_user_model()
+    latest = {account_id: rank.history_id for account_id, rank in effective_ranks().items()}
+    changed = [
+        Account(pk=account_id, currentrank_id=latest.get(account_id))
+        for account_id, currentrank_id in Account.objects.values_list('pk', 'currentrank_id').iterator(chunk_size=batch_size)
+        if latest.get(account_id) != currentrank_id
+    ]
+    account_ids = [account.pk for account in changed]
+    if dry_run or not changed:
+        return account_ids
+
+    with transaction.atomic():
+        Account.objects.bulk_update(changed, ['currentrank'], batch_size=batch_size)
+        transaction.on_commit(lambda: currentrank_changed.send(sender=Account, account_ids=account_ids))
+    return account_ids
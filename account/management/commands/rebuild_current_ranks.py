@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from account.history import rebuild_current_ranks
+
+
+class Command(BaseCommand):
+    help = 'Points every account\'s currentrank at its latest active rank history.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many accounts have drifted.')
+
+    def handle(self, *args, **options):
+        account_ids = rebuild_current_ranks(batch_size=options['batch_size'], dry_run=options['dry_run'])
+        if options['dry_run']:
+            self.stdout.write('%d account(s) would be updated.' % len(account_ids))
+        else:
+            self.stdout.write(self.style.SUCCESS('Updated %d account(s).' % len(account_ids)))
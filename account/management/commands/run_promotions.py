@@ -0,0 +1,74 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from account.promotion import ACTIONS, Change, run_promotions
+
+
+class Command(BaseCommand):
+    help = 'Promotes every faculty member to the rank their points earn, one college per worker process.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--at', help='ISO datetime the cycle ends at and promotions take effect. Defaults to now.')
+        parser.add_argument('--workers', type=int, help='Worker processes. Defaults to the number of CPUs.')
+        parser.add_argument('--dry-run', action='store_true', help='Report the changes without writing anything.')
+        parser.add_argument('--diff', help='CSV file the changes are appended to. Dry runs default to stdout.')
+        parser.add_argument('--checkpoint', default='promotion-run.checkpoint.json',
+                            help='Checkpoint file a crashed run resumes from.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        at = None
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError('--at must be an ISO datetime.')
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+        checkpoint = options['checkpoint']
+        if options['restart'] and os.path.exists(checkpoint):
+            os.remove(checkpoint)
+
+        diff = None
+        if options['diff']:
+            exists = os.path.exists(options['diff']) and os.path.getsize(options['diff']) > 0
+            diff = open(options['diff'], 'a', newline='')
+        elif options['dry_run']:
+            exists = False
+            diff = self.stdout
+        writer = csv.writer(diff) if diff is not None else None
+        if writer is not None and not exists:
+            writer.writerow(Change._fields)
+
+        def on_partition(result):
+            if writer is not None:
+                writer.writerows(result.changes)
+            if options['verbosity'] > 1:
+                self.stderr.write('College %s: %s in %.1fs' % (result.college_id, result.counts, result.seconds))
+
+        try:
+            result = run_promotions(
+                at=at,
+                workers=options['workers'],
+                dry_run=options['dry_run'],
+                checkpoint=checkpoint,
+                batch_size=options['batch_size'],
+                on_partition=on_partition,
+            )
+        except ValueError as error:
+            raise CommandError(error)
+        finally:
+            if options['diff']:
+                diff.close()
+
+        if result.resumed:
+            self.stderr.write('Resumed after %d colleges.' % result.resumed)
+        counts = ', '.join('%d %s' % (result.counts.get(action, 0), action) for action in ACTIONS)
+        message = '%s as of %s: %s, %d colleges in %.1fs.' % (
+            'Dry run' if options['dry_run'] else 'Promotions', result.at.isoformat(), counts, result.partitions, result.seconds,
+        )
+        (self.stderr if diff is self.stdout else self.stdout).write(self.style.SUCCESS(message))
@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models.functions import Coalesce, Upper
 from django.contrib.auth.models import AbstractBaseUser, PermissionsMixin
 from django.utils import timezone
 
@@ -267,6 +268,17 @@ class FacultyRankHistory(models.Model):
     date_of_promotion = models.DateTimeField(blank=True, null=True)
     
     is_active = models.BooleanField(default=True)
+    
+    class Meta:
+        indexes = [
+            # Latest rank of each account, see account.history
+            models.Index(
+                'user', Coalesce('date_of_promotion', 'date_of_request').desc(),
+                condition=models.Q(is_active=True), name='rankhistory_user_effective_idx',
+            ),
+            models.Index(fields=['user', 'date_of_promotion'], name='rankhistory_user_promotion_idx'),
+            models.Index(fields=['user', 'date_of_request'], name='rankhistory_user_request_idx'),
+        ]
 
 
 class Account(AbstractBaseUser, PermissionsMixin):
@@ -321,6 +333,14 @@ class Account(AbstractBaseUser, PermissionsMixin):
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['first_name', 'last_name']
     
+    class Meta:
+        # Case-insensitive lookups (admin search, imports) compare UPPER(column)
+        indexes = [
+            models.Index(Upper('email'), name='account_email_upper_idx'),
+            models.Index(Upper('faculty_id'), name='account_facultyid_upper_idx'),
+            models.Index(Upper('last_name'), name='account_lastname_upper_idx'),
+        ]
+    
     def __str__(self) -> str:   
         return f'{self.first_name} {self.last_name}'
     
@@ -0,0 +1,238 @@
+import json
+import multiprocessing
+import os
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.contrib.auth import get_user_model
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Sum
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from evaluation.models import EvaluationRollup
+from utility.worker import setup_process
+
+from .history import currentrank_changed, effective_ranks
+from .models import FacultyRank, FacultyRankHistory
+from .ranking import build_rank_index
+
+
+# What a promotion run does to a faculty member.
+PROMOTE = 'promote'      # earned a band above the rank they hold
+ASSIGN = 'assign'        # holds no rank yet and earned one
+UNCHANGED = 'unchanged'  # earned the band of the rank they hold
+BELOW = 'below'          # earned a band below the rank they hold; runs never demote
+UNRATED = 'unrated'      # their points fall in no band
+
+ACTIONS = (PROMOTE, ASSIGN, UNCHANGED, BELOW, UNRATED)
+WRITES = (PROMOTE, ASSIGN)
+
+Change = namedtuple('Change', [
+    'account_id', 'email', 'college_id', 'points', 'current_rank', 'earned_rank', 'action',
+])
+PartitionResult = namedtuple('PartitionResult', ['college_id', 'counts', 'changes', 'seconds'])
+RunResult = namedtuple('RunResult', ['at', 'partitions', 'resumed', 'counts', 'seconds'])
+
+
+def roster():
+    """
+    Returns the accounts promotion runs consider: active faculty, that is
+    accounts with a faculty_id. Staff accounts without one hold no rank.
+    """
+    return get_user_model().objects.filter(is_active=True).exclude(faculty_id='')
+
+
+def _partition_key(college_id):
+    return 'none' if college_id is None else str(college_id)
+
+
+def plan_college(college_id, at, index=None):
+    """
+    Works out what a promotion run as of the given datetime does to every
+    member of the roster in a college (None for those without one).
+    Returns a list of (Change, EffectiveRank or None, RankBand or None),
+    with one query for the roster, one for the totals and one for the
+    current ranks.
+    """
+    index = index or build_rank_index()
+    accounts = dict(roster().filter(college_id=college_id).values_list('pk', 'email'))
+    if not accounts:
+        return []
+    points = dict(
+        EvaluationRollup.objects.filter(account__in=roster().filter(college_id=college_id))
+        .values('account_id').annotate(total=Sum('points')).order_by()
+        .values_list('account_id', 'total')
+    )
+    current = effective_ranks(at=at, account_ids=list(accounts))
+    ranks = {rank.pk: rank for rank in FacultyRank.objects.select_related('rank', 'subrank')}
+
+    plan = []
+    for account_id in sorted(accounts):
+        total = points.get(account_id) or 0
+        band = index.resolve(total)
+        held = current.get(account_id)
+        held_rank = ranks.get(held.facultyrank_id) if held and held.facultyrank_id else None
+        if band is None:
+            action = UNRATED
+        elif held_rank is None:
+            action = ASSIGN
+        elif band.facultyrank.pk == held_rank.pk:
+            action = UNCHANGED
+        elif band.minpoints > held_rank.minpoints:
+            action = PROMOTE
+        else:
+            action = BELOW
+        change = Change(
+            account_id, accounts[account_id], college_id, total,
+            str(held_rank) if held_rank else None, str(band.facultyrank) if band else None, action,
+        )
+        plan.append((change, held, band))
+    return plan
+
+
+def promote_college(college_id, at, dry_run=False, batch_size=1000):
+    """
+    Runs the promotions of one college as of the given datetime: writes a
+    successful FacultyRankHistory row for every faculty member who earned a
+    higher rank (or their first one) and points their currentrank at it,
+    in one transaction with bulk writes. Re-running a college finds those
+    faculty already holding their earned rank, so it writes nothing twice.
+    Returns a PartitionResult with every change but the unchanged ones.
+    """
+    started = time.perf_counter()
+    plan = plan_college(college_id, at)
+    counts = Counter(change.action for change, held, band in plan)
+    writes = [(change, held, band) for change, held, band in plan if change.action in WRITES]
+
+    if writes and not dry_run:
+        User = get_user_model()
+        with transaction.atomic():
+            histories = FacultyRankHistory.objects.bulk_create([
+                FacultyRankHistory(
+                    user_id=change.account_id,
+                    currentrank_id=held.facultyrank_id if held else None,
+                    currentnature_id=held.hiringnature_id if held else None,
+                    currentstatus_id=held.empstatus_id if held else None,
+                    targetrank=band.facultyrank,
+                    targetnature_id=held.hiringnature_id if held else None,
+                    targetstatus_id=held.empstatus_id if held else None,
+                    date_of_request=at,
+                    date_of_promotion=at,
+                    is_successful=True,
+                )
+                for change, held, band in writes
+            ], batch_size=batch_size)
+            if histories and histories[0].pk is None:
+                # Backends that cannot return ids from bulk inserts.
+                latest = dict(
+                    FacultyRankHistory.objects.filter(
+                        user_id__in=[history.user_id for history in histories], date_of_promotion=at, is_successful=True,
+                    ).values_list('user_id', 'pk')
+                )
+                for history in histories:
+                    history.pk = latest.get(history.user_id)
+            User.objects.bulk_update(
+                [User(pk=history.user_id, currentrank_id=history.pk) for history in histories], ['currentrank'],
+                batch_size=batch_size,
+            )
+            account_ids = [history.user_id for history in histories]
+            transaction.on_commit(lambda: currentrank_changed.send(sender=User, account_ids=account_ids))
+
+    changes = [change for change, held, band in plan if change.action != UNCHANGED]
+    return PartitionResult(college_id, dict(counts), changes, time.perf_counter() - started)
+
+
+def _promote_partition(college_id, at, dry_run, batch_size):
+    # Runs in a pool process; its connections are its own.
+    close_old_connections()
+    try:
+        return promote_college(college_id, parse_datetime(at), dry_run=dry_run, batch_size=batch_size)
+    finally:
+        close_old_connections()
+
+
+def load_checkpoint(checkpoint):
+    if not checkpoint or not os.path.exists(checkpoint):
+        return None
+    with open(checkpoint) as source:
+        return json.load(source)
+
+
+def save_checkpoint(checkpoint, state):
+    temporary = checkpoint + '.tmp'
+    with open(temporary, 'w') as target:
+        json.dump(state, target)
+    os.replace(temporary, checkpoint)
+
+
+def college_ids():
+    """
+    Returns the partitions of the roster: every college with faculty on it,
+    and None when some have no college.
+    """
+    return sorted(
+        set(roster().values_list('college_id', flat=True).distinct()),
+        key=lambda college_id: (college_id is None, college_id),
+    )
+
+
+def run_promotions(at=None, workers=None, dry_run=False, checkpoint=None, batch_size=1000, on_partition=None):
+    """
+    Runs the end-of-cycle promotions of the whole roster as of the given
+    datetime (now by default), one college per task in a pool of worker
+    processes. Calls on_partition(PartitionResult) as each college finishes.
+
+    Unless dry_run, the colleges done are saved to the checkpoint file as
+    they finish, along with the run's datetime; a run started with the same
+    checkpoint skips them and reuses that datetime, so a crashed run
+    resumes where it stopped. The checkpoint is removed once every college
+    is done. SQLite allows one writer at a time, so
+    there the colleges run one after the other in this process.
+    """
+    started = time.perf_counter()
+    state = load_checkpoint(checkpoint) if not dry_run else None
+    if state is not None:
+        saved_at = parse_datetime(state['at'])
+        if at is not None and at != saved_at:
+            raise ValueError('the checkpoint is of a run as of %s; restart it to run as of %s' % (state['at'], at.isoformat()))
+        at = saved_at
+    else:
+        at = at or timezone.now()
+        state = {'at': at.isoformat(), 'done': {}}
+
+    counts = Counter()
+    for done in state['done'].values():
+        counts.update(done)
+    pending = [college_id for college_id in college_ids() if _partition_key(college_id) not in state['done']]
+    resumed = len(state['done'])
+
+    def finished(result):
+        counts.update(result.counts)
+        if checkpoint and not dry_run:
+            state['done'][_partition_key(result.college_id)] = result.counts
+            save_checkpoint(checkpoint, state)
+        if on_partition is not None:
+            on_partition(result)
+
+    if connection.vendor == 'sqlite' or workers == 1 or len(pending) < 2:
+        for college_id in pending:
+            finished(promote_college(college_id, at, dry_run=dry_run, batch_size=batch_size))
+    else:
+        # Spawned rather than forked, so children never inherit this
+        # process's open database connections.
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context('spawn'), initializer=setup_process,
+        ) as pool:
+            futures = [
+                pool.submit(_promote_partition, college_id, at.isoformat(), dry_run, batch_size)
+                for college_id in pending
+            ]
+            for future in as_completed(futures):
+                finished(future.result())
+
+    # A finished run leaves nothing to resume; the next cycle starts afresh.
+    if checkpoint and not dry_run and os.path.exists(checkpoint):
+        os.remove(checkpoint)
+    return RunResult(at, len(pending), resumed, dict(counts), time.perf_counter() - started)
@@ -0,0 +1,117 @@
+from bisect import bisect_right
+from collections import namedtuple
+
+from utility.versioning import Versioned
+
+from .models import FacultyRank
+
+
+RankBand = namedtuple('RankBand', ['minpoints', 'maxpoints', 'facultyrank', 'salarygrade'])
+
+
+class RankBandError(ValueError):
+    pass
+
+
+class RankIndex:
+    """
+    A sorted interval index over the FacultyRank point bands.
+
+    Bands hold whole points, so a band covers every score from its minpoints up
+    to (but excluding) maxpoints + 1. Resolving a score is a bisect over the
+    band starts, which makes mapping a whole roster O(n log k) for k bands.
+
+    Attributes:
+        version (int): The version of the rank tables the index was built from.
+        bands (tuple): The RankBand of every active faculty rank, by minpoints.
+        issues (list): A description of every overlap or gap between bands.
+    """
+
+    def __init__(self, bands, version=None, strict=False):
+        self.version = version
+        self.bands = tuple(sorted(bands, key=lambda band: (band.minpoints, band.maxpoints)))
+        self._starts = [band.minpoints for band in self.bands]
+        self.issues = self._check()
+        if strict and self.issues:
+            raise RankBandError('; '.join(self.issues))
+
+    def _check(self):
+        issues = []
+        for band in self.bands:
+            if band.maxpoints < band.minpoints:
+                issues.append('%s has maxpoints %s below minpoints %s' % (band.facultyrank, band.maxpoints, band.minpoints))
+        for previous, band in zip(self.bands, self.bands[1:]):
+            if band.minpoints <= previous.maxpoints:
+                issues.append('%s (%s-%s) overlaps %s (%s-%s)' % (
+                    band.facultyrank, band.minpoints, band.maxpoints,
+                    previous.facultyrank, previous.minpoints, previous.maxpoints,
+                ))
+            elif band.minpoints > previous.maxpoints + 1:
+                issues.append('gap between %s (ends %s) and %s (starts %s)' % (
+                    previous.facultyrank, previous.maxpoints, band.facultyrank, band.minpoints,
+                ))
+        return issues
+
+    def resolve(self, points):
+        """
+        Returns the RankBand the given points fall in, or None when they are
+        below the lowest band, above the highest band or inside a gap.
+        """
+        if points is None:
+            return None
+        i = bisect_right(self._starts, points) - 1
+        if i < 0:
+            return None
+        band = self.bands[i]
+        if points < band.maxpoints + 1:
+            return band
+        return None
+
+    def resolve_many(self, scores):
+        """
+        Resolves many scores at once. Given a mapping (e.g. account id to
+        points) a mapping to RankBand is returned, otherwise a list in the
+        order of the scores.
+        """
+        resolve = self.resolve
+        if hasattr(scores, 'items'):
+            return {key: resolve(points) for key, points in scores.items()}
+        return [resolve(points) for points in scores]
+
+    def next_band(self, band):
+        """
+        Returns the band after the given one, or None for the highest band.
+        """
+        i = self.bands.index(band) + 1
+        return self.bands[i] if i < len(self.bands) else None
+
+
+def build_rank_index(version=None, strict=False):
+    """
+    Builds a RankIndex from the active faculty ranks with a single query.
+    """
+    ranks = FacultyRank.objects.filter(is_active=True).select_related('rank', 'subrank', 'salarygrade')
+    bands = [RankBand(rank.minpoints, rank.maxpoints, rank, rank.salarygrade) for rank in ranks]
+    return RankIndex(bands, version=version, strict=strict)
+
+
+_rank_index = Versioned('faculty_rank', build_rank_index)
+
+
+def get_rank_index():
+    """
+    Returns the rank index of this process, rebuilding it when the rank tables changed.
+    """
+    return _rank_index.get()
+
+
+def invalidate_rank_index():
+    _rank_index.invalidate()
+
+
+def resolve_rank(points):
+    """
+    Returns the FacultyRank the given points earn, or None.
+    """
+    band = get_rank_index().resolve(points)
+    return band.facultyrank if band else None
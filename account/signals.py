@@ -0,0 +1,51 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from integration.sync import accounts_synced
+
+from . import backends
+from .history import currentrank_changed
+from .models import *
+from .ranking import invalidate_rank_index
+
+
+def rank_tables_changed(sender, **kwargs):
+    transaction.on_commit(invalidate_rank_index)
+
+
+for model in (FacultyRank, Rank, SubRank, SalaryGrade):
+    post_save.connect(rank_tables_changed, sender=model, dispatch_uid='rank_tables_changed_%s' % model.__name__)
+    post_delete.connect(rank_tables_changed, sender=model, dispatch_uid='rank_tables_deleted_%s' % model.__name__)
+
+
+# Cached identities (see backends.IdentityBackend) hold the account and the
+# rows it joins, so they are dropped whenever any of those change.
+
+def identity_tables_changed(sender, **kwargs):
+    transaction.on_commit(backends.invalidate_all)
+
+
+for model in (College, Department, EmploymentStatus, HiringNature, FacultyRank, Rank, SubRank, SalaryGrade):
+    post_save.connect(identity_tables_changed, sender=model, dispatch_uid='identity_tables_changed_%s' % model.__name__)
+    post_delete.connect(identity_tables_changed, sender=model, dispatch_uid='identity_tables_deleted_%s' % model.__name__)
+
+
+def account_identity_changed(sender, instance, **kwargs):
+    transaction.on_commit(lambda: backends.invalidate(instance.pk))
+
+
+def rank_history_identity_changed(sender, instance, **kwargs):
+    account_ids = list(Account.objects.filter(currentrank_id=instance.pk).values_list('pk', flat=True))
+    transaction.on_commit(lambda: backends.invalidate(instance.user_id, *account_ids))
+
+
+def accounts_rebuilt(sender, account_ids, **kwargs):
+    backends.invalidate(*account_ids)
+
+
+post_save.connect(account_identity_changed, sender=Account, dispatch_uid='account_identity_changed')
+post_delete.connect(account_identity_changed, sender=Account, dispatch_uid='account_identity_deleted')
+post_save.connect(rank_history_identity_changed, sender=FacultyRankHistory, dispatch_uid='rank_history_identity_changed')
+post_delete.connect(rank_history_identity_changed, sender=FacultyRankHistory, dispatch_uid='rank_history_identity_deleted')
+currentrank_changed.connect(accounts_rebuilt, dispatch_uid='currentrank_identity_changed')
+accounts_synced.connect(accounts_rebuilt, dispatch_uid='accounts_synced_identity_changed')
@@ -1,3 +1,129 @@
+from decimal import Decimal
+
+from django.contrib import auth
+from django.db import connection
+from django.http import HttpRequest
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+
+from .backends import IdentityBackend
+from .models import Account, College, Department, FacultyRank, FacultyRankHistory, Rank, SalaryGrade
+from .ranking import RankBand, RankBandError, RankIndex, get_rank_index
+
+
+class IdentityBackendTests(TestCase):
+
+    def setUp(self):
+        self.college = College.objects.create(college_name='Engineering', college_abbreviation='CET')
+        self.department = Department.objects.create(department_name='Computer Science', department_abbreviation='CS')
+        self.account = Account.objects.create_user(
+            email='faculty@plm.edu.ph', password='pw', college=self.college, department=self.department,
+        )
+        self.backend = IdentityBackend()
+
+    def _change(self, obj, **fields):
+        with self.captureOnCommitCallbacks(execute=True):
+            for name, value in fields.items():
+                setattr(obj, name, value)
+            obj.save()
+
+    def _rank(self, name):
+        grade = SalaryGrade.objects.create(salarygrade_tier=name, salary_grade_value=0)
+        return FacultyRank.objects.create(
+            rank=Rank.objects.create(rank_name=name), salarygrade=grade, facultyrank_description=name,
+            minpoints=0, maxpoints=10,
+        )
+
+    def test_cache_hit_makes_no_account_query(self):
+        self.backend.get_user(self.account.pk)
+        with CaptureQueriesContext(connection) as queries:
+            user = self.backend.get_user(self.account.pk)
+            self.assertEqual((user.college.college_name, user.department.department_name), ('Engineering', 'Computer Science'))
+        self.assertFalse([query for query in queries if Account._meta.db_table in query['sql']])
+
+    def test_deactivation_drops_identity(self):
+        self.backend.get_user(self.account.pk)
+        self._change(self.account, is_active=False)
+        self.assertIsNone(self.backend.get_user(self.account.pk))
+
+    def test_password_change_logs_out_other_sessions(self):
+        self.client.force_login(self.account)
+        request = HttpRequest()
+        request.session = self.client.session
+        self.assertEqual(auth.get_user(request), self.account)
+
+        self.account.set_password('changed')
+        self._change(self.account)
+        self.assertFalse(auth.get_user(request).is_authenticated)
+
+    def test_related_changes_refresh_identity(self):
+        self.backend.get_user(self.account.pk)
+        self._change(self.college, college_name='Engineering and Technology')
+        self._change(self.department, department_name='Information Technology')
+        user = self.backend.get_user(self.account.pk)
+        self.assertEqual(
+            (user.college.college_name, user.department.department_name), ('Engineering and Technology', 'Information Technology'),
+        )
+
+    def test_rank_history_changes_refresh_identity(self):
+        history = FacultyRankHistory.objects.create(user=self.account, currentrank=self._rank('Instructor'))
+        self._change(self.account, currentrank=history)
+        self.assertEqual(str(self.backend.get_user(self.account.pk).currentrank.currentrank), 'Instructor')
+
+        self._change(history, currentrank=self._rank('Assistant Professor'))
+        self.assertEqual(str(self.backend.get_user(self.account.pk).currentrank.currentrank), 'Assistant Professor')
+
+
+class RankIndexTests(TestCase):
+    instructor = RankBand(0, 9, 'Instructor', None)
+    assistant = RankBand(10, 19, 'Assistant Professor', None)
+    associate = RankBand(25, 39, 'Associate Professor', None)
+
+    def test_overlaps_and_gaps_are_reported(self):
+        self.assertEqual(RankIndex([self.instructor, self.assistant]).issues, [])
+        self.assertEqual(RankIndex([self.associate, self.instructor, self.assistant]).issues, [
+            'gap between Assistant Professor (ends 19) and Associate Professor (starts 25)',
+        ])
+        overlapping = RankBand(5, 12, 'Lecturer', None)
+        self.assertEqual(RankIndex([self.instructor, overlapping]).issues, ['Lecturer (5-12) overlaps Instructor (0-9)'])
+        self.assertEqual(len(RankIndex([RankBand(9, 0, 'Backwards', None)]).issues), 1)
+
+    def test_strict_index_rejects_bad_bands(self):
+        with self.assertRaises(RankBandError):
+            RankIndex([self.assistant, self.associate], strict=True)
+        self.assertEqual(len(RankIndex([self.instructor, self.assistant], strict=True).bands), 2)
+
+    def test_band_boundaries(self):
+        index = RankIndex([self.associate, self.instructor, self.assistant])
+        cases = [
+            (-1, None), (0, self.instructor), (9, self.instructor), (Decimal('9.99'), self.instructor),
+            (10, self.assistant), (19.5, self.assistant), (20, None), (Decimal('24.9'), None),
+            (25, self.associate), (Decimal('39.99'), self.associate), (40, None), (None, None),
+        ]
+        for points, band in cases:
+            self.assertEqual(index.resolve(points), band, points)
+        self.assertEqual(index.next_band(self.assistant), self.associate)
+        self.assertIsNone(index.next_band(self.associate))
+
+    def test_resolve_many(self):
+        index = RankIndex([self.instructor, self.assistant])
+        self.assertEqual(index.resolve_many({1: 3, 2: Decimal('12.5'), 3: 50}), {1: self.instructor, 2: self.assistant, 3: None})
+        self.assertEqual(index.resolve_many([12, 3]), [self.assistant, self.instructor])
+
+    def test_index_is_rebuilt_when_ranks_change(self):
+        grade = SalaryGrade.objects.create(salarygrade_tier='12', salary_grade_value=0)
+        with self.captureOnCommitCallbacks(execute=True):
+            rank = FacultyRank.objects.create(
+                rank=Rank.objects.create(rank_name='Instructor'), salarygrade=grade, facultyrank_description='Instructor',
+                minpoints=0, maxpoints=9,
+            )
+        index = get_rank_index()
+        self.assertEqual([(band.minpoints, band.maxpoints) for band in index.bands], [(0, 9)])
+        self.assertIs(get_rank_index(), index)
 
-# Create your tests here.
+        with self.captureOnCommitCallbacks(execute=True):
+            rank.maxpoints = 14
+            rank.save()
+        rebuilt = get_rank_index()
+        self.assertNotEqual(rebuilt.version, index.version)
+        self.assertEqual(rebuilt.resolve(12).facultyrank, rank)
@@ -0,0 +1,93 @@
+import base64
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor pagination over the primary key: every page is an index range
+    scan from the previous page's last row, however deep the client reads,
+    and rows added while paging never shift later pages the way OFFSET does.
+    """
+    ordering = '-pk'
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class CompositeKeysetPagination(BasePagination):
+    """
+    Keyset pagination over an ordering of several columns ending in a unique
+    one, such as the review queue's (-priority, pk). DRF's cursor pagination
+    keys on the first column only and skips ties with an offset, which grows
+    with the number of rows sharing a priority; here the cursor holds every
+    key of the last row, so the next page is an index range scan however
+    many rows tie.
+
+    Forward only: the response holds the next link and the results.
+    """
+    ordering = ('-pk',)
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    cursor_query_param = 'cursor'
+
+    def _page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def _decode(self, cursor):
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        except (ValueError, UnicodeError):
+            raise NotFound('Invalid cursor.')
+        if not isinstance(values, list) or len(values) != len(self.ordering):
+            raise NotFound('Invalid cursor.')
+        return values
+
+    def _encode(self, values):
+        return base64.urlsafe_b64encode(json.dumps(values, cls=DjangoJSONEncoder).encode('utf-8')).decode('ascii')
+
+    def _after(self, values):
+        # (a, b) after (x, y) is a > x or (a = x and b > y), flipped for
+        # descending columns.
+        condition = Q(pk__in=[])
+        equal = Q()
+        for field, value in zip(self.ordering, values):
+            name = field.lstrip('-')
+            lookup = '%s__%s' % (name, 'lt' if field.startswith('-') else 'gt')
+            condition |= equal & Q(**{lookup: value})
+            equal &= Q(**{name: value})
+        return condition
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        size = self._page_size(request)
+        queryset = queryset.order_by(*self.ordering)
+        cursor = request.query_params.get(self.cursor_query_param)
+        if cursor:
+            queryset = queryset.filter(self._after(self._decode(cursor)))
+        rows = list(queryset[:size + 1])
+        self.next_values = None
+        if len(rows) > size:
+            rows = rows[:size]
+            last = rows[-1]
+            self.next_values = [getattr(last, field.lstrip('-')) for field in self.ordering]
+        return rows
+
+    def get_next_link(self):
+        if self.next_values is None:
+            return None
+        return replace_query_param(self.request.build_absolute_uri(), self.cursor_query_param, self._encode(self.next_values))
+
+    def get_paginated_response(self, data):
+        return Response({'next': self.get_next_link(), 'results': data})
@@ -0,0 +1,24 @@
+from rest_framework.permissions import BasePermission
+
+from account.models import CollegeReviewRankingCommittee
+
+
+def committee_college_ids(user):
+    """
+    Returns the ids of the colleges whose review committee the user sits on.
+    """
+    return set(
+        CollegeReviewRankingCommittee.objects.filter(account=user, is_active=True).values_list('college_id', flat=True)
+    )
+
+
+class IsStaffOrCommittee(BasePermission):
+    """
+    Allows staff and active members of a college review committee.
+    """
+
+    def has_permission(self, request, view):
+        user = request.user
+        if not user or not user.is_authenticated:
+            return False
+        return user.is_staff or CollegeReviewRankingCommittee.objects.filter(account=user, is_active=True).exists()
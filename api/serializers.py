@@ -1,7 +1,91 @@
 from rest_framework import serializers
+
+from account.models import FacultyRank
+from document.models import Document
+from document.rubric import get_rubric
+from evaluation.models import Evaluation, ReviewItem
+
+from .mixins import SparseFieldsMixin
 from .models import Room
 
 class RoomSerializer(serializers.ModelSerializer):
     class Meta:
         model = Room
-        fields = ('id','firstname', 'lastname', 'email', 'password', 'facultyNum', 'created_at', 'user_type') 
\ No newline at end of file
+        fields = ('id','firstname', 'lastname', 'email', 'password', 'facultyNum', 'created_at', 'user_type') 
+
+
+class EvaluationSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='evaluation_id', read_only=True)
+    account_email = serializers.EmailField(source='account.email', read_only=True)
+    document_name = serializers.CharField(source='document.document_name', read_only=True)
+
+    related_fields = {'account_email': 'account', 'document_name': 'document'}
+    deferred_fields = {'details': 'details', 'comment': 'comment'}
+
+    class Meta:
+        model = Evaluation
+        fields = (
+            'id', 'external_id', 'account', 'account_email', 'document', 'document_name', 'score', 'comment',
+            'details', 'is_active', 'date_created', 'date_updated',
+        )
+        read_only_fields = fields
+
+
+class DocumentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='document_id', read_only=True)
+    path = serializers.SerializerMethodField()
+
+    deferred_fields = {'document_description': 'document_description', 'details_schema': 'details_schema'}
+
+    class Meta:
+        model = Document
+        fields = (
+            'id', 'document_name', 'path', 'document_description', 'docmajor', 'docsubmajor', 'docminor',
+            'docsubminor', 'doccategory', 'doccriteria', 'docsubcriteria', 'points', 'max_points',
+            'has_multiplier', 'multiplier_unit', 'details_schema', 'is_active',
+        )
+        read_only_fields = fields
+
+    def get_path(self, document):
+        # The compiled rubric is in memory, so this costs no query.
+        rubric_document = get_rubric().document(document.document_id)
+        return rubric_document.path if rubric_document else None
+
+
+class FacultyRankSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='facultyrank_id', read_only=True)
+    rank_name = serializers.CharField(source='rank.rank_name', read_only=True)
+    subrank_tier = serializers.CharField(source='subrank.subrank_tier', read_only=True, default=None)
+    salarygrade_tier = serializers.CharField(source='salarygrade.salarygrade_tier', read_only=True)
+    salary_grade_value = serializers.DecimalField(
+        source='salarygrade.salary_grade_value', max_digits=10, decimal_places=2, read_only=True,
+    )
+
+    related_fields = {
+        'rank_name': 'rank', 'subrank_tier': 'subrank',
+        'salarygrade_tier': 'salarygrade', 'salary_grade_value': 'salarygrade',
+    }
+
+    class Meta:
+        model = FacultyRank
+        fields = (
+            'id', 'rank', 'rank_name', 'subrank', 'subrank_tier', 'salarygrade', 'salarygrade_tier',
+            'salary_grade_value', 'facultyrank_description', 'minpoints', 'maxpoints', 'is_active',
+        )
+        read_only_fields = fields
+
+
+class ReviewItemSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    id = serializers.IntegerField(source='reviewitem_id', read_only=True)
+    document = serializers.IntegerField(source='evaluation.document_id', read_only=True)
+    score = serializers.DecimalField(source='evaluation.score', max_digits=5, decimal_places=2, read_only=True)
+
+    related_fields = {'document': 'evaluation', 'score': 'evaluation'}
+
+    class Meta:
+        model = ReviewItem
+        fields = (
+            'id', 'evaluation', 'document', 'score', 'account', 'college', 'department', 'priority', 'status',
+            'claimed_by', 'lease_expires', 'claims', 'date_queued',
+        )
+        read_only_fields = fields
@@ -1,3 +1,58 @@
 from django.test import TestCase
 
-# Create your tests here.
+from account.models import Account, College, CollegeReviewRankingCommittee, CollegeReviewRankingCommitteeRole
+from document.models import DocMajorComponent, Document
+from evaluation.models import Evaluation, EvaluationTotal
+
+
+class EvaluationBulkTests(TestCase):
+    url = '/api/evaluations/bulk/'
+
+    def setUp(self):
+        self.college = College.objects.create(college_name='Engineering', college_abbreviation='CET')
+        self.other_college = College.objects.create(college_name='Arts', college_abbreviation='CAS')
+        self.faculty = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw', college=self.college)
+        self.outsider = Account.objects.create_user(email='outsider@plm.edu.ph', password='pw', college=self.other_college)
+        self.staff = Account.objects.create_user(email='staff@plm.edu.ph', password='pw', is_staff=True)
+        major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        self.document = Document.objects.create(docmajor=major, document_name='Diploma', points=10, max_points=25)
+        self.client.force_login(self.staff)
+
+    def _post(self, records, query=''):
+        return self.client.post(self.url + query, records, content_type='application/json')
+
+    def _record(self, score, **fields):
+        return dict({'account_id': self.faculty.pk, 'document_id': self.document.pk, 'score': str(score)}, **fields)
+
+    def test_retried_batch_updates_instead_of_creating(self):
+        batch = [self._record(10, external_id='hr-1'), self._record(5, external_id='hr-2')]
+        response = self._post(batch)
+        self.assertEqual((response.status_code, response.json()['created']), (200, 2))
+
+        batch[0]['score'] = '20'
+        response = self._post(batch)
+        self.assertEqual((response.json()['created'], response.json()['updated']), (0, 2))
+        self.assertEqual(Evaluation.objects.count(), 2)
+        self.assertEqual(EvaluationTotal.objects.get(account=self.faculty, document=self.document).points, 25)
+
+    def test_update_by_id(self):
+        created = self._post([self._record(10)]).json()['results'][0]['id']
+        response = self._post([self._record(3, id=created), self._record(1, id=created + 100)])
+        self.assertEqual([result['status'] for result in response.json()['results']], ['updated', 'error'])
+        self.assertEqual(Evaluation.objects.get(pk=created).score, 3)
+
+    def test_atomic_batch_writes_nothing_on_error(self):
+        response = self._post([self._record(10), self._record('x')], query='?atomic=true')
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(Evaluation.objects.exists())
+        self.assertFalse(EvaluationTotal.objects.exists())
+
+    def test_committee_writes_only_its_colleges(self):
+        role = CollegeReviewRankingCommitteeRole.objects.create(role_name='Member')
+        member = Account.objects.create_user(email='member@plm.edu.ph', password='pw')
+        CollegeReviewRankingCommittee.objects.create(account=member, role=role, college=self.college)
+        self.client.force_login(member)
+
+        response = self._post([self._record(10), self._record(10, account_id=self.outsider.pk)])
+        self.assertEqual([result['status'] for result in response.json()['results']], ['created', 'error'])
+        self.assertFalse(Evaluation.objects.filter(account=self.outsider).exists())
@@ -2,8 +2,21 @@ from django.urls import path
 from .views import RoomView
 from . import views
 
+app_name = "api"
+
 
 urlpatterns = [
     path('room', RoomView.as_view()),
+    path('evaluations/', views.EvaluationListView.as_view(), name="evaluation_list"),
+    path('evaluations/bulk/', views.EvaluationBulkView.as_view(), name="evaluation_bulk"),
+    path('evaluations/<int:evaluation_id>/', views.EvaluationDetailView.as_view(), name="evaluation_detail"),
+    path('documents/', views.DocumentListView.as_view(), name="document_list"),
+    path('documents/<int:document_id>/', views.DocumentDetailView.as_view(), name="document_detail"),
+    path('ranks/', views.FacultyRankListView.as_view(), name="rank_list"),
+    path('ranks/<int:facultyrank_id>/', views.FacultyRankDetailView.as_view(), name="rank_detail"),
+    path('reviews/', views.ReviewQueueView.as_view(), name="review_queue"),
+    path('reviews/claim/', views.ReviewClaimView.as_view(), name="review_claim"),
+    path('reviews/renew/', views.ReviewLeaseView.as_view(operation='renew'), name="review_renew"),
+    path('reviews/release/', views.ReviewLeaseView.as_view(operation='release'), name="review_release"),
+    path('reviews/<int:reviewitem_id>/complete/', views.ReviewCompleteView.as_view(), name="review_complete"),
 ]
- 
@@ -1,10 +1,282 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError
+from django.db.models import Count, Max
 from django.shortcuts import render
-from rest_framework import generics
-from .serializers import RoomSerializer
+from django.utils.dateparse import parse_datetime
+from rest_framework import generics, status
+from rest_framework.exceptions import ValidationError
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from account.models import FacultyRank
+from document.models import Document
+from evaluation.bulk import CREATED, ERROR, UPDATED, upsert_evaluations
+from evaluation.details import EXTRACTED
+from evaluation import review
+from evaluation.models import Evaluation
+from utility.versioning import get_version
+
+from .mixins import ConditionalGetMixin
+from .pagination import CompositeKeysetPagination, KeysetPagination
+from .permissions import IsStaffOrCommittee, committee_college_ids
+from .serializers import DocumentSerializer, EvaluationSerializer, FacultyRankSerializer, ReviewItemSerializer, RoomSerializer
 from .models import Room
 
 # Create your views here.
 
 class RoomView(generics.CreateAPIView):
     queryset = Room.objects.all()
-    serializer_class = RoomSerializer
\ No newline at end of file
+    serializer_class = RoomSerializer
+
+
+class EvaluationQueryMixin:
+    """
+    The evaluations a request may read: faculty see their own, staff see
+    everyone's. Filters: account (staff only), document, is_active,
+    updated_since (an ISO datetime, for polling) and the indexed details
+    keys (institution, year, role).
+    """
+    serializer_class = EvaluationSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = Evaluation.objects.all()
+        params = self.request.query_params
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(account=self.request.user)
+        elif params.get('account'):
+            queryset = queryset.filter(account_id=_int_param(params, 'account'))
+        if params.get('document'):
+            queryset = queryset.filter(document_id=_int_param(params, 'document'))
+        if params.get('is_active') in ('true', 'false'):
+            queryset = queryset.filter(is_active=params['is_active'] == 'true')
+        if params.get('updated_since'):
+            updated_since = parse_datetime(params['updated_since'])
+            if updated_since is None:
+                raise ValidationError({'updated_since': 'Expected an ISO 8601 datetime.'})
+            queryset = queryset.filter(date_updated__gt=updated_since)
+        details = {key: params[key] for key in EXTRACTED if params.get(key)}
+        if 'year' in details:
+            details['year'] = _int_param(params, 'year')
+        if details:
+            queryset = queryset.with_details(**details)
+        return EvaluationSerializer.queryset_for(queryset, self.request)
+
+
+class EvaluationListView(ConditionalGetMixin, EvaluationQueryMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+
+    def validators(self, request, *args, **kwargs):
+        # One aggregate instead of the page: a row added, changed or deleted
+        # changes the count or the latest date_updated.
+        state = self.filter_queryset(self.get_queryset()).order_by().aggregate(
+            count=Count('pk'), last_modified=Max('date_updated'),
+        )
+        return [state['count'], state['last_modified']], state['last_modified']
+
+
+class EvaluationDetailView(ConditionalGetMixin, EvaluationQueryMixin, generics.RetrieveAPIView):
+    lookup_url_kwarg = 'evaluation_id'
+    lookup_field = 'evaluation_id'
+
+    def validators(self, request, *args, **kwargs):
+        evaluation = self.get_object()
+        return [evaluation.pk, evaluation.date_updated], evaluation.date_updated
+
+    def get_object(self):
+        # validators() and retrieve() share one lookup.
+        if not hasattr(self, '_object'):
+            self._object = super().get_object()
+        return self._object
+
+
+class EvaluationBulkView(generics.GenericAPIView):
+    """
+    Creates and updates a batch of evaluations in one request and one
+    transaction. The body is a list of records (or {"evaluations": [...]})
+    in the importer's format, each optionally carrying the id or
+    external_id of the evaluation it updates. Committee members may only
+    write evaluations of faculty in their colleges. With ?atomic=true
+    nothing is written unless every record is valid.
+    """
+    permission_classes = [IsStaffOrCommittee]
+
+    def post(self, request, *args, **kwargs):
+        records = request.data.get('evaluations') if isinstance(request.data, dict) else request.data
+        if not isinstance(records, list):
+            raise ValidationError({'evaluations': 'Expected a list of evaluations.'})
+        max_items = getattr(settings, 'API_BULK_MAX_ITEMS', 1000)
+        if len(records) > max_items:
+            raise ValidationError({'evaluations': 'At most %d evaluations per request.' % max_items})
+
+        account_filter = None
+        if not request.user.is_staff:
+            college_ids = committee_college_ids(request.user)
+            account_filter = lambda account_ids: get_user_model().objects.filter(
+                pk__in=account_ids, college_id__in=college_ids,
+            ).values_list('pk', flat=True)
+        atomic = request.query_params.get('atomic') == 'true'
+        try:
+            results = upsert_evaluations(records, account_filter=account_filter, atomic=atomic)
+        except IntegrityError:
+            # Another request created one of the external_ids meanwhile; a
+            # retry updates it instead.
+            return Response({'detail': 'The batch conflicted with a concurrent write; retry it.'}, status=status.HTTP_409_CONFLICT)
+
+        counts = {state: sum(result.status == state for result in results) for state in (CREATED, UPDATED, ERROR)}
+        written = counts[CREATED] + counts[UPDATED]
+        return Response(
+            dict(counts, results=[result._asdict() for result in results]),
+            status=status.HTTP_400_BAD_REQUEST if counts[ERROR] and not written else status.HTTP_200_OK,
+        )
+
+
+class ReviewQueuePagination(CompositeKeysetPagination):
+    ordering = ('-priority', 'reviewitem_id')
+    page_size = 50
+
+
+def _int_param(data, name, default=None):
+    value = data.get(name, default)
+    if value in (None, ''):
+        return default
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValidationError({name: 'Expected an integer.'})
+
+
+def _item_ids(data):
+    ids = data.get('items') if isinstance(data, dict) else None
+    if not isinstance(ids, list):
+        raise ValidationError({'items': 'Expected a list of review item ids.'})
+    try:
+        return [int(item_id) for item_id in ids]
+    except (TypeError, ValueError):
+        raise ValidationError({'items': 'Expected a list of review item ids.'})
+
+
+class ReviewQueueView(generics.ListAPIView):
+    """
+    The pending review items of the reviewer's committees, highest priority
+    first. Filters: college, department, available=true (items nobody holds
+    a lease on) and mine=true (items the reviewer holds).
+    """
+    serializer_class = ReviewItemSerializer
+    permission_classes = [IsStaffOrCommittee]
+    pagination_class = ReviewQueuePagination
+
+    def get_queryset(self):
+        params = self.request.query_params
+        items = review.queue(
+            self.request.user,
+            college=_int_param(params, 'college'),
+            department=_int_param(params, 'department'),
+            available=params.get('available') == 'true',
+            mine=params.get('mine') == 'true',
+        )
+        return ReviewItemSerializer.queryset_for(items, self.request)
+
+
+class ReviewClaimView(generics.GenericAPIView):
+    """
+    Leases the next available items of the reviewer's queue to them. The
+    body may give count (at most REVIEW_CLAIM_MAX), college and department.
+    The response holds the claimed items; it is empty when nothing is left.
+    """
+    serializer_class = ReviewItemSerializer
+    permission_classes = [IsStaffOrCommittee]
+
+    def post(self, request, *args, **kwargs):
+        data = request.data if isinstance(request.data, dict) else {}
+        count = _int_param(data, 'count', 1)
+        max_items = getattr(settings, 'REVIEW_CLAIM_MAX', 50)
+        if not 1 <= count <= max_items:
+            raise ValidationError({'count': 'Claim between 1 and %d items.' % max_items})
+        items = review.claim(
+            request.user, count=count,
+            college=_int_param(data, 'college'), department=_int_param(data, 'department'),
+        )
+        return Response({'results': self.get_serializer(items, many=True).data})
+
+
+class ReviewLeaseView(generics.GenericAPIView):
+    """
+    Renews or releases the reviewer's leases on the items listed in the
+    body ({"items": [...]}), returning how many it changed.
+    """
+    permission_classes = [IsStaffOrCommittee]
+    operation = None
+
+    def post(self, request, *args, **kwargs):
+        item_ids = _item_ids(request.data)
+        changed = review.renew(request.user, item_ids) if self.operation == 'renew' else review.release(request.user, item_ids)
+        return Response({'changed': changed})
+
+
+class ReviewCompleteView(generics.GenericAPIView):
+    """
+    Records the reviewer's decision ({"decision": "approved" or "returned",
+    "note": ...}) on an item they hold a live lease on; 409 when they no
+    longer do.
+    """
+    permission_classes = [IsStaffOrCommittee]
+
+    def post(self, request, reviewitem_id, *args, **kwargs):
+        data = request.data if isinstance(request.data, dict) else {}
+        decision = data.get('decision')
+        if decision not in review.DECISIONS:
+            raise ValidationError({'decision': 'Expected one of %s.' % ', '.join(review.DECISIONS)})
+        try:
+            review.complete(request.user, reviewitem_id, decision, note=str(data.get('note') or ''))
+        except review.ReviewError as error:
+            return Response({'detail': str(error)}, status=status.HTTP_409_CONFLICT)
+        return Response({'id': reviewitem_id, 'status': decision})
+
+
+class VersionedViewMixin:
+    """
+    Views over tables that bump a utility.versioning version whenever they
+    change, so their ETag costs a cache read rather than a query.
+    """
+    version_name = None
+
+    def validators(self, request, *args, **kwargs):
+        return [self.version_name, get_version(self.version_name)], None
+
+
+class DocumentQueryMixin(VersionedViewMixin):
+    serializer_class = DocumentSerializer
+    permission_classes = [IsAuthenticated]
+    version_name = 'rubric'
+
+    def get_queryset(self):
+        return DocumentSerializer.queryset_for(Document.objects.all(), self.request)
+
+
+class DocumentListView(ConditionalGetMixin, DocumentQueryMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+
+
+class DocumentDetailView(ConditionalGetMixin, DocumentQueryMixin, generics.RetrieveAPIView):
+    lookup_url_kwarg = 'document_id'
+    lookup_field = 'document_id'
+
+
+class FacultyRankQueryMixin(VersionedViewMixin):
+    serializer_class = FacultyRankSerializer
+    permission_classes = [IsAuthenticated]
+    version_name = 'faculty_rank'
+
+    def get_queryset(self):
+        return FacultyRankSerializer.queryset_for(FacultyRank.objects.all(), self.request)
+
+
+class FacultyRankListView(ConditionalGetMixin, FacultyRankQueryMixin, generics.ListAPIView):
+    pagination_class = KeysetPagination
+
+
+class FacultyRankDetailView(ConditionalGetMixin, FacultyRankQueryMixin, generics.RetrieveAPIView):
+    lookup_url_kwarg = 'facultyrank_id'
+    lookup_field = 'facultyrank_id'
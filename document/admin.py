@@ -8,5 +8,11 @@ admin.site.register(DocMinorComponent)
 admin.site.register(DocCategory)
 admin.site.register(DocCriteria)
 admin.site.register(DocSubCriteria)
-admin.site.register(Document)
+
+@admin.register(Document)
+class DocumentAdmin(admin.ModelAdmin):
+    list_display = ('document_name', 'docmajor', 'doccategory', 'points', 'max_points', 'is_active')
+    list_select_related = ('docmajor', 'doccategory')
+    list_filter = ('is_active', 'docmajor')
+    search_fields = ('^document_name',)
 
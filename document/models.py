@@ -1,4 +1,4 @@
-
+from django.db.models.functions import Upper
 from django.db import models
 
 class DocMajorComponent(models.Model):
@@ -147,6 +147,7 @@ class Document(models.Model):
         max_points (float): The maximum points that the document can get.
         has_multiplier (bool): A flag indicating whether the document has a multiplier or not.
         multiplier_unit (str): The unit of the multiplier.
+        details_schema (dict): The keys expected in the details of its evaluations (see evaluation.details).
         is_active (bool): A flag indicating whether the document is active or not.
     """
     document_id = models.AutoField(primary_key=True)
@@ -163,8 +164,14 @@ class Document(models.Model):
     max_points = models.FloatField()
     has_multiplier = models.BooleanField(default=False)
     multiplier_unit = models.CharField(max_length=255, null=True, blank=True)
+    details_schema = models.JSONField(default=dict, blank=True)
     is_active = models.BooleanField(default=True)
 
+    class Meta:
+        indexes = [
+            models.Index(Upper('document_name'), name='document_name_upper_idx'),
+        ]
+
     def __str__(self):
         """
         Returns the name of the document.
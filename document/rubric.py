@@ -0,0 +1,176 @@
+from collections import namedtuple
+from types import MappingProxyType
+
+from django.utils.text import slugify
+
+from utility.versioning import Versioned
+
+from .models import *
+
+
+# The levels of the hierarchy, outermost first, as (Document field, model, name field).
+LEVELS = (
+    ('docmajor', DocMajorComponent, 'docmajorcomponent_name'),
+    ('docsubmajor', DocSubMajorComponent, 'docsubmajorcomponent_name'),
+    ('docminor', DocMinorComponent, 'docminorcomponent_name'),
+    ('docsubminor', DocSubMinorComponent, 'docsubminorcomponent_name'),
+    ('doccategory', DocCategory, 'doccategory_name'),
+    ('doccriteria', DocCriteria, 'doccriteria_name'),
+    ('docsubcriteria', DocSubCriteria, 'docsubcriteria_name'),
+)
+
+RubricNode = namedtuple('RubricNode', [
+    'level', 'id', 'name', 'path', 'is_active', 'children', 'documents', 'max_points',
+])
+
+RubricDocument = namedtuple('RubricDocument', [
+    'id', 'name', 'description', 'path', 'points', 'max_points', 'has_multiplier', 'multiplier_unit',
+    'details_schema', 'is_active', 'docmajor', 'docsubmajor', 'docminor', 'docsubminor', 'doccategory', 'doccriteria',
+    'docsubcriteria',
+])
+
+
+class Rubric:
+    """
+    An immutable, compiled view of the whole document hierarchy.
+
+    Attributes:
+        version (int): The rubric version the tree was compiled from.
+        roots (tuple): A RubricNode for every major component, in id order.
+    """
+
+    def __init__(self, version, roots, documents, paths):
+        self.version = version
+        self.roots = roots
+        self._documents = MappingProxyType(documents)
+        self._paths = MappingProxyType(paths)
+        self._majors = MappingProxyType({root.id: root for root in roots})
+
+    def __len__(self):
+        return len(self._documents)
+
+    def document(self, document_id):
+        """
+        Returns the RubricDocument with the given id, or None.
+        """
+        return self._documents.get(document_id)
+
+    def find(self, path):
+        """
+        Returns the RubricNode or RubricDocument at the given slug path, e.g.
+        'academic/degree/diploma', or None.
+        """
+        return self._paths.get(path.strip('/').lower())
+
+    def documents(self, active=True):
+        """
+        Returns the documents of the rubric, only the active ones by default.
+        """
+        return [document for document in self._documents.values() if document.is_active or not active]
+
+    def major(self, docmajor_id):
+        """
+        Returns the RubricNode of the given major component, or None.
+        """
+        return self._majors.get(docmajor_id)
+
+
+def _unique(path, paths, suffix):
+    if path in paths:
+        path = '%s-%s' % (path, suffix)
+    return path
+
+
+def compile_rubric(version=None):
+    """
+    Loads the document hierarchy with one query per model and compiles it into a Rubric.
+    """
+    names = {}
+    for field, model, name_field in LEVELS:
+        names[field] = {
+            row[0]: (row[1], row[2])
+            for row in model.objects.values_list(model._meta.pk.attname, name_field, 'is_active')
+        }
+
+    # Mutable scratch nodes: key -> [name, path, is_active, children, documents]
+    nodes = {}
+    paths = {}
+
+    def node(key, parent_path):
+        if key not in nodes:
+            field, pk = key[-1]
+            name, is_active = names[field][pk]
+            path = '/'.join(filter(None, [parent_path, slugify(name) or str(pk)]))
+            path = _unique(path, paths, pk)
+            nodes[key] = [name, path, is_active, {}, []]
+            paths[path] = key
+        return nodes[key]
+
+    for pk in sorted(names['docmajor']):
+        node((('docmajor', pk),), '')
+
+    documents = {}
+    for document in Document.objects.order_by('document_id'):
+        key = ()
+        parent = None
+        for field, model, name_field in LEVELS:
+            pk = getattr(document, field + '_id')
+            if pk is None:
+                continue
+            key = key + ((field, pk),)
+            current = node(key, parent[1] if parent else '')
+            if parent is not None:
+                parent[3].setdefault(key, current)
+            parent = current
+
+        path = _unique('%s/%s' % (parent[1], slugify(document.document_name) or document.document_id), paths, document.document_id)
+        rubric_document = RubricDocument(
+            id=document.document_id,
+            name=document.document_name,
+            description=document.document_description,
+            path=path,
+            points=document.points,
+            max_points=document.max_points,
+            has_multiplier=document.has_multiplier,
+            multiplier_unit=document.multiplier_unit,
+            details_schema=MappingProxyType(document.details_schema or {}),
+            is_active=document.is_active,
+            **{field: getattr(document, field + '_id') for field, model, name_field in LEVELS},
+        )
+        documents[document.document_id] = rubric_document
+        paths[path] = rubric_document
+        parent[4].append(rubric_document)
+
+    frozen = {}
+
+    def freeze(key):
+        if key not in frozen:
+            name, path, is_active, children, docs = nodes[key]
+            children = tuple(freeze(child) for child in children)
+            max_points = sum(document.max_points for document in docs if document.is_active)
+            max_points += sum(child.max_points for child in children if child.is_active)
+            frozen[key] = RubricNode(
+                level=key[-1][0], id=key[-1][1], name=name, path=path, is_active=is_active,
+                children=children, documents=tuple(docs), max_points=max_points,
+            )
+        return frozen[key]
+
+    roots = tuple(freeze((('docmajor', pk),)) for pk in sorted(names['docmajor']))
+    for key in nodes:
+        paths[nodes[key][1]] = freeze(key)
+    return Rubric(version, roots, documents, paths)
+
+
+_rubric = Versioned('rubric', compile_rubric)
+
+
+def get_rubric():
+    """
+    Returns the compiled rubric of this process, recompiling it when the
+    hierarchy changed in any worker.
+    """
+    return _rubric.get()
+
+
+def invalidate_rubric():
+    _rubric.invalidate()
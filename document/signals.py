@@ -0,0 +1,15 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+from .models import *
+from .rubric import LEVELS, invalidate_rubric
+
+
+def rubric_changed(sender, **kwargs):
+    # After the commit, so no worker recompiles the new version from the old rows.
+    transaction.on_commit(invalidate_rubric)
+
+
+for model in [Document] + [model for field, model, name_field in LEVELS]:
+    post_save.connect(rubric_changed, sender=model, dispatch_uid='rubric_changed_%s' % model.__name__)
+    post_delete.connect(rubric_changed, sender=model, dispatch_uid='rubric_deleted_%s' % model.__name__)
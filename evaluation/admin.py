@@ -1,6 +1,33 @@
 from django.contrib import admin
 
+from utility.admin import ScalableModelAdmin
+
 from .models import *
 
 # Register your models here.
-admin.site.register(Evaluation)
\ No newline at end of file
+@admin.register(Evaluation)
+class EvaluationAdmin(ScalableModelAdmin):
+    list_display = ('evaluation_id', 'account', 'document', 'score', 'is_active', 'date_updated')
+    list_select_related = ('account', 'document')
+    list_filter = ('is_active',)
+    search_fields = ('^account__email', '=account__faculty_id', '^document__document_name')
+    autocomplete_fields = ('account', 'document')
+
+
+@admin.register(Evidence)
+class EvidenceAdmin(ScalableModelAdmin):
+    list_display = ('evidence_id', 'original_name', 'account', 'evaluation', 'file', 'date_uploaded')
+    list_select_related = ('account', 'evaluation__document', 'evaluation__account', 'file')
+    search_fields = ('^account__email', '=file__content_hash')
+    autocomplete_fields = ('account', 'evaluation')
+    raw_id_fields = ('file',)
+
+
+@admin.register(ReviewItem)
+class ReviewItemAdmin(ScalableModelAdmin):
+    list_display = ('reviewitem_id', 'evaluation', 'college', 'department', 'priority', 'status', 'claimed_by', 'lease_expires')
+    list_select_related = ('evaluation__document', 'evaluation__account', 'college', 'department', 'claimed_by')
+    list_filter = ('status',)
+    search_fields = ('^account__email', '=evaluation__evaluation_id')
+    raw_id_fields = ('evaluation', 'account', 'claimed_by', 'completed_by')
+    readonly_fields = ('lease_token', 'claims', 'date_queued', 'date_completed')
@@ -0,0 +1,135 @@
+from collections import namedtuple
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import review, rollup
+from .importer import ImportRowError, LookupMaps, build_evaluation
+from .models import Evaluation
+
+
+UpsertResult = namedtuple('UpsertResult', ['index', 'status', 'id', 'error'])
+
+CREATED = 'created'
+UPDATED = 'updated'
+ERROR = 'error'
+
+UPDATE_FIELDS = [
+    'account', 'document', 'score', 'comment', 'details', 'detail_institution', 'detail_year', 'detail_role',
+    'is_active', 'date_updated',
+]
+
+
+def _key(record):
+    """
+    Returns how a record names the evaluation it updates: ('id', pk),
+    ('external_id', value) or None for a new evaluation.
+    """
+    if record.get('id') not in (None, ''):
+        try:
+            return 'id', int(record['id'])
+        except (TypeError, ValueError):
+            raise ImportRowError('invalid id %r' % record['id'])
+    external_id = str(record.get('external_id') or '').strip()
+    if external_id:
+        if len(external_id) > 100:
+            raise ImportRowError('external_id is longer than 100 characters')
+        return 'external_id', external_id
+    return None
+
+
+def upsert_evaluations(records, account_filter=None, atomic=False):
+    """
+    Validates a batch of evaluation records and writes the valid ones in one
+    transaction, with one bulk insert, one bulk update and one rollup
+    refresh for the whole batch. Returns an UpsertResult per record, in
+    order.
+
+    Records use the importer's format (see evaluation.importer), plus id or
+    external_id to update an existing evaluation; a record with an unknown
+    external_id creates the evaluation under it, so a retried batch never
+    creates anything twice. account_filter(account_ids) returns the subset
+    of account ids the caller may write; records for the others fail. With
+    atomic, nothing is written unless every record is valid.
+    """
+    records = list(records)
+    lookups = LookupMaps(records)
+    results = [None] * len(records)
+    keys = {}
+    seen = set()
+    built = {}
+    for index, record in enumerate(records):
+        try:
+            if not isinstance(record, dict):
+                raise ImportRowError('record must be an object')
+            key = _key(record)
+            if key is not None and key in seen:
+                raise ImportRowError('%s %r appears twice in the batch' % key)
+            built[index] = build_evaluation(record, lookups)
+            keys[index] = key
+            seen.add(key)
+        except ImportRowError as error:
+            results[index] = UpsertResult(index, ERROR, None, str(error))
+
+    with transaction.atomic():
+        existing = {}
+        ids = [key[1] for key in keys.values() if key and key[0] == 'id']
+        external_ids = [key[1] for key in keys.values() if key and key[0] == 'external_id']
+        if ids or external_ids:
+            for evaluation in Evaluation.objects.select_for_update().filter(
+                Q(pk__in=ids) | Q(external_id__in=external_ids)
+            ).only('evaluation_id', 'external_id', 'account_id', 'document_id', 'date_created'):
+                existing[('id', evaluation.pk)] = evaluation
+                if evaluation.external_id:
+                    existing[('external_id', evaluation.external_id)] = evaluation
+
+        account_ids = {evaluation.account_id for evaluation in built.values()}
+        account_ids |= {evaluation.account_id for evaluation in existing.values()}
+        allowed = set(account_filter(account_ids)) if account_filter is not None else account_ids
+        for index, evaluation in list(built.items()):
+            key = keys[index]
+            current = existing.get(key) if key else None
+            if key and key[0] == 'id' and current is None:
+                error = 'unknown id %r' % key[1]
+            elif evaluation.account_id not in allowed or (current and current.account_id not in allowed):
+                error = 'not allowed to write evaluations of account %r' % evaluation.account_id
+            else:
+                continue
+            results[index] = UpsertResult(index, ERROR, None, error)
+            del built[index]
+
+        if atomic and len(built) < len(records):
+            transaction.set_rollback(True)
+            return [result or UpsertResult(index, ERROR, None, 'not written: the batch has errors')
+                    for index, result in enumerate(results)]
+
+        now = timezone.now()
+        created, updated = [], []
+        pairs = set()
+        for index, evaluation in built.items():
+            key = keys[index]
+            current = existing.get(key) if key else None
+            if key and key[0] == 'external_id':
+                evaluation.external_id = key[1]
+            if current is None:
+                created.append((index, evaluation))
+            else:
+                evaluation.pk = current.pk
+                evaluation.external_id = current.external_id
+                evaluation.date_created = current.date_created
+                evaluation.date_updated = now
+                updated.append((index, evaluation))
+                pairs.add((current.account_id, current.document_id))
+            pairs.add((evaluation.account_id, evaluation.document_id))
+
+        Evaluation.objects.bulk_create([evaluation for index, evaluation in created])
+        Evaluation.objects.bulk_update([evaluation for index, evaluation in updated], UPDATE_FIELDS)
+        rollup.refresh_totals(pairs)
+        review.enqueue([evaluation for index, evaluation in created + updated])
+
+    for index, evaluation in created:
+        results[index] = UpsertResult(index, CREATED, evaluation.pk, None)
+    for index, evaluation in updated:
+        results[index] = UpsertResult(index, UPDATED, evaluation.pk, None)
+    return results
@@ -0,0 +1,138 @@
+import datetime
+from collections import namedtuple
+
+from django.db import connections
+from django.db.models import Q
+
+
+DetailField = namedtuple('DetailField', ['key', 'type', 'required', 'choices'])
+
+FIELD_TYPES = ('string', 'integer', 'number', 'boolean', 'date')
+
+# Details keys copied into indexed columns of Evaluation, as key -> column.
+# They can be filtered and sorted with plain b-tree indexes on every
+# database; other keys are filtered through the JSON itself.
+EXTRACTED = {
+    'institution': 'detail_institution',
+    'year': 'detail_year',
+    'role': 'detail_role',
+}
+
+
+class DetailsError(ValueError):
+    pass
+
+
+def schema_fields(schema):
+    """
+    Returns the DetailFields of a Document.details_schema. A schema maps each
+    key either to a type name or to an object with a type, and optionally
+    required (a bool) and choices (a list of allowed values), e.g.
+    {"institution": "string", "role": {"type": "string", "choices": ["Author", "Co-author"]}}.
+    """
+    fields = []
+    for key, spec in (schema or {}).items():
+        if isinstance(spec, str):
+            spec = {'type': spec}
+        if not isinstance(spec, dict) or spec.get('type') not in FIELD_TYPES:
+            raise DetailsError('details_schema: %r needs a type among %s' % (key, ', '.join(FIELD_TYPES)))
+        fields.append(DetailField(key, spec['type'], bool(spec.get('required')), spec.get('choices')))
+    return fields
+
+
+def _coerce(field, value):
+    if field.type == 'string':
+        return str(value).strip()
+    if field.type == 'integer':
+        if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+            raise ValueError
+        return int(str(value).strip()) if isinstance(value, str) else int(value)
+    if field.type == 'number':
+        if isinstance(value, bool):
+            raise ValueError
+        return float(value)
+    if field.type == 'boolean':
+        if isinstance(value, bool):
+            return value
+        if str(value).strip().lower() in ('1', 'true', 'yes'):
+            return True
+        if str(value).strip().lower() in ('0', 'false', 'no'):
+            return False
+        raise ValueError
+    return datetime.date.fromisoformat(str(value).strip()).isoformat()
+
+
+def clean_details(details, schema):
+    """
+    Validates details against a Document.details_schema and returns a copy
+    with the declared keys coerced to their types (CSV imports bring every
+    value as a string). Keys the schema does not declare are kept as they
+    are. Raises DetailsError on the first invalid key.
+    """
+    if not isinstance(details, dict):
+        raise DetailsError('details must be a JSON object')
+    cleaned = dict(details)
+    for field in schema_fields(schema):
+        value = cleaned.get(field.key)
+        if value is None or value == '':
+            if field.required:
+                raise DetailsError('details: %r is required' % field.key)
+            cleaned.pop(field.key, None)
+            continue
+        try:
+            value = _coerce(field, value)
+        except (TypeError, ValueError):
+            raise DetailsError('details: %r must be of type %s, not %r' % (field.key, field.type, value))
+        if field.choices and value not in field.choices:
+            raise DetailsError('details: %r must be one of %s' % (field.key, ', '.join(map(str, field.choices))))
+        cleaned[field.key] = value
+    return cleaned
+
+
+def extract(details):
+    """
+    Returns the values of the EXTRACTED columns for a details object. Values
+    that do not fit their column (a year that is not a number, say) are left
+    out of the index rather than rejected.
+    """
+    details = details if isinstance(details, dict) else {}
+    year = details.get('year')
+    try:
+        year = int(year) if year not in (None, '') and not isinstance(year, bool) else None
+    except (TypeError, ValueError):
+        year = None
+    if year is not None and not 0 < year < 10000:
+        year = None
+    institution = details.get('institution')
+    role = details.get('role')
+    return {
+        'detail_institution': str(institution).strip()[:255] or None if institution is not None else None,
+        'detail_year': year,
+        'detail_role': str(role).strip()[:100] or None if role is not None else None,
+    }
+
+
+def details_q(using='default', **lookups):
+    """
+    Returns a Q filtering evaluations on keys of their details, with the
+    usual lookup syntax: details_q(institution='UP Manila', year__gte=2020).
+
+    Extracted keys use their indexed columns. Equality on any other key is
+    a containment test, which the GIN index serves on PostgreSQL; elsewhere,
+    and for other lookups, the key is read out of the JSON, which scans
+    whatever rows the other filters leave.
+    """
+    query = Q()
+    contained = {}
+    supports_contains = connections[using].features.supports_json_field_contains
+    for lookup, value in lookups.items():
+        key, _, operator = lookup.partition('__')
+        if key in EXTRACTED:
+            query &= Q(**{'__'.join(filter(None, [EXTRACTED[key], operator])): value})
+        elif not operator and supports_contains:
+            contained[key] = value
+        else:
+            query &= Q(**{'details__%s' % lookup: value})
+    if contained:
+        query &= Q(details__contains=contained)
+    return query
@@ -0,0 +1,158 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from utility.jobs import enqueue_on_commit
+
+from .models import Evidence, EvidenceFile, EvidenceUpload
+
+
+class UploadError(ValueError):
+    pass
+
+
+class UploadOffsetError(UploadError):
+    """
+    Raised when a chunk does not start where the upload left off. The client
+    should ask for the upload's state and resume from its received bytes.
+    """
+
+
+def evidence_root():
+    return getattr(settings, 'EVIDENCE_ROOT', os.path.join(settings.BASE_DIR, 'media', 'evidence'))
+
+
+def partial_path(upload):
+    return os.path.join(evidence_root(), 'uploads', '%s.part' % upload.upload_id)
+
+
+def file_path(content_hash):
+    return os.path.join(evidence_root(), content_hash[:2], content_hash[2:4], content_hash)
+
+
+def content_hash(path, block_size=1 << 20):
+    """
+    Returns the content hash of a file: the SHA-256 of its bytes, so the
+    same content has the same hash however it was uploaded.
+    """
+    digest = hashlib.sha256()
+    with open(path, 'rb') as source:
+        for block in iter(lambda: source.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def start_upload(account, original_name, size, content_type='', evaluation=None):
+    """
+    Starts an upload of size bytes and returns it.
+    """
+    max_size = getattr(settings, 'EVIDENCE_MAX_SIZE', 50 << 20)
+    if size <= 0:
+        raise UploadError('The file is empty.')
+    if size > max_size:
+        raise UploadError('The file is larger than %d bytes.' % max_size)
+    if evaluation is not None and evaluation.account_id != account.pk:
+        raise UploadError('The evaluation belongs to another account.')
+    return EvidenceUpload.objects.create(
+        account=account,
+        evaluation=evaluation,
+        original_name=os.path.basename(original_name)[:255],
+        content_type=content_type[:100],
+        size=size,
+        chunk_size=getattr(settings, 'EVIDENCE_CHUNK_SIZE', 1 << 20),
+    )
+
+
+def _check_chunk(upload, offset, length):
+    if upload.is_complete:
+        raise UploadError('The upload is already complete.')
+    if offset != upload.received:
+        raise UploadOffsetError('Expected the chunk at offset %d.' % upload.received)
+    expected = min(upload.chunk_size, upload.size - upload.received)
+    if length != expected:
+        raise UploadError('Expected a chunk of %d bytes.' % expected)
+
+
+def receive_chunk(upload_id, account, offset, length, stream, block_size=64 << 10):
+    """
+    Appends the next chunk of an upload, read from stream in blocks, and
+    returns the upload. Every chunk but the last must be chunk_size bytes.
+    A chunk that was cut off is simply sent again from the same offset.
+
+    The chunk is spooled to its own file before any row is locked, so a
+    slow client never holds a transaction open; the upload then only
+    advances if it is still at offset, and two clients racing on the same
+    chunk cannot both append it.
+    """
+    upload = EvidenceUpload.objects.get(upload_id=upload_id, account=account)
+    _check_chunk(upload, offset, length)
+
+    path = partial_path(upload)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, spooled = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.chunk')
+    try:
+        with os.fdopen(descriptor, 'wb') as target:
+            written = 0
+            while written < length:
+                block = stream.read(min(block_size, length - written))
+                if not block:
+                    raise UploadError('The chunk ended after %d bytes.' % written)
+                target.write(block)
+                written += len(block)
+
+        with transaction.atomic():
+            advanced = EvidenceUpload.objects.filter(
+                upload_id=upload_id, account=account, received=offset, evidence__isnull=True,
+            ).update(received=F('received') + length, date_updated=timezone.now())
+            upload = EvidenceUpload.objects.get(upload_id=upload_id)
+            if not advanced:
+                # Another request stored this chunk first.
+                _check_chunk(upload, offset, length)
+            with open(path, 'r+b' if os.path.exists(path) else 'wb') as target, open(spooled, 'rb') as source:
+                # Drop whatever an interrupted attempt at this chunk left behind.
+                target.seek(offset)
+                target.truncate()
+                shutil.copyfileobj(source, target, block_size)
+            if upload.received == upload.size:
+                _complete(upload, path)
+                upload.save(update_fields=['evidence'])
+    finally:
+        os.remove(spooled)
+    return upload
+
+
+def _complete(upload, path):
+    """
+    Stores a finished upload under its content hash, unless that content is
+    already stored, and records it as the uploader's evidence. Only new
+    content is queued for classification.
+    """
+    digest = content_hash(path)
+    evidence_file, created = EvidenceFile.objects.get_or_create(
+        content_hash=digest, defaults={'size': upload.size, 'content_type': upload.content_type},
+    )
+    stored = file_path(digest)
+    if os.path.exists(stored):
+        os.remove(path)
+    else:
+        os.makedirs(os.path.dirname(stored), exist_ok=True)
+        os.replace(path, stored)
+
+    upload.evidence = Evidence.objects.create(
+        account_id=upload.account_id,
+        evaluation_id=upload.evaluation_id,
+        file=evidence_file,
+        original_name=upload.original_name,
+    )
+    if created:
+        enqueue_on_commit(
+            'evaluation.classify_evidence',
+            arguments={'evidencefile_id': evidence_file.pk, 'name': upload.original_name},
+            dedupe_key='classify-evidence:%s' % digest,
+        )
@@ -0,0 +1,252 @@
+import csv
+import json
+import os
+from collections import namedtuple
+from decimal import Decimal, InvalidOperation
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Upper
+
+from document.rubric import RubricDocument, get_rubric
+from utility.parsing import parse_bool
+
+from . import review, rollup
+from .details import DetailsError, clean_details
+from .models import Evaluation, ImportCheckpoint
+
+
+ImportResult = namedtuple('ImportResult', ['records', 'imported', 'failed', 'skipped'])
+
+
+class ImportRowError(ValueError):
+    pass
+
+
+class LookupMaps:
+    """
+    Preloaded maps used to resolve accounts and documents without a query per row.
+
+    Accounts are resolved by account_id, email (case-insensitive) or
+    faculty_id, documents by id or by rubric path (see document.rubric).
+    Given records, only the accounts those records name are loaded, which
+    suits small batches; otherwise every account is.
+    """
+
+    def __init__(self, records=None):
+        self.account_ids = set()
+        self.emails = {}
+        self.faculty_ids = {}
+        accounts = get_user_model().objects.all()
+        if records is not None:
+            records = [record for record in records if isinstance(record, dict)]
+            accounts = accounts.annotate(email_upper=Upper('email')).filter(
+                Q(pk__in=[_int(record.get('account_id')) for record in records if _int(record.get('account_id'))])
+                | Q(email_upper__in=[str(record['email']).strip().upper() for record in records if record.get('email')])
+                | Q(faculty_id__in=[str(record['faculty_id']).strip() for record in records if record.get('faculty_id')])
+            )
+        for pk, email, faculty_id in accounts.values_list('pk', 'email', 'faculty_id').iterator():
+            self.account_ids.add(pk)
+            self.emails[email.lower()] = pk
+            if faculty_id:
+                self.faculty_ids[faculty_id] = pk
+        self.rubric = get_rubric()
+
+    def account(self, record):
+        account_id = str(record.get('account_id') or '').strip()
+        email = (record.get('email') or '').strip()
+        faculty_id = str(record.get('faculty_id') or '').strip()
+        if account_id:
+            if _int(account_id) not in self.account_ids:
+                raise ImportRowError('unknown account_id %r' % account_id)
+            return _int(account_id)
+        if email:
+            if email.lower() not in self.emails:
+                raise ImportRowError('unknown account email %r' % email)
+            return self.emails[email.lower()]
+        if faculty_id:
+            if faculty_id not in self.faculty_ids:
+                raise ImportRowError('unknown faculty_id %r' % faculty_id)
+            return self.faculty_ids[faculty_id]
+        raise ImportRowError('missing account_id, email or faculty_id')
+
+    def document(self, record):
+        document_id = str(record.get('document_id') or '').strip()
+        path = (record.get('document_path') or '').strip()
+        if document_id:
+            try:
+                document = self.rubric.document(int(document_id))
+            except ValueError:
+                raise ImportRowError('invalid document_id %r' % document_id)
+            if document is None:
+                raise ImportRowError('unknown document_id %r' % document_id)
+            return document.id
+        if path:
+            document = self.rubric.find(path)
+            if not isinstance(document, RubricDocument):
+                raise ImportRowError('unknown document_path %r' % path)
+            return document.id
+        raise ImportRowError('missing document_id or document_path')
+
+
+def _int(value):
+    try:
+        return int(str(value).strip())
+    except ValueError:
+        return None
+
+
+def build_evaluation(record, lookups):
+    """
+    Validates a single record and returns an unsaved Evaluation for it.
+    Raises ImportRowError when the record cannot be imported.
+    """
+    if not isinstance(record, dict):
+        raise ImportRowError('record must be an object')
+    try:
+        score = Decimal(str(record.get('score', '')).strip())
+    except InvalidOperation:
+        raise ImportRowError('invalid score %r' % record.get('score'))
+    if not score.is_finite() or abs(score) >= 1000:
+        raise ImportRowError('score %s out of range' % score)
+
+    details = record.get('details') or {}
+    if isinstance(details, str):
+        try:
+            details = json.loads(details)
+        except ValueError:
+            raise ImportRowError('details is not valid JSON')
+    if not isinstance(details, dict):
+        raise ImportRowError('details must be a JSON object')
+    document_id = lookups.document(record)
+    try:
+        details = clean_details(details, lookups.rubric.document(document_id).details_schema)
+    except DetailsError as error:
+        raise ImportRowError(str(error))
+    try:
+        is_active = parse_bool(record.get('is_active'))
+    except ValueError as error:
+        raise ImportRowError(str(error))
+
+    evaluation = Evaluation(
+        account_id=lookups.account(record),
+        document_id=document_id,
+        score=score.quantize(Decimal('0.01')),
+        comment=record.get('comment') or '',
+        details=details,
+        is_active=is_active,
+    )
+    evaluation.sync_details()
+    return evaluation
+
+
+def read_records(path, format=None):
+    """
+    Yields (record_number, record) for every record of a CSV or JSONL file,
+    reading one line at a time.
+    """
+    if format is None:
+        format = 'jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv'
+    with open(path, newline='', encoding='utf-8') as source:
+        if format == 'csv':
+            for number, record in enumerate(csv.DictReader(source), start=1):
+                yield number, record
+        elif format == 'jsonl':
+            number = 0
+            for line in source:
+                if not line.strip():
+                    continue
+                number += 1
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = ImportRowError('invalid JSON')
+                yield number, record
+        else:
+            raise ValueError('Unknown format %r' % format)
+
+
+def _fingerprint(path):
+    stat = os.stat(path)
+    return {'source': os.path.abspath(path), 'size': stat.st_size, 'mtime': stat.st_mtime}
+
+
+def load_checkpoint(checkpoint, path):
+    """
+    Returns the ImportCheckpoint of an earlier run under the same name over
+    the same, unchanged file, or None.
+    """
+    if not checkpoint:
+        return None
+    state = ImportCheckpoint.objects.filter(name=checkpoint).first()
+    fingerprint = _fingerprint(path)
+    if state is None or any(getattr(state, key) != value for key, value in fingerprint.items()):
+        return None
+    return state
+
+
+def save_checkpoint(checkpoint, path, records, imported, failed):
+    ImportCheckpoint.objects.update_or_create(
+        name=checkpoint, defaults=dict(_fingerprint(path), records=records, imported=imported, failed=failed),
+    )
+
+
+def clear_checkpoint(checkpoint):
+    ImportCheckpoint.objects.filter(name=checkpoint).delete()
+
+
+def import_evaluations(path, format=None, chunk_size=1000, dry_run=False, checkpoint=None, on_error=None):
+    """
+    Streams evaluations from a CSV or JSONL file into the database.
+
+    Records are validated against preloaded lookup maps and written with
+    bulk_create, one transaction per chunk; the rollups of every chunk are
+    refreshed in the same transaction. With a checkpoint name, the number of
+    the last record of each chunk is saved to an ImportCheckpoint in that
+    same transaction, so an interrupted import resumes right after the last
+    chunk it committed. on_error(record_number, message) is called for every
+    record that cannot be imported, once its chunk has committed, so a
+    resumed import reports each record once. With dry_run nothing is written.
+    """
+    lookups = LookupMaps()
+    state = load_checkpoint(checkpoint, path) if not dry_run else None
+    skip = state.records if state else 0
+    imported = state.imported if state else 0
+    failed = state.failed if state else 0
+
+    chunk = []
+    errors = []
+    records = 0
+
+    def flush():
+        if not dry_run:
+            with transaction.atomic():
+                Evaluation.objects.bulk_create(chunk)
+                rollup.refresh_totals((evaluation.account_id, evaluation.document_id) for evaluation in chunk)
+                review.enqueue(chunk)
+                if checkpoint:
+                    save_checkpoint(checkpoint, path, records, imported, failed)
+        if on_error is not None:
+            for number, message in errors:
+                on_error(number, message)
+
+    for records, record in read_records(path, format):
+        if records <= skip:
+            continue
+        try:
+            if isinstance(record, Exception):
+                raise record
+            chunk.append(build_evaluation(record, lookups))
+        except ImportRowError as error:
+            failed += 1
+            errors.append((records, str(error)))
+            continue
+        imported += 1
+        if len(chunk) >= chunk_size:
+            flush()
+            chunk = []
+            errors = []
+    if chunk or records > skip:
+        flush()
+    return ImportResult(records=max(records, skip), imported=imported, failed=failed, skipped=skip)
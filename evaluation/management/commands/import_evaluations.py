@@ -0,0 +1,56 @@
+import csv
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from evaluation.importer import clear_checkpoint, import_evaluations, load_checkpoint
+
+
+class Command(BaseCommand):
+    help = 'Streams evaluations from a CSV or JSONL file into the database.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'],
+                            help='Defaults to jsonl for .jsonl/.ndjson files and csv otherwise.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help='Validate every record without writing anything.')
+        parser.add_argument('--checkpoint', help='Name the progress is saved under. Defaults to the absolute PATH.')
+        parser.add_argument('--restart', action='store_true', help='Ignore an existing checkpoint and start over.')
+        parser.add_argument('--errors', help='CSV file the rejected records are written to. Defaults to PATH.errors.csv.')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        checkpoint = options['checkpoint'] or os.path.abspath(path)
+        if options['restart']:
+            clear_checkpoint(checkpoint)
+        # A resumed import adds the errors of the records it has yet to read.
+        try:
+            resuming = not options['dry_run'] and load_checkpoint(checkpoint, path) is not None
+        except OSError as error:
+            raise CommandError(error)
+
+        with open(options['errors'] or path + '.errors.csv', 'a' if resuming else 'w', newline='') as errors:
+            writer = csv.writer(errors)
+
+            def on_error(record, message):
+                writer.writerow([record, message])
+
+            try:
+                result = import_evaluations(
+                    path,
+                    format=options['format'],
+                    chunk_size=options['chunk_size'],
+                    dry_run=options['dry_run'],
+                    checkpoint=checkpoint,
+                    on_error=on_error,
+                )
+            except (OSError, ValueError) as error:
+                raise CommandError(error)
+
+        if result.skipped:
+            self.stdout.write('Resumed after record %d.' % result.skipped)
+        message = '%s %d evaluations, %d rejected, %d records read.' % (
+            'Validated' if options['dry_run'] else 'Imported', result.imported, result.failed, result.records,
+        )
+        self.stdout.write(self.style.SUCCESS(message))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth import get_user_model
+
+from evaluation import rollup
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the per-account evaluation totals and rollups from the raw evaluations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--account', action='append', dest='accounts', metavar='EMAIL',
+                            help='Only rebuild the given account. May be repeated.')
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        account_ids = None
+        if options['accounts']:
+            accounts = dict(get_user_model().objects.filter(email__in=options['accounts']).values_list('email', 'pk'))
+            missing = set(options['accounts']) - set(accounts)
+            if missing:
+                raise CommandError('Unknown account(s): %s' % ', '.join(sorted(missing)))
+            account_ids = list(accounts.values())
+
+        written = rollup.rebuild(account_ids=account_ids, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS('Rebuilt %d evaluation totals.' % written))
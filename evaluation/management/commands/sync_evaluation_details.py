@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+
+from evaluation.models import Evaluation
+
+
+class Command(BaseCommand):
+    help = 'Copies the indexed details keys (institution, year, role) of every evaluation into their columns.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        columns = ['detail_institution', 'detail_year', 'detail_role']
+        batch_size = options['batch_size']
+        last_id = 0
+        updated = 0
+        while True:
+            batch = list(
+                Evaluation.objects.filter(evaluation_id__gt=last_id).order_by('evaluation_id')
+                .only('evaluation_id', 'details', *columns)[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].evaluation_id
+            changed = []
+            for evaluation in batch:
+                before = [getattr(evaluation, column) for column in columns]
+                evaluation.sync_details()
+                if [getattr(evaluation, column) for column in columns] != before:
+                    changed.append(evaluation)
+            Evaluation.objects.bulk_update(changed, columns)
+            updated += len(changed)
+        self.stdout.write(self.style.SUCCESS('Updated %d evaluations.' % updated))
@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from evaluation import review
+from evaluation.models import Evaluation
+
+
+class Command(BaseCommand):
+    help = 'Queues every evaluation that has no review item yet, e.g. after loading data without signals.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        last_id = 0
+        queued = 0
+        while True:
+            batch = list(
+                Evaluation.objects.filter(evaluation_id__gt=last_id, review_item__isnull=True).order_by('evaluation_id')
+                .only('evaluation_id', 'account_id', 'is_active')[:batch_size]
+            )
+            if not batch:
+                break
+            last_id = batch[-1].evaluation_id
+            queued += review.enqueue(batch)
+        self.stdout.write(self.style.SUCCESS('Queued %d evaluations for review.' % queued))
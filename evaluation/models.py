@@ -1,12 +1,27 @@
+import uuid
+
 from django.db import models
 
 from account.models import Account
-from document.models import Document
+from document.models import Document, DocMajorComponent, DocSubMajorComponent, DocCategory
 
 from django.conf import settings
 from django.contrib.auth import get_user_model
 
 
+from .details import details_q, extract
+
+
+class EvaluationQuerySet(models.QuerySet):
+
+    def with_details(self, **lookups):
+        """
+        Filters on keys of details, e.g. with_details(role='Author', year__gte=2020).
+        See evaluation.details.details_q.
+        """
+        return self.filter(details_q(using=self.db, **lookups))
+
+
 # Create your models here.
 class Evaluation(models.Model):
     evaluation_id = models.AutoField(primary_key=True)
@@ -20,8 +35,309 @@ class Evaluation(models.Model):
     comment = models.TextField()
     
     details = models.JSONField()
+
+    # The id a client tool gave the evaluation, making its bulk upserts idempotent.
+    external_id = models.CharField(max_length=100, unique=True, null=True, blank=True)
+
+    # Copies of details keys, kept in sync by save() and sync_details().
+    detail_institution = models.CharField(max_length=255, null=True, blank=True, editable=False)
+    detail_year = models.PositiveSmallIntegerField(null=True, blank=True, editable=False)
+    detail_role = models.CharField(max_length=100, null=True, blank=True, editable=False)
     
     is_active = models.BooleanField(default=True)
+
+    objects = EvaluationQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['detail_institution'], name='evaluation_institution_idx'),
+            models.Index(fields=['detail_year'], name='evaluation_year_idx'),
+            models.Index(fields=['detail_role'], name='evaluation_role_idx'),
+        ]
+    
+    def __str__(self):
+        return self.document.document_name + " : " + self.account.email
+
+    def sync_details(self):
+        """
+        Copies the extracted details keys into their columns. save() does
+        this itself; bulk_create and bulk_update callers must call it.
+        """
+        for column, value in extract(self.details).items():
+            setattr(self, column, value)
+
+    def save(self, *args, **kwargs):
+        self.sync_details()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and 'details' in update_fields:
+            kwargs['update_fields'] = set(update_fields) | {'detail_institution', 'detail_year', 'detail_role'}
+        super().save(*args, **kwargs)
+
+class EvaluationTotal(models.Model):
+    """
+    A model holding the capped points an account has earned on a single document.
+
+    Attributes:
+        evaluationtotal_id (int): The primary key of the total.
+        account (int): The foreign key referencing the AUTH_USER_MODEL.
+        document (int): The foreign key referencing the Document model.
+        docmajor (int): The major component the points were rolled up under.
+        docsubmajor (int): The sub-major component the points were rolled up under.
+        doccategory (int): The category the points were rolled up under.
+        raw_points (Decimal): The sum of the active evaluation scores for the document.
+        points (Decimal): The raw points capped at the document's max_points.
+        date_updated (datetime): The date when the total was last recomputed.
+    """
+    evaluationtotal_id = models.AutoField(primary_key=True)
+    account = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    document = models.ForeignKey(Document, on_delete=models.CASCADE)
+    
+    docmajor = models.ForeignKey(DocMajorComponent, on_delete=models.CASCADE)
+    docsubmajor = models.ForeignKey(DocSubMajorComponent, on_delete=models.CASCADE, null=True, blank=True)
+    doccategory = models.ForeignKey(DocCategory, on_delete=models.CASCADE, null=True, blank=True)
+    
+    raw_points = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    points = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    date_updated = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['account', 'document'], name='unique_evaluationtotal_account_document'),
+        ]
+    
+    def __str__(self):
+        return f'{self.account_id} : {self.document_id} = {self.points}'
+
+
+class EvaluationRollup(models.Model):
+    """
+    A model holding the points an account has earned per major component,
+    sub-major component and category. Rows are maintained incrementally from
+    EvaluationTotal so reading an account's totals never touches Evaluation.
+
+    Attributes:
+        evaluationrollup_id (int): The primary key of the rollup.
+        account (int): The foreign key referencing the AUTH_USER_MODEL.
+        docmajor (int): The foreign key referencing the DocMajorComponent model.
+        docsubmajor (int): The foreign key referencing the DocSubMajorComponent model.
+        doccategory (int): The foreign key referencing the DocCategory model.
+        points (Decimal): The capped points earned in the group.
+        date_updated (datetime): The date when the rollup was last changed.
+    """
+    evaluationrollup_id = models.AutoField(primary_key=True)
+    account = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    
+    docmajor = models.ForeignKey(DocMajorComponent, on_delete=models.CASCADE)
+    docsubmajor = models.ForeignKey(DocSubMajorComponent, on_delete=models.CASCADE, null=True, blank=True)
+    doccategory = models.ForeignKey(DocCategory, on_delete=models.CASCADE, null=True, blank=True)
+    
+    points = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    
+    date_updated = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['account', 'docmajor'], name='evalrollup_account_major_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.account_id} : {self.docmajor_id} = {self.points}'
+
+
+class EvidenceFile(models.Model):
+    """
+    A model representing one stored evidence file. Files are addressed by
+    their content hash, so a file uploaded many times is stored (and
+    classified) once.
+
+    Attributes:
+        evidencefile_id (int): The primary key of the file.
+        content_hash (str): The hash of the content, see evaluation.evidence.
+        size (int): The size of the file in bytes.
+        content_type (str): The content type of the first upload of the file.
+        predictions (list): The documents the classifier matched the file to.
+        date_created (datetime): The date when the file was first stored.
+    """
+    evidencefile_id = models.AutoField(primary_key=True)
+    content_hash = models.CharField(max_length=64, unique=True)
+    size = models.BigIntegerField()
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    
+    predictions = models.JSONField(null=True, blank=True)
+    
+    date_created = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return self.content_hash
+
+
+class Evidence(models.Model):
+    """
+    A model representing a file a faculty member submitted as evidence.
+
+    Attributes:
+        evidence_id (int): The primary key of the evidence.
+        account (int): The foreign key referencing the AUTH_USER_MODEL who uploaded the file.
+        evaluation (int): The foreign key referencing the Evaluation the file supports, if any yet.
+        file (int): The foreign key referencing the stored EvidenceFile.
+        original_name (str): The name of the file as uploaded.
+        date_uploaded (datetime): The date when the upload completed.
+    """
+    evidence_id = models.AutoField(primary_key=True)
+    account = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    evaluation = models.ForeignKey(Evaluation, on_delete=models.SET_NULL, null=True, blank=True, related_name='evidence')
+    file = models.ForeignKey(EvidenceFile, on_delete=models.PROTECT, related_name='evidence')
+    
+    original_name = models.CharField(max_length=255)
+    
+    date_uploaded = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f'{self.original_name} : {self.account_id}'
+
+
+class EvidenceUpload(models.Model):
+    """
+    A model representing an upload in progress. Chunks arrive in order and
+    are appended to a partial file, which is hashed once the last one lands.
+
+    Attributes:
+        upload_id (UUID): The primary key of the upload, used in its URL.
+        account (int): The foreign key referencing the AUTH_USER_MODEL uploading the file.
+        evaluation (int): The foreign key referencing the Evaluation the file will support, if any.
+        original_name (str): The name of the file being uploaded.
+        content_type (str): The content type of the file being uploaded.
+        size (int): The declared size of the file in bytes.
+        chunk_size (int): The size of every chunk but the last.
+        received (int): How many bytes have been received.
+        evidence (int): The foreign key referencing the Evidence created once complete.
+        date_created (datetime): The date when the upload started.
+        date_updated (datetime): The date when the last chunk arrived.
+    """
+    upload_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    account = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    evaluation = models.ForeignKey(Evaluation, on_delete=models.CASCADE, null=True, blank=True)
+    
+    original_name = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True, default='')
+    size = models.BigIntegerField()
+    chunk_size = models.PositiveIntegerField()
+    received = models.BigIntegerField(default=0)
+    
+    evidence = models.OneToOneField(Evidence, on_delete=models.SET_NULL, null=True, blank=True)
+    
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_updated = models.DateTimeField(auto_now=True)
+    
+    @property
+    def is_complete(self):
+        return self.evidence_id is not None
     
     def __str__(self):
-        return self.document.document_name + " : " + self.account.email
\ No newline at end of file
+        return f'{self.original_name} : {self.received}/{self.size}'
+
+
+class ReviewItem(models.Model):
+    """
+    A model representing an evaluation in a review committee's queue.
+    Reviewers claim items under a lease; an item whose lease ran out can be
+    claimed again, so a reviewer who walks away never holds work for long.
+    See evaluation.review.
+
+    Attributes:
+        reviewitem_id (int): The primary key of the item.
+        evaluation (int): The foreign key referencing the Evaluation to review.
+        account (int): The faculty member the evaluation belongs to.
+        college (int): The college of the faculty member when the item was queued.
+        department (int): The department of the faculty member when the item was queued.
+        priority (int): Items with a higher priority are reviewed first.
+        status (str): pending, approved or returned.
+        claimed_by (int): The reviewer holding the lease, if any.
+        lease_token (UUID): The claim holding the lease.
+        lease_expires (datetime): When the lease runs out.
+        claims (int): How many times the item was claimed.
+        completed_by (int): The reviewer who approved or returned the evaluation.
+        note (str): The reviewer's note on the decision.
+        date_queued (datetime): When the item last entered the queue.
+        date_completed (datetime): When the item was approved or returned.
+    """
+    PENDING = 'pending'
+    APPROVED = 'approved'
+    RETURNED = 'returned'
+    STATUSES = (
+        (PENDING, 'Pending'),
+        (APPROVED, 'Approved'),
+        (RETURNED, 'Returned'),
+    )
+
+    reviewitem_id = models.BigAutoField(primary_key=True)
+    evaluation = models.OneToOneField(Evaluation, on_delete=models.CASCADE, related_name='review_item')
+    account = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='+')
+    college = models.ForeignKey('account.College', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    department = models.ForeignKey('account.Department', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+
+    priority = models.SmallIntegerField(default=0)
+    status = models.CharField(max_length=10, choices=STATUSES, default=PENDING)
+
+    claimed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    lease_token = models.UUIDField(null=True, blank=True, editable=False)
+    lease_expires = models.DateTimeField(null=True, blank=True)
+    claims = models.PositiveIntegerField(default=0)
+
+    completed_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    note = models.TextField(blank=True, default='')
+
+    date_queued = models.DateTimeField(auto_now_add=True)
+    date_completed = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        # The queue is read in (-priority, reviewitem_id) order per college,
+        # per department or across colleges; partial indexes over the pending
+        # items keep every page an index range scan.
+        indexes = [
+            models.Index(fields=['-priority', 'reviewitem_id'], name='reviewitem_queue_idx',
+                         condition=models.Q(status='pending')),
+            models.Index(fields=['college', '-priority', 'reviewitem_id'], name='reviewitem_college_queue_idx',
+                         condition=models.Q(status='pending')),
+            models.Index(fields=['college', 'department', '-priority', 'reviewitem_id'], name='reviewitem_dept_queue_idx',
+                         condition=models.Q(status='pending')),
+            models.Index(fields=['lease_token'], name='reviewitem_lease_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.evaluation_id} : {self.status}'
+
+
+class ImportCheckpoint(models.Model):
+    """
+    A model recording how far an import of an evaluations file has committed.
+    It is written in the transaction of each chunk, so a resumed import never
+    writes a committed chunk twice.
+
+    Attributes:
+        importcheckpoint_id (int): The primary key of the checkpoint.
+        name (str): The name the import was run under, by default the file's absolute path.
+        source (str): The absolute path of the file.
+        size (int): The size of the file when the import started.
+        mtime (float): The modification time of the file when the import started.
+        records (int): The number of the last record committed.
+        imported (int): The number of evaluations imported so far.
+        failed (int): The number of records rejected so far.
+        date_updated (datetime): The date when the checkpoint was last written.
+    """
+    importcheckpoint_id = models.AutoField(primary_key=True)
+    name = models.CharField(max_length=255, unique=True)
+
+    source = models.CharField(max_length=255)
+    size = models.BigIntegerField()
+    mtime = models.FloatField()
+
+    records = models.PositiveIntegerField(default=0)
+    imported = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.name} : {self.records}'
@@ -0,0 +1,259 @@
+import math
+import operator
+import threading
+from collections import OrderedDict, defaultdict, namedtuple
+from decimal import Decimal
+
+from account.ranking import get_rank_index
+from document.rubric import get_rubric
+
+from .models import EvaluationTotal
+
+
+# The DP runs over the gap in steps of the finest point value on the rubric,
+# coarsened until the gap spans at most this many steps. Item values are
+# rounded down to a step, so a plan never promises more than it earns.
+MAX_STEPS = 1000
+CENTS = 100
+PLAN_CACHE_SIZE = 1024
+
+PlanItem = namedtuple('PlanItem', ['document_id', 'name', 'path', 'count', 'unit', 'points'])
+PlanOption = namedtuple('PlanOption', ['items', 'count', 'points'])
+RankPlan = namedtuple('RankPlan', [
+    'points', 'current_rank', 'next_rank', 'gap', 'headroom', 'reachable', 'options',
+])
+
+# count items of one document taken together, worth steps on the search's
+# scale and points in real points.
+_Piece = namedtuple('_Piece', ['document', 'count', 'steps', 'points'])
+
+
+def _cents(value):
+    return int(round(float(value) * CENTS))
+
+
+def _headroom(rubric, totals):
+    """
+    Returns [(RubricDocument, points per item, points left)] for every
+    active document that can still earn points. A document earns points per
+    item (per multiplier unit) up to its max_points; a category can earn at
+    most its max_points less what it holds, which also bounds each document.
+    """
+    held = defaultdict(Decimal)
+    for document_id, points in totals:
+        document = rubric.document(document_id)
+        if document is not None:
+            held[(document.docmajor, document.docsubmajor, document.doccategory)] += points
+    categories = defaultdict(float)
+    for major in rubric.roots:
+        for submajor_id, node in _categories(major):
+            categories[(major.id, submajor_id, node.id)] += node.max_points
+
+    totals = dict(totals)
+    open_documents = []
+    for document in rubric.documents():
+        if document.points <= 0:
+            continue
+        left = document.max_points - float(totals.get(document.id, 0))
+        group = (document.docmajor, document.docsubmajor, document.doccategory)
+        if group in categories:
+            left = min(left, categories[group] - float(held[group]))
+        if left > 0:
+            open_documents.append((document, document.points, left))
+    return open_documents
+
+
+def _categories(node, submajor_id=None):
+    """
+    Yields (docsubmajor id, node) for every category node under a node,
+    the grouping the rollups total points by.
+    """
+    for child in node.children:
+        if child.level == 'doccategory':
+            yield submajor_id, child
+        else:
+            yield from _categories(child, child.id if child.level == 'docsubmajor' else submajor_id)
+
+
+def _pieces(open_documents, step, target):
+    """
+    Splits every document's items into pieces of 1, 2, 4, ... items (and
+    the capped last item on its own), so a 0/1 knapsack over the pieces can
+    take any number of a document's items.
+
+    Only items that can be part of a plan with the fewest items are kept:
+    if the k best items are the fewest that reach the target, every item of
+    such a plan is worth at least the target less the k - 1 best, and no
+    document gives more than k of them.
+    """
+    runs = []
+    for document, points, left in open_documents:
+        steps = _cents(points) // step
+        full = int(left // points)
+        rest = left - full * points
+        if full and steps:
+            runs.append((steps, full, document, points))
+        if _cents(rest) // step:
+            runs.append((_cents(rest) // step, 1, document, rest))
+    runs.sort(key=lambda run: (-run[0], run[2].id))
+
+    # The fewest items reaching the target are the best ones; the last of
+    # them only needs to make up what the others leave.
+    fewest, best = 0, 0
+    for steps, count, document, points in runs:
+        if best + steps * count >= target:
+            taken = -(-(target - best) // steps)
+            fewest += taken
+            floor = target - best - (taken - 1) * steps
+            break
+        fewest += count
+        best += steps * count
+    else:
+        return []
+
+    pieces = []
+    for steps, count, document, points in runs:
+        if steps < floor:
+            break
+        count = min(count, fewest)
+        size = 1
+        while count > 0:
+            taken = min(size, count)
+            pieces.append(_Piece(document, taken, taken * steps, taken * points))
+            count -= taken
+            size *= 2
+    return pieces
+
+
+def _search(pieces, target):
+    """
+    Returns the pieces of the plan reaching target steps with the fewest
+    items, or None. dp[v] holds the fewest items gaining exactly v steps,
+    with every gain of target or more folded into dp[target].
+    """
+    infinity = math.inf
+    dp = [0] + [infinity] * target
+    trail = []
+    for piece in pieces:
+        steps, count = piece.steps, piece.count
+        if steps >= target:
+            shifted = [infinity] * target
+            source = min(range(target + 1), key=dp.__getitem__)
+        else:
+            shifted = [infinity] * steps + [items + count for items in dp[:target - steps]]
+            source = min(range(target - steps, target + 1), key=dp.__getitem__)
+        shifted.append(dp[source] + count)
+        taken = list(map(operator.lt, shifted, dp))
+        dp = list(map(min, dp, shifted))
+        trail.append((taken, source))
+
+    if dp[target] == infinity:
+        return None
+    chosen = []
+    v = target
+    for piece, (taken, source) in zip(reversed(pieces), reversed(trail)):
+        if taken[v]:
+            chosen.append(piece)
+            v = source if v == target else v - piece.steps
+    return chosen
+
+
+def _option(chosen):
+    documents = {}
+    counts = defaultdict(int)
+    points = defaultdict(float)
+    for piece in chosen:
+        documents[piece.document.id] = piece.document
+        counts[piece.document.id] += piece.count
+        points[piece.document.id] += piece.points
+    items = sorted(
+        (
+            PlanItem(
+                document.id, document.name, document.path, counts[document.id],
+                document.multiplier_unit if document.has_multiplier else None, points[document.id],
+            )
+            for document in documents.values()
+        ),
+        key=lambda item: (-item.points, item.document_id),
+    )
+    return PlanOption(tuple(items), sum(counts.values()), sum(points.values()))
+
+
+def _plan(rubric, index, totals, limit):
+    points = sum((points for document_id, points in totals), Decimal(0))
+    band = index.resolve(points)
+    if band is not None:
+        following = index.next_band(band)
+    else:
+        following = next((candidate for candidate in index.bands if candidate.minpoints > points), None)
+    current_rank = str(band.facultyrank) if band else None
+    if following is None:
+        return RankPlan(points, current_rank, None, None, 0, False, ())
+
+    gap = float(following.minpoints - points)
+    open_documents = _headroom(rubric, totals)
+    headroom = sum(left for document, value, left in open_documents)
+    plan = RankPlan(points, current_rank, str(following.facultyrank), gap, headroom, headroom >= gap, ())
+    if not plan.reachable:
+        return plan
+
+    # The finest step every point value is a multiple of, then coarser
+    # steps until the gap fits in MAX_STEPS.
+    step = 0
+    for document, value, left in open_documents:
+        step = math.gcd(step, _cents(value), _cents(left - int(left // value) * value))
+    step = max(step, 1)
+    step *= max(1, math.ceil(_cents(gap) / step / MAX_STEPS))
+    target = max(1, math.ceil(_cents(gap) / step))
+
+    # Every option after the first leaves out the main document of the ones
+    # before it, so the options differ in where the points come from.
+    options = []
+    excluded = set()
+    for _ in range(limit):
+        chosen = _search(_pieces([entry for entry in open_documents if entry[0].id not in excluded], step, target), target)
+        if chosen is None:
+            break
+        option = _option(chosen)
+        options.append(option)
+        excluded.add(option.items[0].document_id)
+    return plan._replace(options=tuple(options))
+
+
+# Plans keyed by (rubric version, rank version, totals, limit), least
+# recently used first. Keying on the versions rather than the compiled
+# objects keeps replaced rubrics and indexes from being held alive.
+_plans = OrderedDict()
+_plans_lock = threading.Lock()
+
+
+def _cached_plan(rubric, index, totals, limit):
+    key = (rubric.version, index.version, totals, limit)
+    with _plans_lock:
+        if key in _plans:
+            _plans.move_to_end(key)
+            return _plans[key]
+    plan = _plan(rubric, index, totals, limit)
+    with _plans_lock:
+        _plans[key] = plan
+        if len(_plans) > PLAN_CACHE_SIZE:
+            _plans.popitem(last=False)
+    return plan
+
+
+def plan_next_rank(account, limit=3):
+    """
+    Returns a RankPlan for an account: the points it holds, the rank those
+    points earn, the next rank up and the gap to it, and up to limit
+    options for closing the gap with the fewest items, each a list of
+    PlanItem (document, items to add and the points they earn within the
+    document's cap).
+
+    Plans are memoized per (rubric version, rank version, capped totals), so
+    repeated and identical requests cost the one query for the totals.
+    """
+    account_id = getattr(account, 'pk', account)
+    totals = tuple(sorted(
+        EvaluationTotal.objects.filter(account_id=account_id).values_list('document_id', 'points')
+    ))
+    return _cached_plan(get_rubric(), get_rank_index(), totals, limit)
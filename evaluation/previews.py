@@ -0,0 +1,229 @@
+import os
+import tempfile
+from html import escape
+
+from django.conf import settings
+
+from utility.jobs import enqueue, enqueue_on_commit
+
+from .evidence import file_path
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow (see requirements.txt) images get a stand-in placeholder.
+    Image = None
+
+
+PREVIEW_SIZES = {'thumb': 160, 'preview': 1024}
+
+_EXTENSIONS = ('.jpg', '.svg')
+
+# Where the placeholders of images that cannot be rendered yet are kept, one
+# per file type and size.
+STAND_IN_DIRECTORY = 'stand-in'
+
+
+def preview_root():
+    return getattr(settings, 'EVIDENCE_PREVIEW_ROOT', os.path.join(settings.BASE_DIR, 'media', 'previews'))
+
+
+def preview_sizes():
+    return getattr(settings, 'EVIDENCE_PREVIEW_SIZES', PREVIEW_SIZES)
+
+
+def _cache_path(content_hash, pixels, extension):
+    return os.path.join(preview_root(), content_hash[:2], '%s-%d%s' % (content_hash, pixels, extension))
+
+
+def _stand_in_path(label, pixels):
+    return os.path.join(preview_root(), STAND_IN_DIRECTORY, '%s-%d.svg' % (label, pixels))
+
+
+def _renderable(evidence_file):
+    return evidence_file.content_type.startswith('image/') or not evidence_file.content_type
+
+
+def _label(name, content_type):
+    label = os.path.splitext(name)[1].lstrip('.') or content_type.split('/')[-1]
+    # Stand-ins are named after it, so only letters and digits are kept.
+    return ''.join(character for character in label.upper() if character.isalnum())[:5] or 'FILE'
+
+
+def is_stand_in(path):
+    """
+    Whether a preview is the placeholder served for an image that could not
+    be rendered yet, which clients should not keep.
+    """
+    return os.path.basename(os.path.dirname(path)) == STAND_IN_DIRECTORY
+
+
+def cached_preview(content_hash, pixels, extension):
+    """
+    Returns the path of a cached preview, marking it as recently used, or
+    None. The modification time is the LRU clock: access times are not
+    reliable on filesystems mounted with noatime or relatime.
+    """
+    path = _cache_path(content_hash, pixels, extension)
+    try:
+        os.utime(path)
+    except FileNotFoundError:
+        return None
+    return path
+
+
+def _write(path, write):
+    # Written next to its final name and renamed, so a concurrent request
+    # never serves half a preview; two requests racing on the same preview
+    # only do the work twice.
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    descriptor, partial = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.partial')
+    try:
+        with os.fdopen(descriptor, 'wb') as target:
+            write(target)
+        os.replace(partial, path)
+    except BaseException:
+        os.remove(partial)
+        raise
+    return path
+
+
+def _render_image(source, pixels, target):
+    with Image.open(source) as image:
+        # Lets JPEG decode at a fraction of its size instead of in full.
+        image.draft('RGB', (pixels, pixels))
+        image.thumbnail((pixels, pixels))
+        image.convert('RGB').save(target, 'JPEG', quality=80, optimize=True)
+
+
+def _render_placeholder(label, pixels, target):
+    target.write((
+        '<svg xmlns="http://www.w3.org/2000/svg" width="{0}" height="{0}" viewBox="0 0 100 100">'
+        '<rect x="18" y="8" width="64" height="84" rx="4" fill="#f4f4f5" stroke="#a1a1aa" stroke-width="2"/>'
+        '<text x="50" y="58" font-family="sans-serif" font-size="14" text-anchor="middle" fill="#3f3f46">{1}</text>'
+        '</svg>'
+    ).format(pixels, escape(label)).encode('utf-8'))
+
+
+def render_preview(evidence_file, pixels, name=''):
+    """
+    Renders and caches the preview of an evidence file at most pixels wide
+    and tall, and returns its path. Images become JPEGs; anything else gets
+    a placeholder showing its file type.
+
+    An image that cannot be rendered (Pillow is missing or cannot read it)
+    gets a stand-in placeholder shared by its file type, never cached under
+    the file's hash, so its real preview is rendered once it can be.
+    """
+    source = file_path(evidence_file.content_hash)
+    label = _label(name, evidence_file.content_type)
+    if not _renderable(evidence_file):
+        return _write(
+            _cache_path(evidence_file.content_hash, pixels, '.svg'),
+            lambda target: _render_placeholder(label, pixels, target),
+        )
+    if Image is not None:
+        try:
+            return _write(
+                _cache_path(evidence_file.content_hash, pixels, '.jpg'),
+                lambda target: _render_image(source, pixels, target),
+            )
+        except (OSError, ValueError, Image.DecompressionBombError):
+            # Not an image Pillow can read after all.
+            pass
+    path = _stand_in_path(label, pixels)
+    if not os.path.exists(path):
+        _write(path, lambda target: _render_placeholder(label, pixels, target))
+    return path
+
+
+def get_preview(evidence_file, size='thumb', name=''):
+    """
+    Returns (path, created) for the preview of an evidence file at one of
+    the configured sizes, rendering it on first request.
+    """
+    pixels = preview_sizes()[size]
+    path = cached_preview(evidence_file.content_hash, pixels, '.jpg' if _renderable(evidence_file) else '.svg')
+    if path is not None:
+        return path, False
+    path = render_preview(evidence_file, pixels, name=name)
+    return path, not is_stand_in(path)
+
+
+def warm(evidence, sizes=('thumb',)):
+    """
+    Renders the missing previews of an iterable of Evidence (with their
+    files selected) and returns how many were rendered. Files shared by
+    several Evidence rows are only looked at once.
+    """
+    rendered = 0
+    seen = set()
+    for item in evidence:
+        if item.file_id in seen:
+            continue
+        seen.add(item.file_id)
+        for size in sizes:
+            rendered += get_preview(item.file, size, name=item.original_name)[1]
+    return rendered
+
+
+def warm_on_commit(account_id, sizes=('thumb',)):
+    """
+    Queues the previews of a faculty member's evidence to be rendered once
+    the current transaction commits, e.g. when their submission enters a
+    committee's queue, so reviewers never wait on the first render.
+    """
+    enqueue_on_commit(
+        'evaluation.warm_previews',
+        arguments={'account_id': account_id, 'sizes': list(sizes)},
+        dedupe_key='warm-previews:%s' % account_id,
+    )
+
+
+def evict_later():
+    """
+    Queues one eviction pass, unless one is already waiting.
+    """
+    enqueue('evaluation.evict_previews', dedupe_key='evict-previews')
+
+
+def cache_usage():
+    """
+    Returns a list of (mtime, size, path) for every cached preview.
+    """
+    entries = []
+    root = preview_root()
+    if not os.path.isdir(root):
+        return entries
+    for directory in os.scandir(root):
+        if not directory.is_dir():
+            continue
+        for entry in os.scandir(directory.path):
+            if entry.name.endswith(_EXTENSIONS):
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+    return entries
+
+
+def evict(max_bytes=None, low_water=0.9):
+    """
+    Removes the least recently used previews once the cache is larger than
+    max_bytes, down to low_water of it so the next few renders do not each
+    trigger another pass. Returns (files removed, bytes removed).
+    """
+    if max_bytes is None:
+        max_bytes = getattr(settings, 'EVIDENCE_PREVIEW_CACHE_BYTES', 512 << 20)
+    entries = cache_usage()
+    total = sum(size for _, size, _ in entries)
+    if total <= max_bytes:
+        return 0, 0
+    removed = removed_bytes = 0
+    for _, size, path in sorted(entries):
+        if total - removed_bytes <= max_bytes * low_water:
+            break
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        removed += 1
+        removed_bytes += size
+    return removed, removed_bytes
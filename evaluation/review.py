@@ -0,0 +1,202 @@
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from account.models import CollegeReviewRankingCommittee, FacultyRankHistory
+
+from . import previews
+from .models import ReviewItem
+
+
+# Faculty with a pending rank request are reviewed first.
+PROMOTION_PRIORITY = 10
+
+DECISIONS = (ReviewItem.APPROVED, ReviewItem.RETURNED)
+
+
+class ReviewError(ValueError):
+    pass
+
+
+def lease_seconds():
+    return getattr(settings, 'REVIEW_LEASE_SECONDS', 900)
+
+
+def _priorities(account_ids):
+    promoting = set(
+        FacultyRankHistory.objects.filter(
+            user_id__in=account_ids, is_active=True, is_successful=False, date_of_promotion__isnull=True,
+        ).values_list('user_id', flat=True)
+    )
+    return {account_id: PROMOTION_PRIORITY if account_id in promoting else 0 for account_id in account_ids}
+
+
+def enqueue(evaluations):
+    """
+    Puts the given evaluations in their committee's queue: an evaluation
+    without an item gets one, a reviewed one goes back to pending and the
+    item of an inactive one is dropped while still pending. Items already
+    pending keep their place and their lease. Returns the number of items
+    that entered the queue.
+
+    Saving an evaluation enqueues it (see evaluation.signals); bulk writers
+    call this with the rows they wrote.
+    """
+    evaluations = [evaluation for evaluation in evaluations if evaluation.pk]
+    if not evaluations:
+        return 0
+    existing = {
+        item.evaluation_id: item
+        for item in ReviewItem.objects.filter(evaluation_id__in=[evaluation.pk for evaluation in evaluations])
+    }
+
+    now = timezone.now()
+    created, requeued, dropped = [], [], []
+    for evaluation in evaluations:
+        item = existing.get(evaluation.pk)
+        if not evaluation.is_active:
+            if item is not None and item.status == ReviewItem.PENDING:
+                dropped.append(item.pk)
+        elif item is None:
+            created.append(ReviewItem(evaluation_id=evaluation.pk, account_id=evaluation.account_id))
+        elif item.status != ReviewItem.PENDING:
+            item.account_id = evaluation.account_id
+            requeued.append(item)
+
+    # Only items entering the queue need their place in it worked out.
+    account_ids = {item.account_id for item in created + requeued}
+    accounts = {
+        account_id: (college_id, department_id)
+        for account_id, college_id, department_id in get_user_model().objects.filter(
+            pk__in=account_ids,
+        ).values_list('pk', 'college_id', 'department_id')
+    } if account_ids else {}
+    priorities = _priorities(account_ids) if account_ids else {}
+    for item in created + requeued:
+        item.college_id, item.department_id = accounts.get(item.account_id, (None, None))
+        item.priority = priorities.get(item.account_id, 0)
+        item.status = ReviewItem.PENDING
+        item.completed_by = None
+        item.date_completed = None
+        item.note = ''
+        item.date_queued = now
+
+    with transaction.atomic():
+        # A concurrent save of the same evaluation may have queued it first.
+        ReviewItem.objects.bulk_create(created, ignore_conflicts=True)
+        ReviewItem.objects.bulk_update(requeued, [
+            'account', 'college', 'department', 'priority', 'status', 'completed_by', 'date_completed', 'note', 'date_queued',
+        ])
+        if dropped:
+            ReviewItem.objects.filter(pk__in=dropped, status=ReviewItem.PENDING).delete()
+        for account_id in account_ids:
+            previews.warm_on_commit(account_id)
+    return len(created) + len(requeued)
+
+
+def reviewer_scope(user):
+    """
+    Returns a Q matching the items a reviewer may see: everything for
+    staff, otherwise the colleges (or departments) of their active
+    committee memberships. Reviewers never see their own evaluations.
+    """
+    if user.is_staff:
+        return ~Q(account_id=user.pk)
+    scope = Q(pk__in=[])
+    for college_id, department_id in CollegeReviewRankingCommittee.objects.filter(
+        account=user, is_active=True,
+    ).values_list('college_id', 'department_id'):
+        if department_id is None:
+            scope |= Q(college_id=college_id)
+        else:
+            scope |= Q(college_id=college_id, department_id=department_id)
+    return scope & ~Q(account_id=user.pk)
+
+
+def _free(now):
+    return Q(claimed_by__isnull=True) | Q(lease_expires__lte=now)
+
+
+def queue(user, college=None, department=None, available=False, mine=False):
+    """
+    Returns the pending items a reviewer may see, in review order. With
+    available, only the items nobody holds a live lease on; with mine,
+    only the ones the reviewer holds.
+    """
+    items = ReviewItem.objects.filter(reviewer_scope(user), status=ReviewItem.PENDING)
+    if college:
+        items = items.filter(college_id=college)
+    if department:
+        items = items.filter(department_id=department)
+    if available:
+        items = items.filter(_free(timezone.now()))
+    if mine:
+        items = items.filter(claimed_by=user, lease_expires__gt=timezone.now())
+    return items.order_by('-priority', 'reviewitem_id')
+
+
+def claim(user, count=1, college=None, department=None):
+    """
+    Leases up to count of the next available items to a reviewer for
+    REVIEW_LEASE_SECONDS and returns them. Rows another reviewer is claiming
+    at the same moment are skipped rather than waited for, and the lease is
+    only taken where it is still free, so two reviewers never hold the same
+    item.
+    """
+    now = timezone.now()
+    token = uuid.uuid4()
+    with transaction.atomic():
+        candidates = list(
+            queue(user, college=college, department=department, available=True)
+            .select_for_update(skip_locked=True)
+            .values_list('pk', flat=True)[:count]
+        )
+        if not candidates:
+            return []
+        ReviewItem.objects.filter(_free(now), pk__in=candidates, status=ReviewItem.PENDING).update(
+            claimed_by=user, lease_token=token, lease_expires=now + timedelta(seconds=lease_seconds()),
+            claims=F('claims') + 1,
+        )
+    return list(ReviewItem.objects.filter(lease_token=token).select_related('evaluation').order_by('-priority', 'reviewitem_id'))
+
+
+def _held(user, item_ids, now):
+    return ReviewItem.objects.filter(pk__in=item_ids, claimed_by=user, status=ReviewItem.PENDING, lease_expires__gt=now)
+
+
+def renew(user, item_ids):
+    """
+    Extends the reviewer's live leases on the given items. Returns the
+    number of leases renewed; a lease that already ran out is not revived,
+    since someone else may hold the item by now.
+    """
+    now = timezone.now()
+    return _held(user, item_ids, now).update(lease_expires=now + timedelta(seconds=lease_seconds()))
+
+
+def release(user, item_ids):
+    """
+    Gives the reviewer's leases on the given items back to the queue.
+    """
+    return _held(user, item_ids, timezone.now()).update(claimed_by=None, lease_token=None, lease_expires=None)
+
+
+def complete(user, item_id, decision, note=''):
+    """
+    Records the reviewer's decision (approved or returned) on an item they
+    hold a live lease on.
+    """
+    if decision not in DECISIONS:
+        raise ReviewError('decision must be one of %s' % ', '.join(DECISIONS))
+    now = timezone.now()
+    completed = _held(user, [item_id], now).update(
+        status=decision, completed_by=user, note=note or '', date_completed=now,
+        claimed_by=None, lease_token=None, lease_expires=None,
+    )
+    if not completed:
+        raise ReviewError('you do not hold a lease on item %s' % item_id)
@@ -0,0 +1,273 @@
+from collections import defaultdict, namedtuple
+from decimal import Decimal
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+from django.dispatch import Signal
+from django.db.models import Sum
+from django.utils import timezone
+
+from document.models import Document
+from document.rubric import get_rubric
+
+from .models import Evaluation, EvaluationTotal, EvaluationRollup
+
+
+ZERO = Decimal('0.00')
+
+ComponentTotal = namedtuple('ComponentTotal', ['id', 'name', 'points', 'max_points'])
+
+# Sent once the transaction that changed rollups commits, with the ids of the
+# accounts whose totals changed (None when every account may have changed).
+totals_changed = Signal()
+
+
+def _cap(raw_points, max_points):
+    """
+    Returns the raw points capped at the document's max_points.
+    """
+    cap = Decimal(str(max_points)).quantize(ZERO)
+    return min(raw_points, cap)
+
+
+def _group(document):
+    """
+    Returns the (docmajor, docsubmajor, doccategory) key a document rolls up under.
+    """
+    return (document.docmajor_id, document.docsubmajor_id, document.doccategory_id)
+
+
+def _changed(account_ids):
+    if account_ids is not None:
+        account_ids = set(account_ids)
+        if not account_ids:
+            return
+    transaction.on_commit(lambda: totals_changed.send(sender=EvaluationRollup, account_ids=account_ids))
+
+
+def _total_group(total):
+    return (total.docmajor_id, total.docsubmajor_id, total.doccategory_id)
+
+
+def _apply(deltas):
+    """
+    Adds each delta to the rollup row of its (account_id, docmajor_id,
+    docsubmajor_id, doccategory_id) key, creating rows as needed.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    rollups = {}
+    for row in EvaluationRollup.objects.select_for_update().filter(account_id__in={key[0] for key in deltas}):
+        rollups.setdefault((row.account_id,) + _total_group(row), row)
+
+    now = timezone.now()
+    changed, created = [], []
+    for key, delta in deltas.items():
+        row = rollups.get(key)
+        if row is None:
+            account_id, docmajor_id, docsubmajor_id, doccategory_id = key
+            created.append(EvaluationRollup(
+                account_id=account_id,
+                docmajor_id=docmajor_id,
+                docsubmajor_id=docsubmajor_id,
+                doccategory_id=doccategory_id,
+                points=delta,
+            ))
+        else:
+            row.points += delta
+            row.date_updated = now
+            changed.append(row)
+    EvaluationRollup.objects.bulk_update(changed, ['points', 'date_updated'])
+    EvaluationRollup.objects.bulk_create(created)
+    _changed(key[0] for key in deltas)
+
+
+def refresh_totals(pairs):
+    """
+    Recomputes the capped total of every (account_id, document_id) pair and
+    applies the difference to the rollups. Only the evaluations of the given
+    pairs are read and the number of queries does not grow with the number of
+    pairs, so this is cheap enough to run on every write and after bulk inserts.
+    """
+    pairs = set(pairs)
+    if not pairs:
+        return
+    account_ids = {account_id for account_id, document_id in pairs}
+    document_ids = {document_id for account_id, document_id in pairs}
+
+    with transaction.atomic():
+        totals = {
+            (total.account_id, total.document_id): total
+            for total in EvaluationTotal.objects.select_for_update().filter(
+                account_id__in=account_ids, document_id__in=document_ids
+            )
+        }
+        documents = {
+            document.document_id: document
+            for document in Document.objects.filter(pk__in=document_ids).only(
+                'max_points', 'docmajor_id', 'docsubmajor_id', 'doccategory_id'
+            )
+        }
+        sums = {
+            (row['account_id'], row['document_id']): row['raw_points']
+            for row in Evaluation.objects.filter(account_id__in=account_ids, document_id__in=document_ids, is_active=True)
+            .values('account_id', 'document_id').annotate(raw_points=Sum('score')).order_by()
+        }
+
+        now = timezone.now()
+        deltas = defaultdict(Decimal)
+        changed, created, deleted = [], [], []
+        for account_id, document_id in pairs:
+            total = totals.get((account_id, document_id))
+            document = documents.get(document_id)
+            raw_points = (sums.get((account_id, document_id)) or ZERO) if document is not None else ZERO
+            if total is None and not raw_points:
+                continue
+
+            if total is not None:
+                deltas[(account_id,) + _total_group(total)] -= total.points
+            if not raw_points:
+                deleted.append(total.pk)
+                continue
+
+            points = _cap(raw_points, document.max_points)
+            deltas[(account_id,) + _group(document)] += points
+            if total is None:
+                total = EvaluationTotal(account_id=account_id, document_id=document_id)
+                created.append(total)
+            else:
+                changed.append(total)
+            total.docmajor_id, total.docsubmajor_id, total.doccategory_id = _group(document)
+            total.raw_points = raw_points
+            total.points = points
+            total.date_updated = now
+
+        EvaluationTotal.objects.filter(pk__in=deleted).delete()
+        EvaluationTotal.objects.bulk_update(changed, ['docmajor', 'docsubmajor', 'doccategory', 'raw_points', 'points', 'date_updated'])
+        EvaluationTotal.objects.bulk_create(created)
+        _apply(deltas)
+
+
+def refresh_document(document_id):
+    """
+    Recomputes every total of a document, e.g. after its max_points or its
+    place in the hierarchy changed.
+    """
+    account_ids = set(EvaluationTotal.objects.filter(document_id=document_id).values_list('account_id', flat=True))
+    account_ids.update(Evaluation.objects.filter(document_id=document_id, is_active=True).values_list('account_id', flat=True).distinct())
+    refresh_totals((account_id, document_id) for account_id in account_ids)
+
+
+def forget_document(document_id):
+    """
+    Removes the totals of a document that is about to be deleted from the rollups.
+    """
+    with transaction.atomic():
+        totals = EvaluationTotal.objects.select_for_update().filter(document_id=document_id)
+        deltas = defaultdict(Decimal)
+        for total in totals:
+            deltas[(total.account_id,) + _total_group(total)] -= total.points
+        totals.delete()
+        _apply(deltas)
+
+
+def rebuild(account_ids=None, batch_size=1000):
+    """
+    Rebuilds the totals and rollups from the raw evaluations. Used to repair
+    drift, e.g. after queryset updates that bypass the signals.
+
+    Returns the number of totals written.
+    """
+    documents = {
+        document.document_id: document
+        for document in Document.objects.only('max_points', 'docmajor_id', 'docsubmajor_id', 'doccategory_id')
+    }
+    evaluations = Evaluation.objects.filter(is_active=True)
+    if account_ids is not None:
+        evaluations = evaluations.filter(account_id__in=account_ids)
+    sums = evaluations.values('account_id', 'document_id').annotate(raw_points=Sum('score')).order_by()
+
+    written = 0
+    rollups = defaultdict(Decimal)
+    with transaction.atomic():
+        totals = EvaluationTotal.objects.all()
+        stale = EvaluationRollup.objects.all()
+        if account_ids is not None:
+            totals = totals.filter(account_id__in=account_ids)
+            stale = stale.filter(account_id__in=account_ids)
+        totals.delete()
+        stale.delete()
+
+        batch = []
+        for row in sums.iterator(chunk_size=batch_size):
+            if not row['raw_points']:
+                continue
+            document = documents[row['document_id']]
+            points = _cap(row['raw_points'], document.max_points)
+            group = _group(document)
+            rollups[(row['account_id'],) + group] += points
+            batch.append(EvaluationTotal(
+                account_id=row['account_id'],
+                document_id=row['document_id'],
+                docmajor_id=group[0],
+                docsubmajor_id=group[1],
+                doccategory_id=group[2],
+                raw_points=row['raw_points'],
+                points=points,
+            ))
+            if len(batch) >= batch_size:
+                EvaluationTotal.objects.bulk_create(batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            EvaluationTotal.objects.bulk_create(batch)
+            written += len(batch)
+
+        EvaluationRollup.objects.bulk_create(
+            (
+                EvaluationRollup(
+                    account_id=account_id,
+                    docmajor_id=docmajor_id,
+                    docsubmajor_id=docsubmajor_id,
+                    doccategory_id=doccategory_id,
+                    points=points,
+                )
+                for (account_id, docmajor_id, docsubmajor_id, doccategory_id), points in rollups.items()
+            ),
+            batch_size=batch_size,
+        )
+        _changed(account_ids)
+    return written
+
+
+def _component_totals(points, rubric):
+    return [
+        ComponentTotal(major.id, major.name, points.get(major.id) or ZERO, major.max_points)
+        for major in rubric.roots
+        if major.is_active
+    ]
+
+
+def _account_points(account):
+    return (
+        EvaluationRollup.objects.filter(account=account)
+        .values('docmajor_id').annotate(total=Sum('points')).order_by()
+        .values_list('docmajor_id', 'total')
+    )
+
+
+def get_account_totals(account):
+    """
+    Returns a ComponentTotal for every active major component, in id order,
+    read from the rollups of the given account.
+    """
+    return _component_totals(dict(_account_points(account)), get_rubric())
+
+
+async def aget_account_totals(account):
+    """
+    The async version of get_account_totals.
+    """
+    points = {docmajor_id: total async for docmajor_id, total in _account_points(account)}
+    return _component_totals(points, await sync_to_async(get_rubric)())
@@ -0,0 +1,117 @@
+import threading
+
+from django.conf import settings
+from django.db import connections
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete, post_migrate
+from django.dispatch import receiver
+
+from document.models import Document
+
+from . import review, rollup
+from .models import Evaluation
+
+
+# Accounts and documents whose deletion is cascading to their evaluations.
+# Their totals go away with them, so those evaluations need no refresh.
+_deleting = threading.local()
+
+
+def _cascading():
+    if not hasattr(_deleting, 'keys'):
+        _deleting.keys = set()
+    return _deleting.keys
+
+
+def is_cascading(evaluation):
+    """
+    Returns True when the evaluation is being deleted along with its account or document.
+    """
+    keys = _cascading()
+    return ('account', evaluation.account_id) in keys or ('document', evaluation.document_id) in keys
+
+
+@receiver(pre_delete, sender=settings.AUTH_USER_MODEL)
+def account_deleting(sender, instance, **kwargs):
+    _cascading().add(('account', instance.pk))
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def account_deleted(sender, instance, **kwargs):
+    _cascading().discard(('account', instance.pk))
+
+
+@receiver(pre_save, sender=Evaluation)
+def remember_evaluation(sender, instance, **kwargs):
+    """
+    Remembers the account and document an existing evaluation was counted under.
+    """
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = Evaluation.objects.filter(pk=instance.pk).values_list('account_id', 'document_id').first()
+
+
+@receiver(post_save, sender=Evaluation)
+def rollup_saved_evaluation(sender, instance, **kwargs):
+    pairs = {(instance.account_id, instance.document_id)}
+    if getattr(instance, '_rollup_previous', None):
+        pairs.add(instance._rollup_previous)
+    rollup.refresh_totals(pairs)
+
+
+@receiver(post_save, sender=Evaluation)
+def queue_saved_evaluation(sender, instance, **kwargs):
+    review.enqueue([instance])
+
+
+@receiver(post_delete, sender=Evaluation)
+def rollup_deleted_evaluation(sender, instance, **kwargs):
+    if not is_cascading(instance):
+        rollup.refresh_totals([(instance.account_id, instance.document_id)])
+
+
+@receiver(pre_save, sender=Document)
+def remember_document(sender, instance, **kwargs):
+    """
+    Remembers the cap and hierarchy an existing document was rolled up with.
+    """
+    instance._rollup_previous = None
+    if instance.pk:
+        instance._rollup_previous = Document.objects.filter(pk=instance.pk).values_list(
+            'max_points', 'docmajor_id', 'docsubmajor_id', 'doccategory_id'
+        ).first()
+
+
+@receiver(post_save, sender=Document)
+def rollup_saved_document(sender, instance, created, **kwargs):
+    previous = getattr(instance, '_rollup_previous', None)
+    current = (instance.max_points, instance.docmajor_id, instance.docsubmajor_id, instance.doccategory_id)
+    if previous is not None and previous != current:
+        rollup.refresh_document(instance.pk)
+
+
+@receiver(pre_delete, sender=Document)
+def rollup_deleting_document(sender, instance, **kwargs):
+    _cascading().add(('document', instance.pk))
+    rollup.forget_document(instance.pk)
+
+
+@receiver(post_delete, sender=Document)
+def rollup_deleted_document(sender, instance, **kwargs):
+    _cascading().discard(('document', instance.pk))
+
+
+@receiver(post_migrate)
+def create_details_index(sender, using='default', **kwargs):
+    """
+    Creates the GIN index serving containment filters on Evaluation.details.
+    It is PostgreSQL only, so it lives here rather than in Meta.indexes,
+    where it would break migrations on other databases.
+    """
+    connection = connections[using]
+    if sender.name != 'evaluation' or connection.vendor != 'postgresql':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'CREATE INDEX IF NOT EXISTS evaluation_details_gin ON %s USING gin (details jsonb_path_ops)'
+            % connection.ops.quote_name(Evaluation._meta.db_table)
+        )
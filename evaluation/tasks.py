@@ -0,0 +1,64 @@
+import os
+
+from utility.jobs import set_progress, task
+
+from ml.classifier import Model
+from ml.extract import extract_text
+
+from . import previews, rollup
+from .evidence import file_path
+from .importer import import_evaluations
+from .models import Evidence, EvidenceFile
+
+
+@task('evaluation.rebuild_rollups', max_attempts=1)
+def rebuild_rollups(job, account_ids=None, batch_size=1000):
+    return {'totals': rollup.rebuild(account_ids=account_ids, batch_size=batch_size)}
+
+
+@task('evaluation.refresh_totals', priority=10)
+def refresh_totals(job, pairs):
+    rollup.refresh_totals([tuple(pair) for pair in pairs])
+
+
+@task('evaluation.import_evaluations')
+def import_file(job, path, format=None, chunk_size=1000, dry_run=False):
+    # The checkpoint lets a retried attempt resume after the last chunk.
+    set_progress(job, 0, 'Importing %s' % path)
+    result = import_evaluations(path, format=format, chunk_size=chunk_size, dry_run=dry_run,
+                                checkpoint=os.path.abspath(path))
+    return result._asdict()
+
+
+@task('evaluation.classify_evidence')
+def classify_evidence(job, evidencefile_id, name=''):
+    evidence_file = EvidenceFile.objects.get(pk=evidencefile_id)
+    try:
+        model = Model()
+    except FileNotFoundError:
+        return {'skipped': 'There is no trained classifier.'}
+    try:
+        predictions = model.predict(extract_text(file_path(evidence_file.content_hash), name=name))
+    finally:
+        model.close()
+    predictions = [{'document_id': document_id, 'score': score} for document_id, score in predictions]
+    EvidenceFile.objects.filter(pk=evidencefile_id).update(predictions=predictions)
+    return {'predictions': predictions}
+
+
+@task('evaluation.warm_previews', priority=-10)
+def warm_previews(job, account_id=None, evidence_ids=None, sizes=('thumb',)):
+    evidence = Evidence.objects.select_related('file').order_by('evidence_id')
+    if account_id is not None:
+        evidence = evidence.filter(account_id=account_id)
+    if evidence_ids is not None:
+        evidence = evidence.filter(evidence_id__in=evidence_ids)
+    rendered = previews.warm(evidence.iterator(), sizes=sizes)
+    removed, removed_bytes = previews.evict()
+    return {'rendered': rendered, 'evicted': removed, 'evicted_bytes': removed_bytes}
+
+
+@task('evaluation.evict_previews', max_attempts=1, priority=-10)
+def evict_previews(job):
+    removed, removed_bytes = previews.evict()
+    return {'evicted': removed, 'evicted_bytes': removed_bytes}
@@ -1,3 +1,406 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import random
+import shutil
+import tempfile
+from datetime import timedelta
+from decimal import Decimal
 
-# Create your tests here.
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from account.models import (
+    Account, College, CollegeReviewRankingCommittee, CollegeReviewRankingCommitteeRole, FacultyRank, Rank, SalaryGrade,
+)
+from account.ranking import RankBand, RankIndex
+from document.models import DocMajorComponent, Document
+from document.rubric import Rubric, RubricDocument
+from utility import versioning
+
+from . import planner, review, rollup
+from .evidence import UploadError, file_path, receive_chunk
+from .importer import import_evaluations, load_checkpoint
+from .models import Evaluation, EvaluationRollup, EvaluationTotal, EvidenceFile, ImportCheckpoint, ReviewItem
+
+
+class RollupTests(TestCase):
+
+    def setUp(self):
+        self.first = Account.objects.create_user(email='first@plm.edu.ph', password='pw')
+        self.second = Account.objects.create_user(email='second@plm.edu.ph', password='pw')
+        self.major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        self.other_major = DocMajorComponent.objects.create(docmajorcomponent_name='Professional Services')
+        self.diploma = Document.objects.create(docmajor=self.major, document_name='Diploma', points=10, max_points=25)
+        self.award = Document.objects.create(docmajor=self.major, document_name='Award', points=5, max_points=10)
+
+    def _evaluate(self, account, document, score):
+        return Evaluation.objects.create(account=account, document=document, score=score, comment='', details={})
+
+    def _state(self):
+        totals = set(EvaluationTotal.objects.values_list('account_id', 'document_id', 'raw_points', 'points'))
+        rollups = set(EvaluationRollup.objects.exclude(points=0).values_list('account_id', 'docmajor_id', 'points'))
+        return totals, rollups
+
+    def assertMatchesRebuild(self):
+        incremental = self._state()
+        rollup.rebuild()
+        self.assertEqual(incremental, self._state())
+
+    def test_points_are_capped_per_document(self):
+        for score in (10, 10, 10):
+            self._evaluate(self.first, self.diploma, score)
+        self._evaluate(self.first, self.award, 5)
+        total = EvaluationTotal.objects.get(account=self.first, document=self.diploma)
+        self.assertEqual((total.raw_points, total.points), (30, 25))
+        self.assertEqual([item.points for item in rollup.get_account_totals(self.first)], [30, 0])
+        self.assertMatchesRebuild()
+
+    def test_changes_move_points_incrementally(self):
+        evaluation = self._evaluate(self.first, self.diploma, 10)
+        self._evaluate(self.second, self.award, 5)
+
+        evaluation.account = self.second
+        evaluation.save()
+        self.assertFalse(EvaluationTotal.objects.filter(account=self.first, points__gt=0).exists())
+        self.assertMatchesRebuild()
+
+        evaluation.is_active = False
+        evaluation.save()
+        self.assertMatchesRebuild()
+
+        evaluation.is_active = True
+        evaluation.save()
+        evaluation.delete()
+        self.assertMatchesRebuild()
+
+    def test_document_changes_refresh_totals(self):
+        for score in (10, 10):
+            self._evaluate(self.first, self.diploma, score)
+        self.diploma.max_points = 15
+        self.diploma.save()
+        self.assertEqual(EvaluationTotal.objects.get(document=self.diploma).points, 15)
+
+        self.diploma.docmajor = self.other_major
+        self.diploma.save()
+        self.assertEqual([item.points for item in rollup.get_account_totals(self.first)], [0, 15])
+        self.assertMatchesRebuild()
+
+        self.diploma.delete()
+        self.assertEqual(self._state(), (set(), set()))
+
+
+class ReviewQueueTests(TestCase):
+
+    def setUp(self):
+        self.college = College.objects.create(college_name='Engineering', college_abbreviation='CET')
+        self.faculty = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw', college=self.college)
+        role = CollegeReviewRankingCommitteeRole.objects.create(role_name='Member')
+        self.first = Account.objects.create_user(email='first@plm.edu.ph', password='pw')
+        self.second = Account.objects.create_user(email='second@plm.edu.ph', password='pw')
+        for reviewer in (self.first, self.second):
+            CollegeReviewRankingCommittee.objects.create(account=reviewer, role=role, college=self.college)
+        major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        self.document = Document.objects.create(docmajor=major, document_name='Diploma', points=10, max_points=25)
+        self.evaluations = [
+            Evaluation.objects.create(account=self.faculty, document=self.document, score=score, comment='', details={})
+            for score in range(4)
+        ]
+
+    def _expire(self, items):
+        ReviewItem.objects.filter(pk__in=[item.pk for item in items]).update(
+            lease_expires=timezone.now() - timedelta(seconds=1),
+        )
+
+    def test_saved_evaluations_are_queued(self):
+        items = ReviewItem.objects.filter(status=ReviewItem.PENDING, college=self.college)
+        self.assertEqual(items.count(), len(self.evaluations))
+
+    def test_claims_never_share_items(self):
+        first = review.claim(self.first, count=3)
+        second = review.claim(self.second, count=3)
+        self.assertEqual(len(first), 3)
+        self.assertEqual(len(second), 1)
+        self.assertFalse({item.pk for item in first} & {item.pk for item in second})
+        self.assertFalse(review.queue(self.first, available=True).exists())
+
+    def test_expired_lease_can_be_claimed_again(self):
+        claimed = review.claim(self.first, count=4)
+        self._expire(claimed)
+        self.assertEqual(review.renew(self.first, [item.pk for item in claimed]), 0)
+
+        reclaimed = review.claim(self.second, count=4)
+        self.assertEqual({item.pk for item in reclaimed}, {item.pk for item in claimed})
+        self.assertTrue(all(item.claimed_by_id == self.second.pk and item.claims == 2 for item in reclaimed))
+
+    def test_complete_needs_a_live_lease(self):
+        item, = review.claim(self.first)
+        review.complete(self.first, item.pk, ReviewItem.APPROVED, note='Complete.')
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.completed_by_id, item.claimed_by_id), (ReviewItem.APPROVED, self.first.pk, None))
+
+        item, = review.claim(self.first)
+        self._expire([item])
+        self.client.force_login(self.first)
+        response = self.client.post(
+            '/api/reviews/%d/complete/' % item.pk, {'decision': ReviewItem.APPROVED}, content_type='application/json',
+        )
+        self.assertEqual(response.status_code, 409)
+        item.refresh_from_db()
+        self.assertEqual(item.status, ReviewItem.PENDING)
+
+    def test_changed_evaluation_is_queued_again(self):
+        item, = review.claim(self.first)
+        review.complete(self.first, item.pk, ReviewItem.RETURNED, note='Missing the diploma.')
+
+        evaluation = item.evaluation
+        evaluation.score = 9
+        evaluation.save()
+        item.refresh_from_db()
+        self.assertEqual((item.status, item.completed_by_id, item.note), (ReviewItem.PENDING, None, ''))
+
+        evaluation.is_active = False
+        evaluation.save()
+        self.assertFalse(ReviewItem.objects.filter(pk=item.pk).exists())
+
+
+class EvidenceUploadTests(TestCase):
+    content = b'0123456789'
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings = override_settings(EVIDENCE_ROOT=root, EVIDENCE_CHUNK_SIZE=4)
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.account = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw')
+        self.client.force_login(self.account)
+
+    def _start(self, **fields):
+        fields = dict({'name': 'diploma.pdf', 'size': len(self.content), 'content_type': 'application/pdf'}, **fields)
+        return self.client.post('/evaluation/evidence/uploads/', fields)
+
+    def _put(self, url, start, data):
+        return self.client.put(
+            url, data, content_type='application/octet-stream',
+            HTTP_CONTENT_RANGE='bytes %d-%d/%d' % (start, start + len(data) - 1, len(self.content)),
+        )
+
+    def _upload(self):
+        state = self._start().json()
+        for start in range(0, len(self.content), 4):
+            state = self._put(state['url'], start, self.content[start:start + 4]).json()
+        return state
+
+    def test_bad_fields_are_rejected(self):
+        for fields in ({'size': 'ten'}, {'evaluation': 'abc'}, {'size': 0}):
+            response = self._start(**fields)
+            self.assertEqual(response.status_code, 400)
+            self.assertNotIn('invalid literal', response.json()['error'])
+        self.assertEqual(self._start(evaluation=999).status_code, 404)
+
+    def test_cut_off_chunk_is_resumed(self):
+        state = self._start().json()
+        self._put(state['url'], 0, self.content[:4])
+        with self.assertRaises(UploadError):
+            receive_chunk(state['upload_id'], self.account, 4, 4, io.BytesIO(self.content[4:6]))
+        state = self.client.get(state['url']).json()
+        self.assertEqual(state['received'], 4)
+
+        for start in (4, 8):
+            state = self._put(state['url'], start, self.content[start:start + 4]).json()
+        self.assertTrue(state['complete'])
+        self.assertEqual(state['content_hash'], hashlib.sha256(self.content).hexdigest())
+        with open(file_path(state['content_hash']), 'rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_chunk_at_wrong_offset_conflicts(self):
+        state = self._start().json()
+        self._put(state['url'], 0, self.content[:4])
+        for start in (0, 8):
+            response = self._put(state['url'], start, self.content[start:start + 4])
+            self.assertEqual((response.status_code, response.json()['received']), (409, 4))
+
+    def test_same_content_is_stored_once(self):
+        first, second = self._upload(), self._upload()
+        self.assertNotEqual(first['evidence_id'], second['evidence_id'])
+        self.assertEqual(first['content_hash'], second['content_hash'])
+        self.assertEqual(EvidenceFile.objects.count(), 1)
+
+
+def _rubric_document(document_id, points, max_points):
+    return RubricDocument(
+        id=document_id, name='Document %d' % document_id, description='', path='document-%d' % document_id,
+        points=points, max_points=max_points, has_multiplier=False, multiplier_unit=None, details_schema={},
+        is_active=True, docmajor=1, docsubmajor=None, docminor=None, docsubminor=None, doccategory=None,
+        doccriteria=None, docsubcriteria=None,
+    )
+
+
+class PlannerTests(TestCase):
+
+    def _plan(self, documents, held, bands, limit=3):
+        rubric = Rubric(1, (), {document.id: document for document in documents}, {})
+        totals = tuple(sorted((document_id, Decimal(points)) for document_id, points in held.items()))
+        return planner._plan(rubric, RankIndex(bands, version=1), totals, limit)
+
+    def test_pruned_search_finds_the_fewest_items(self):
+        generator = random.Random(25)
+        for _ in range(200):
+            documents = []
+            for document_id in range(1, generator.randint(1, 6) + 1):
+                points = generator.randint(1, 9)
+                max_points = points * generator.randint(1, 6) + generator.randint(0, points - 1)
+                documents.append(_rubric_document(document_id, points, max_points))
+            held = {document.id: generator.randint(0, document.max_points) for document in documents}
+            rubric = Rubric(1, (), {document.id: document for document in documents}, {})
+            open_documents = planner._headroom(rubric, tuple(held.items()))
+            target = generator.randint(1, 40)
+
+            # Every item as a piece of its own, with nothing left out.
+            items = []
+            for document, points, left in open_documents:
+                full = int(left // points)
+                items += [planner._Piece(document, 1, points, points)] * full
+                if left - full * points:
+                    items.append(planner._Piece(document, 1, int(left - full * points), left - full * points))
+
+            pruned = planner._search(planner._pieces(open_documents, planner.CENTS, target), target)
+            unpruned = planner._search(items, target)
+            self.assertEqual(pruned is None, unpruned is None)
+            if pruned is not None:
+                self.assertEqual(sum(piece.count for piece in pruned), sum(piece.count for piece in unpruned))
+                self.assertGreaterEqual(sum(piece.steps for piece in pruned), target)
+
+    def test_plan_stays_within_document_caps(self):
+        documents = [_rubric_document(1, 10, 25), _rubric_document(2, 3, 9)]
+        bands = [RankBand(0, 9, 'Instructor 1', None), RankBand(10, 39, 'Instructor 2', None), RankBand(40, 99, 'Instructor 3', None)]
+        plan = self._plan(documents, {1: 10}, bands)
+        self.assertEqual((plan.current_rank, plan.next_rank, plan.gap, plan.headroom), ('Instructor 2', 'Instructor 3', 30, 24))
+        self.assertFalse(plan.reachable)
+        self.assertEqual(plan.options, ())
+
+        bands = [RankBand(0, 9, 'Instructor 1', None), RankBand(10, 29, 'Instructor 2', None), RankBand(30, 99, 'Instructor 3', None)]
+        plan = self._plan(documents, {1: 10}, bands)
+        best = plan.options[0]
+        self.assertEqual((best.count, best.points), (4, 21))
+        self.assertEqual([(item.document_id, item.count, item.points) for item in best.items], [(1, 2, 15), (2, 2, 6)])
+
+    def test_points_in_a_gap_plan_for_the_band_above(self):
+        documents = [_rubric_document(1, 5, 50)]
+        bands = [RankBand(0, 9, 'Instructor 1', None), RankBand(20, 39, 'Instructor 2', None)]
+        plan = self._plan(documents, {1: 15}, bands)
+        self.assertEqual((plan.current_rank, plan.next_rank, plan.gap), (None, 'Instructor 2', 5))
+        self.assertEqual(plan.options[0].count, 1)
+
+    def test_top_rank_has_nothing_to_plan(self):
+        bands = [RankBand(0, 9, 'Instructor 1', None), RankBand(10, 99, 'Professor 1', None)]
+        plan = self._plan([_rubric_document(1, 5, 50)], {1: 25}, bands)
+        self.assertEqual((plan.current_rank, plan.next_rank, plan.reachable, plan.options), ('Professor 1', None, False, ()))
+
+    def test_repeated_plan_costs_only_the_totals_query(self):
+        account = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw')
+        major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        document = Document.objects.create(docmajor=major, document_name='Diploma', points=10, max_points=25)
+        Evaluation.objects.create(account=account, document=document, score=10, comment='', details={})
+        grade = SalaryGrade.objects.create(salarygrade_tier='12', salary_grade_value=0)
+        for name, minpoints, maxpoints in (('Instructor', 0, 14), ('Assistant Professor', 15, 99)):
+            FacultyRank.objects.create(
+                rank=Rank.objects.create(rank_name=name), salarygrade=grade, facultyrank_description=name,
+                minpoints=minpoints, maxpoints=maxpoints,
+            )
+
+        token = versioning.begin()
+        self.addCleanup(versioning.end, token)
+        plan = planner.plan_next_rank(account)
+        self.assertEqual((plan.gap, plan.options[0].count), (5, 1))
+        with self.assertNumQueries(1):
+            self.assertEqual(planner.plan_next_rank(account), plan)
+
+
+class Interrupted(Exception):
+    pass
+
+
+class ImporterTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.account = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw', faculty_id='F-1')
+        major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        self.document = Document.objects.create(docmajor=major, document_name='Diploma', points=10, max_points=25)
+
+    def _file(self, name, content):
+        path = os.path.join(self.directory, name)
+        with open(path, 'w', encoding='utf-8') as target:
+            target.write(content)
+        return path
+
+    def _jsonl(self, records):
+        return self._file('evaluations.jsonl', ''.join(json.dumps(record) + '\n' for record in records))
+
+    def _record(self, score, **fields):
+        return dict({'account_id': self.account.pk, 'document_id': self.document.pk, 'score': score}, **fields)
+
+    def test_csv_rows_are_resolved_and_refreshed(self):
+        path = self._file('evaluations.csv', (
+            'email,faculty_id,document_path,score,comment,details,is_active\n'
+            'FACULTY@plm.edu.ph,,academic/diploma,10,Master\'s,,yes\n'
+            ',F-1,academic/diploma,20,,{},no\n'
+            ',F-2,academic/diploma,5,,,\n'
+        ))
+        errors = []
+        result = import_evaluations(path, on_error=lambda number, message: errors.append((number, message)))
+        self.assertEqual(result, (3, 2, 1, 0))
+        self.assertEqual(errors, [(3, "unknown faculty_id 'F-2'")])
+        self.assertEqual(
+            sorted(Evaluation.objects.values_list('score', 'comment', 'is_active')),
+            [(10, "Master's", True), (20, '', False)],
+        )
+        self.assertEqual(EvaluationTotal.objects.get(account=self.account, document=self.document).points, 10)
+        self.assertEqual(ReviewItem.objects.filter(status=ReviewItem.PENDING).count(), 1)
+
+    def test_jsonl_reports_bad_rows(self):
+        path = self._file('evaluations.jsonl', '\n'.join([
+            json.dumps(self._record(10)),
+            '{not json',
+            '',
+            json.dumps(self._record('ten')),
+            json.dumps(self._record(5, document_id=999)),
+            json.dumps(self._record(5, is_active='maybe')),
+        ]))
+        errors = []
+        result = import_evaluations(path, on_error=lambda number, message: errors.append((number, message)))
+        self.assertEqual(result, (5, 1, 4, 0))
+        self.assertEqual([number for number, message in errors], [2, 3, 4, 5])
+        self.assertEqual(errors[0][1], 'invalid JSON')
+
+    def test_interrupted_import_resumes_after_committed_chunk(self):
+        path = self._jsonl([self._record(1), self._record('x'), self._record(3), self._record(4), self._record(5)])
+
+        def interrupt(number, message):
+            raise Interrupted()
+
+        with self.assertRaises(Interrupted):
+            import_evaluations(path, chunk_size=2, checkpoint='nightly', on_error=interrupt)
+        self.assertEqual(sorted(Evaluation.objects.values_list('score', flat=True)), [1, 3])
+        self.assertEqual(ImportCheckpoint.objects.get(name='nightly').records, 3)
+
+        errors = []
+        result = import_evaluations(path, chunk_size=2, checkpoint='nightly', on_error=lambda *error: errors.append(error))
+        self.assertEqual(result, (5, 4, 1, 3))
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(Evaluation.objects.values_list('score', flat=True)), [1, 3, 4, 5])
+        self.assertEqual(EvaluationTotal.objects.get(account=self.account, document=self.document).points, 13)
+
+    def test_changed_file_starts_over(self):
+        path = self._jsonl([self._record(1), self._record(2)])
+        import_evaluations(path, checkpoint='nightly')
+        self.assertIsNotNone(load_checkpoint('nightly', path))
+
+        path = self._jsonl([self._record(1), self._record(2), self._record(3)])
+        self.assertIsNone(load_checkpoint('nightly', path))
+        self.assertEqual(import_evaluations(path, checkpoint='nightly'), (3, 3, 0, 0))
+        self.assertEqual(Evaluation.objects.count(), 5)
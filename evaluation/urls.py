@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = "evaluation"
+
+
+urlpatterns = [
+    path('evidence/uploads/', views.evidence_uploads, name="evidence_uploads"),
+    path('evidence/uploads/<uuid:upload_id>/', views.evidence_upload, name="evidence_upload"),
+    path('evidence/<int:evidence_id>/preview/<slug:size>/', views.evidence_preview, name="evidence_preview"),
+]
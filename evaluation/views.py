@@ -1,3 +1,126 @@
-from django.shortcuts import render
+import re
 
-# Create your views here.
+from django.contrib.auth.decorators import login_required
+from django.http import FileResponse, Http404, HttpResponseNotModified, JsonResponse
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
+
+from . import previews
+from .evidence import UploadError, UploadOffsetError, receive_chunk, start_upload
+from .models import Evaluation, Evidence, EvidenceUpload
+
+_CONTENT_RANGE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+
+def _state(upload):
+    evidence = upload.evidence
+    return {
+        'upload_id': str(upload.upload_id),
+        'url': reverse('evaluation:evidence_upload', args=[upload.upload_id]),
+        'original_name': upload.original_name,
+        'size': upload.size,
+        'chunk_size': upload.chunk_size,
+        'received': upload.received,
+        'complete': upload.is_complete,
+        'evidence_id': evidence.pk if evidence else None,
+        'content_hash': evidence.file.content_hash if evidence else None,
+    }
+
+
+def _int_field(data, name, default=None):
+    value = data.get(name, '')
+    if value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise UploadError('%s must be a whole number.' % name.capitalize())
+
+
+@login_required
+@require_POST
+def evidence_uploads(request):
+    """
+    Starts a chunked upload from the name, size and content_type fields
+    (and optionally the evaluation it supports) and returns its state,
+    including the URL to PUT the chunks to.
+    """
+    try:
+        size = _int_field(request.POST, 'size', 0)
+        evaluation_id = _int_field(request.POST, 'evaluation')
+        evaluation = None
+        if evaluation_id is not None:
+            evaluation = get_object_or_404(Evaluation, pk=evaluation_id, account=request.user)
+        upload = start_upload(
+            request.user,
+            request.POST.get('name', ''),
+            size,
+            content_type=request.POST.get('content_type', ''),
+            evaluation=evaluation,
+        )
+    except UploadError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(_state(upload), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'PUT'])
+def evidence_upload(request, upload_id):
+    """
+    GET returns the state of an upload, so an interrupted client knows where
+    to resume. PUT sends the next chunk as the raw body with a Content-Range
+    header; the body is streamed to disk, never held in memory.
+    """
+    if request.method == 'GET':
+        upload = get_object_or_404(EvidenceUpload.objects.select_related('evidence__file'), upload_id=upload_id, account=request.user)
+        return JsonResponse(_state(upload))
+
+    match = _CONTENT_RANGE.match(request.headers.get('Content-Range', ''))
+    if not match:
+        return JsonResponse({'error': 'A Content-Range header is required.'}, status=400)
+    start, end = int(match.group(1)), int(match.group(2))
+    length = int(request.META.get('CONTENT_LENGTH') or 0)
+    if end - start + 1 != length:
+        return JsonResponse({'error': 'Content-Range does not match the body.'}, status=400)
+    try:
+        upload = receive_chunk(upload_id, request.user, start, length, request)
+    except EvidenceUpload.DoesNotExist:
+        raise Http404
+    except UploadOffsetError as error:
+        upload = EvidenceUpload.objects.get(upload_id=upload_id)
+        return JsonResponse(dict(_state(upload), error=str(error)), status=409)
+    except UploadError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse(_state(upload))
+
+
+@login_required
+@require_http_methods(['GET', 'HEAD'])
+def evidence_preview(request, evidence_id, size):
+    """
+    Serves the preview of an evidence file to its owner or to staff,
+    rendering it on first request. Previews never change for a content
+    hash, so browsers may keep them and revalidate by ETag; the stand-in of
+    an image that cannot be rendered yet is not kept.
+    """
+    if size not in previews.preview_sizes():
+        raise Http404
+    evidence = get_object_or_404(Evidence.objects.select_related('file'), pk=evidence_id)
+    if evidence.account_id != request.user.pk and not request.user.is_staff:
+        raise Http404
+
+    etag = '"%s-%s"' % (evidence.file.content_hash, size)
+    if etag in request.headers.get('If-None-Match', ''):
+        return HttpResponseNotModified(headers={'ETag': etag})
+    path, created = previews.get_preview(evidence.file, size, name=evidence.original_name)
+    if created:
+        previews.evict_later()
+    response = FileResponse(open(path, 'rb'), content_type='image/svg+xml' if path.endswith('.svg') else 'image/jpeg')
+    if previews.is_stand_in(path):
+        # The real preview replaces it as soon as it can be rendered.
+        response['Cache-Control'] = 'no-cache'
+    else:
+        response['ETag'] = etag
+        response['Cache-Control'] = 'private, max-age=86400'
+    return response
@@ -1,3 +1,22 @@
 from django.contrib import admin
 
+from .models import SyncRun, SyncSnapshot, SyncState
+
 # Register your models here.
+@admin.register(SyncState)
+class SyncStateAdmin(admin.ModelAdmin):
+    list_display = ('source', 'watermark', 'date_updated')
+
+
+@admin.register(SyncRun)
+class SyncRunAdmin(admin.ModelAdmin):
+    list_display = ('source', 'status', 'date_started', 'seconds', 'scanned', 'created', 'updated', 'skipped', 'failed', 'dry_run')
+    list_filter = ('source', 'status', 'dry_run')
+    readonly_fields = [field.name for field in SyncRun._meta.fields]
+
+
+@admin.register(SyncSnapshot)
+class SyncSnapshotAdmin(admin.ModelAdmin):
+    list_display = ('source', 'entity', 'key', 'object_id', 'date_updated')
+    list_filter = ('source', 'entity')
+    search_fields = ('^key',)
@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from integration.sync import sync
+
+
+class Command(BaseCommand):
+    help = 'Applies the changes of an HR feed (a JSON/JSONL file or an http(s) URL) since the last sync.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('feed', nargs='?', help='Defaults to the HR_SYNC_FEED setting.')
+        parser.add_argument('--source', default='hr', help='The name the watermark is kept under.')
+        parser.add_argument('--full', action='store_true', help='Ignore the watermark and read the whole feed.')
+        parser.add_argument('--dry-run', action='store_true', help='Count the changes without writing them.')
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        feed = options['feed'] or getattr(settings, 'HR_SYNC_FEED', None)
+        if not feed:
+            raise CommandError('Give a feed or set HR_SYNC_FEED.')
+        result = sync(options['source'], feed, full=options['full'], dry_run=options['dry_run'],
+                      chunk_size=options['chunk_size'])
+        self.stdout.write(self.style.SUCCESS(
+            '%sScanned %d records in %.1fs: %d created, %d updated, %d skipped, %d failed. Watermark: %s' % (
+                'Dry run. ' if options['dry_run'] else '', result.scanned, result.seconds, result.created,
+                result.updated, result.skipped, result.failed, result.watermark or '-',
+            )
+        ))
+        if result.failed:
+            self.stdout.write('See sync run %d for the errors.' % result.run_id)
@@ -1,3 +1,106 @@
 from django.db import models
 
 # Create your models here.
+class SyncState(models.Model):
+    """
+    A model holding how far a sync source has been read.
+
+    Attributes:
+        syncstate_id (int): The primary key of the state.
+        source (str): The name of the upstream feed.
+        watermark (str): The updated_at of the newest record applied from the feed.
+        date_updated (datetime): When the watermark last moved.
+    """
+    syncstate_id = models.AutoField(primary_key=True)
+    source = models.CharField(max_length=100, unique=True)
+    watermark = models.CharField(max_length=64, blank=True, default='')
+    date_updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return '%s @ %s' % (self.source, self.watermark or '-')
+
+
+class SyncSnapshot(models.Model):
+    """
+    A model holding the hash of the last upstream version of a record that
+    was applied, so an unchanged record is skipped without reading its row.
+
+    Attributes:
+        syncsnapshot_id (int): The primary key of the snapshot.
+        source (str): The name of the upstream feed.
+        entity (str): The kind of record (college, department, employment_status, account).
+        key (str): The upstream key of the record.
+        digest (str): The SHA-256 of the record as last applied.
+        object_id (int): The primary key of the local row.
+        date_updated (datetime): When the record last changed.
+    """
+    syncsnapshot_id = models.BigAutoField(primary_key=True)
+    source = models.CharField(max_length=100)
+    entity = models.CharField(max_length=50)
+    key = models.CharField(max_length=255)
+    digest = models.CharField(max_length=64)
+    object_id = models.BigIntegerField()
+    date_updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['source', 'entity', 'key'], name='syncsnapshot_unique_key'),
+        ]
+
+    def __str__(self):
+        return '%s %s %s' % (self.source, self.entity, self.key)
+
+
+class SyncRun(models.Model):
+    """
+    A model recording one run of a sync and what it did.
+
+    Attributes:
+        syncrun_id (int): The primary key of the run.
+        source (str): The name of the upstream feed.
+        status (str): running, succeeded or failed.
+        dry_run (bool): Whether changes were only counted, not written.
+        watermark_from (str): The watermark the run read from.
+        watermark_to (str): The watermark the run reached.
+        scanned (int): Records read from the feed.
+        created (int): Local rows created.
+        updated (int): Local rows changed.
+        skipped (int): Records skipped: unchanged, older than the watermark or superseded in the feed.
+        failed (int): Records that could not be applied.
+        errors (list): The first errors, as {"entity", "key", "error"}.
+        seconds (float): How long the run took.
+        date_started (datetime): When the run started.
+        date_finished (datetime): When the run finished.
+    """
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUSES = (
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    )
+
+    syncrun_id = models.AutoField(primary_key=True)
+    source = models.CharField(max_length=100)
+    status = models.CharField(max_length=10, choices=STATUSES, default=RUNNING)
+    dry_run = models.BooleanField(default=False)
+    watermark_from = models.CharField(max_length=64, blank=True, default='')
+    watermark_to = models.CharField(max_length=64, blank=True, default='')
+    scanned = models.PositiveIntegerField(default=0)
+    created = models.PositiveIntegerField(default=0)
+    updated = models.PositiveIntegerField(default=0)
+    skipped = models.PositiveIntegerField(default=0)
+    failed = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)
+    seconds = models.FloatField(null=True, blank=True)
+    date_started = models.DateTimeField(auto_now_add=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['source', '-date_started'], name='syncrun_source_started_idx'),
+        ]
+
+    def __str__(self):
+        return '%s %s (%s)' % (self.source, self.date_started, self.status)
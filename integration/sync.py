@@ -0,0 +1,373 @@
+import hashlib
+import json
+import logging
+import time
+from collections import namedtuple
+from urllib.parse import urlencode, urlsplit
+from urllib.request import Request, urlopen
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models.functions import Upper
+from django.dispatch import Signal
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from account.models import College, Department, EmploymentStatus
+from utility.parsing import parse_bool
+
+from .models import SyncRun, SyncSnapshot, SyncState
+
+
+logger = logging.getLogger(__name__)
+
+# Sent with the ids of the accounts a sync created or changed. Bulk writes
+# send no post_save, so caches of account data listen to this instead.
+accounts_synced = Signal()
+
+Entity = namedtuple('Entity', ['name', 'model', 'key_field', 'fields', 'required', 'references'])
+
+SyncResult = namedtuple('SyncResult', ['run_id', 'scanned', 'created', 'updated', 'skipped', 'failed', 'watermark', 'seconds'])
+
+
+def _entities():
+    return (
+        Entity('college', College, 'college_abbreviation',
+               ('college_name', 'college_abbreviation', 'college_description', 'is_active'),
+               ('college_name',), {}),
+        Entity('department', Department, 'department_abbreviation',
+               ('department_name', 'department_abbreviation', 'department_description', 'is_active'),
+               ('department_name',), {}),
+        Entity('employment_status', EmploymentStatus, 'empstatus_name',
+               ('empstatus_name', 'empstatus_description', 'is_active'),
+               (), {}),
+        Entity('account', get_user_model(), 'faculty_id',
+               ('email', 'first_name', 'middle_name', 'last_name', 'faculty_id', 'plm_email', 'contact_number',
+                'college', 'department', 'is_active'),
+               ('email', 'first_name', 'last_name'), {'college': 'college', 'department': 'department'}),
+    )
+
+
+class RecordError(ValueError):
+    pass
+
+
+def _normalize(record):
+    """
+    Returns a feed record as (entity, key, updated_at, data, deleted). A
+    record is {"entity", "key", "updated_at", "data", "deleted"}; key
+    defaults to the entity's key field in data.
+    """
+    if not isinstance(record, dict) or not isinstance(record.get('data', {}), dict):
+        raise RecordError('record must be an object with a data object')
+    return (
+        record.get('entity'),
+        str(record.get('key') or '').strip(),
+        record.get('updated_at') or '',
+        record.get('data') or {},
+        bool(record.get('deleted')),
+    )
+
+
+def read_file(path):
+    """
+    Yields the records of a JSONL file, or of a JSON file holding a list or
+    {"records": [...]}.
+    """
+    with open(path, encoding='utf-8') as source:
+        if path.endswith(('.jsonl', '.ndjson')):
+            for line in source:
+                if line.strip():
+                    yield json.loads(line)
+            return
+        payload = json.load(source)
+    yield from payload.get('records', []) if isinstance(payload, dict) else payload
+
+
+def read_url(url, since='', timeout=30):
+    """
+    Yields the records of an HTTP feed, asking for the changes after since
+    and following its "next" links: every page is {"records": [...], "next": url or null}.
+    A static file served over HTTP (python -m http.server) stands in for a
+    real feed, since records at or before the watermark are skipped here too.
+    """
+    if since:
+        url += ('&' if urlsplit(url).query else '?') + urlencode({'since': since})
+    while url:
+        with urlopen(Request(url, headers={'Accept': 'application/json'}), timeout=timeout) as response:
+            payload = json.load(response)
+        yield from payload.get('records', [])
+        url = payload.get('next')
+
+
+def open_feed(feed, since=''):
+    if feed.startswith(('http://', 'https://')):
+        return read_url(feed, since)
+    return read_file(feed)
+
+
+def digest(data, deleted):
+    encoded = json.dumps({'data': data, 'deleted': deleted}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def _chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Syncer:
+    """
+    Applies an upstream HR feed to the colleges, departments, employment
+    statuses and accounts, reading only the records changed since the
+    source's watermark.
+
+    Every record's hash is compared with the snapshot of the version last
+    applied, so unchanged records cost no read of their row. Changed ones
+    are matched to local rows (by snapshot, or by key field for rows keyed
+    by hand before the first sync), compared field by field and written
+    with one bulk_create and one bulk_update per chunk. Each chunk commits
+    on its own; the watermark only moves once the whole run succeeded, and
+    a rerun after a failure skips the chunks already applied by their hashes.
+    Records that fail (an unknown college, an email owned by another
+    account) are listed on the SyncRun and do not hold the watermark back;
+    a full run picks them up once the feed or the local data is fixed.
+    """
+
+    def __init__(self, source, chunk_size=1000, dry_run=False, max_errors=100):
+        self.source = source
+        self.chunk_size = chunk_size
+        self.dry_run = dry_run
+        self.max_errors = max_errors
+        self.entities = {entity.name: entity for entity in _entities()}
+        self.counts = dict(scanned=0, created=0, updated=0, skipped=0, failed=0)
+        self.errors = []
+        self.account_ids = set()
+
+    def _fail(self, entity, key, error):
+        self.counts['failed'] += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({'entity': entity, 'key': key, 'error': str(error)})
+
+    def collect(self, records, since=''):
+        """
+        Returns the records newer than since, the latest version of each
+        (entity, key) only, grouped by entity, and the newest updated_at seen.
+        """
+        since_time = parse_datetime(since) if since else None
+        watermark, watermark_time = since, since_time
+        latest = {}
+        for record in records:
+            self.counts['scanned'] += 1
+            try:
+                name, key, updated_at, data, deleted = _normalize(record)
+                entity = self.entities.get(name)
+                if entity is None:
+                    raise RecordError('unknown entity %r' % name)
+                key = key or str(data.get(entity.key_field) or '').strip()
+                if not key:
+                    raise RecordError('missing key')
+                updated_time = parse_datetime(updated_at) if updated_at else None
+                if updated_at and updated_time is None:
+                    raise RecordError('invalid updated_at %r' % updated_at)
+            except RecordError as error:
+                self._fail(record.get('entity') if isinstance(record, dict) else None, None, error)
+                continue
+            if updated_time is not None:
+                if since_time is not None and updated_time <= since_time:
+                    self.counts['skipped'] += 1
+                    continue
+                if watermark_time is None or updated_time > watermark_time:
+                    watermark, watermark_time = updated_at, updated_time
+            previous = latest.get((name, key.upper()))
+            if previous is not None:
+                # Only the newest version of a record in the feed is applied.
+                self.counts['skipped'] += 1
+                if previous[0] is not None and (updated_time is None or updated_time < previous[0]):
+                    continue
+            latest[(name, key.upper())] = (updated_time, key, data, deleted)
+
+        grouped = {name: [] for name in self.entities}
+        for (name, upper_key), (updated_time, key, data, deleted) in latest.items():
+            grouped[name].append((key, data, deleted))
+        return grouped, watermark
+
+    def _references(self, entity):
+        maps = {}
+        for field, name in entity.references.items():
+            target = self.entities[name]
+            maps[field] = {
+                key.upper(): pk
+                for pk, key in target.model.objects.values_list(target.model._meta.pk.attname, target.key_field)
+                if key
+            }
+        return maps
+
+    def _values(self, entity, key, data, deleted, references):
+        values = {}
+        for field in entity.fields:
+            if field in entity.references:
+                reference = str(data.get(field) or '').strip()
+                if reference and reference.upper() not in references[field]:
+                    raise RecordError('unknown %s %r' % (field, reference))
+                values[field + '_id'] = references[field].get(reference.upper()) if reference else None
+            elif field == 'is_active':
+                try:
+                    values[field] = False if deleted else parse_bool(data.get(field))
+                except ValueError:
+                    raise RecordError('invalid %s %r' % (field, data.get(field)))
+            elif field == entity.key_field:
+                values[field] = key
+            else:
+                value = str(data.get(field) or '').strip()
+                values[field] = None if not value and entity.model._meta.get_field(field).null else value
+        for field in entity.required:
+            if not values.get(field):
+                raise RecordError('missing %s' % field)
+        if 'email' in values:
+            values['email'] = get_user_model().objects.normalize_email(values['email'])
+        return values
+
+    def apply(self, entity, records):
+        """
+        Applies the records of one entity, a chunk at a time.
+        """
+        model = entity.model
+        pk_name = model._meta.pk.attname
+        references = self._references(entity)
+        for chunk in _chunks(records, self.chunk_size):
+            snapshots = {
+                snapshot.key.upper(): snapshot
+                for snapshot in SyncSnapshot.objects.filter(
+                    source=self.source, entity=entity.name, key__in=[key for key, data, deleted in chunk],
+                )
+            }
+            changed = []
+            for key, data, deleted in chunk:
+                hashed = digest(data, deleted)
+                snapshot = snapshots.get(key.upper())
+                if snapshot is not None and snapshot.digest == hashed:
+                    self.counts['skipped'] += 1
+                    continue
+                try:
+                    changed.append((key, hashed, snapshot, self._values(entity, key, data, deleted, references)))
+                except RecordError as error:
+                    self._fail(entity.name, key, error)
+            if changed:
+                self._write(entity, model, pk_name, changed)
+
+    def _write(self, entity, model, pk_name, changed):
+        by_id = [snapshot.object_id for key, hashed, snapshot, values in changed if snapshot is not None]
+        keys = [key.upper() for key, hashed, snapshot, values in changed]
+        rows = model.objects.annotate(sync_key=Upper(entity.key_field)).filter(sync_key__in=keys)
+        local = {row.sync_key: row for row in rows}
+        local_by_id = {row.pk: row for row in model.objects.filter(pk__in=by_id)} if by_id else {}
+
+        taken_emails = {}
+        if 'email' in entity.fields:
+            emails = [values['email'].upper() for key, hashed, snapshot, values in changed]
+            taken_emails = dict(
+                model.objects.annotate(email_upper=Upper('email')).filter(email_upper__in=emails)
+                .values_list('email_upper', pk_name)
+            )
+
+        created, updated, snapshots = [], [], []
+        fields = set()
+        for key, hashed, snapshot, values in changed:
+            row = (local_by_id.get(snapshot.object_id) if snapshot else None) or local.get(key.upper())
+            if 'email' in values:
+                owner = taken_emails.get(values['email'].upper())
+                if owner is not None and (row is None or owner != row.pk):
+                    self._fail(entity.name, key, 'email %s belongs to another account' % values['email'])
+                    continue
+                taken_emails[values['email'].upper()] = row.pk if row else key
+            if row is None:
+                row = model(**values)
+                if hasattr(row, 'set_unusable_password'):
+                    row.password = make_password(None)
+                created.append(row)
+            else:
+                differing = {field for field, value in values.items() if getattr(row, field) != value}
+                if not differing:
+                    self.counts['skipped'] += 1
+                else:
+                    for field in differing:
+                        setattr(row, field, values[field])
+                    fields |= differing
+                    updated.append(row)
+            snapshots.append((key, hashed, snapshot, row))
+
+        self.counts['created'] += len(created)
+        self.counts['updated'] += len(updated)
+        if self.dry_run:
+            return
+        with transaction.atomic():
+            model.objects.bulk_create(created)
+            if created and created[0].pk is None:
+                # Backends that cannot return ids from bulk inserts.
+                ids = dict(model.objects.annotate(sync_key=Upper(entity.key_field)).filter(
+                    sync_key__in=[getattr(row, entity.key_field).upper() for row in created],
+                ).values_list('sync_key', pk_name))
+                for row in created:
+                    row.pk = ids[getattr(row, entity.key_field).upper()]
+            if updated:
+                model.objects.bulk_update(updated, sorted(fields))
+            now = timezone.now()
+            new_snapshots, old_snapshots = [], []
+            for key, hashed, snapshot, row in snapshots:
+                if snapshot is None:
+                    new_snapshots.append(SyncSnapshot(
+                        source=self.source, entity=entity.name, key=key, digest=hashed, object_id=row.pk,
+                    ))
+                else:
+                    snapshot.digest, snapshot.object_id, snapshot.date_updated = hashed, row.pk, now
+                    old_snapshots.append(snapshot)
+            SyncSnapshot.objects.bulk_create(new_snapshots)
+            SyncSnapshot.objects.bulk_update(old_snapshots, ['digest', 'object_id', 'date_updated'])
+        if entity.name == 'account':
+            self.account_ids.update(row.pk for row in created + updated)
+
+    def run(self, feed, full=False):
+        """
+        Syncs from a feed (a file path or an http(s) URL) and returns a
+        SyncResult. With full, the watermark is ignored and every record is
+        read again; unchanged ones are still skipped by their hashes.
+        """
+        started = time.perf_counter()
+        state, _ = SyncState.objects.get_or_create(source=self.source)
+        since = '' if full else state.watermark
+        run = SyncRun.objects.create(source=self.source, dry_run=self.dry_run, watermark_from=since)
+        watermark = since
+        try:
+            grouped, watermark = self.collect(open_feed(feed, since), since)
+            for entity in _entities():
+                self.apply(self.entities[entity.name], grouped[entity.name])
+        except Exception as error:
+            self._finish(run, SyncRun.FAILED, since, started, error)
+            raise
+        if not self.dry_run:
+            SyncState.objects.filter(pk=state.pk).update(watermark=watermark, date_updated=timezone.now())
+            if self.account_ids:
+                accounts_synced.send(sender=self.__class__, account_ids=sorted(self.account_ids))
+        seconds = self._finish(run, SyncRun.SUCCEEDED, watermark, started)
+        logger.info('Synced %s: %s', self.source, self.counts)
+        return SyncResult(run_id=run.pk, watermark=watermark, seconds=seconds, **self.counts)
+
+    def _finish(self, run, status, watermark, started, error=None):
+        errors = list(self.errors)
+        if error is not None:
+            errors.append({'entity': None, 'key': None, 'error': '%s: %s' % (type(error).__name__, error)})
+        seconds = round(time.perf_counter() - started, 3)
+        SyncRun.objects.filter(pk=run.pk).update(
+            status=status, watermark_to=watermark, errors=errors, seconds=seconds, date_finished=timezone.now(),
+            **self.counts
+        )
+        return seconds
+
+
+def sync(source, feed, full=False, dry_run=False, chunk_size=1000):
+    """
+    Runs a Syncer over a feed; see Syncer.run.
+    """
+    return Syncer(source, chunk_size=chunk_size, dry_run=dry_run).run(feed, full=full)
@@ -0,0 +1,10 @@
+from django.conf import settings
+
+from utility.jobs import task
+
+from .sync import sync
+
+
+@task('integration.sync_hr', max_attempts=1)
+def sync_hr(job, source='hr', feed=None, full=False):
+    return sync(source, feed or settings.HR_SYNC_FEED, full=full)._asdict()
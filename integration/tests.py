@@ -1,3 +1,93 @@
+import json
+import os
+import shutil
+import tempfile
+
 from django.test import TestCase
 
-# Create your tests here.
+from account.models import Account, College
+
+from .models import SyncSnapshot, SyncState
+from .sync import accounts_synced, sync
+
+
+class SyncTests(TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory, ignore_errors=True)
+        self.synced = []
+        accounts_synced.connect(self._synced)
+        self.addCleanup(accounts_synced.disconnect, self._synced)
+
+    def _synced(self, sender, account_ids, **kwargs):
+        self.synced.append(account_ids)
+
+    def _feed(self, *records):
+        path = os.path.join(self.directory, 'feed.jsonl')
+        with open(path, 'w', encoding='utf-8') as feed:
+            feed.writelines(json.dumps(record) + '\n' for record in records)
+        return path
+
+    def _college(self, abbreviation, name, updated_at, **fields):
+        data = dict({'college_name': name, 'college_abbreviation': abbreviation}, **fields)
+        return {'entity': 'college', 'updated_at': updated_at, 'data': data}
+
+    def _account(self, faculty_id, email, updated_at, deleted=False, **fields):
+        data = dict({'faculty_id': faculty_id, 'email': email, 'first_name': 'Juan', 'last_name': 'Cruz'}, **fields)
+        return {'entity': 'account', 'updated_at': updated_at, 'data': data, 'deleted': deleted}
+
+    def test_watermark_skips_records_already_read(self):
+        result = sync('hr', self._feed(
+            self._college('CET', 'Engineering', '2024-01-01T00:00:00Z'),
+            self._college('CAS', 'Arts', '2024-01-02T00:00:00Z'),
+        ))
+        self.assertEqual((result.created, result.watermark), (2, '2024-01-02T00:00:00Z'))
+        self.assertEqual(SyncState.objects.get(source='hr').watermark, '2024-01-02T00:00:00Z')
+
+        result = sync('hr', self._feed(
+            self._college('CET', 'Engineering and Technology', '2024-01-01T00:00:00Z'),
+            self._college('CAS', 'Arts and Sciences', '2024-01-03T00:00:00Z'),
+        ))
+        self.assertEqual((result.skipped, result.updated, result.watermark), (1, 1, '2024-01-03T00:00:00Z'))
+        self.assertEqual(
+            sorted(College.objects.values_list('college_abbreviation', 'college_name')),
+            [('CAS', 'Arts and Sciences'), ('CET', 'Engineering')],
+        )
+
+    def test_unchanged_records_are_skipped_by_snapshot(self):
+        College.objects.create(college_name='Engineering', college_abbreviation='cet')
+        records = [
+            self._college('CET', 'Engineering', '2024-01-01T00:00:00Z', college_description='Keyed by hand'),
+            self._college('CAS', 'Arts', '2024-01-01T00:00:00Z'),
+        ]
+        result = sync('hr', self._feed(*records))
+        self.assertEqual((result.created, result.updated), (1, 1))
+        self.assertEqual(College.objects.count(), 2)
+        self.assertEqual(SyncSnapshot.objects.filter(source='hr').count(), 2)
+
+        result = sync('hr', self._feed(*records), full=True)
+        self.assertEqual((result.created, result.updated, result.skipped), (0, 0, 2))
+
+        records[1]['data']['college_name'] = 'Arts and Sciences'
+        result = sync('hr', self._feed(*records), full=True)
+        self.assertEqual((result.updated, result.skipped), (1, 1))
+        self.assertEqual(College.objects.get(college_abbreviation='CAS').college_name, 'Arts and Sciences')
+
+    def test_deleted_and_inactive_accounts_are_deactivated(self):
+        result = sync('hr', self._feed(
+            self._account('F-1', 'first@plm.edu.ph', '2024-01-01T00:00:00Z'),
+            self._account('F-2', 'second@plm.edu.ph', '2024-01-01T00:00:00Z', is_active='no'),
+            self._account('F-3', 'third@plm.edu.ph', '2024-01-01T00:00:00Z', is_active='maybe'),
+        ))
+        self.assertEqual((result.created, result.failed), (2, 1))
+        self.assertEqual(
+            sorted(Account.objects.values_list('faculty_id', 'is_active')), [('F-1', True), ('F-2', False)],
+        )
+
+        first = Account.objects.get(faculty_id='F-1')
+        result = sync('hr', self._feed(self._account('F-1', 'first@plm.edu.ph', '2024-01-02T00:00:00Z', deleted=True)))
+        self.assertEqual(result.updated, 1)
+        first.refresh_from_db()
+        self.assertFalse(first.is_active)
+        self.assertEqual(self.synced[-1], [first.pk])
@@ -0,0 +1,49 @@
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth.views import redirect_to_login
+from django.shortcuts import render
+
+from evaluation.models import Evaluation, Evidence
+from evaluation.rollup import aget_account_totals
+from .summary import aget_summary
+
+# Async versions of the busiest interface views, served instead of the ones in
+# views.py when INTERFACE_ASYNC_VIEWS is on (see urls.py). They only pay off
+# under ASGI; under WSGI every request would start its own event loop.
+
+async def _load_user(request):
+	# request.user is loaded lazily from the session, which is synchronous.
+	await sync_to_async(lambda: request.user.is_authenticated)()
+	return request.user
+
+def alogin_required(view):
+	@wraps(view)
+	async def wrapper(request, *args, **kwargs):
+		user = await _load_user(request)
+		if not user.is_authenticated:
+			return redirect_to_login(request.get_full_path())
+		return await view(request, *args, **kwargs)
+	return wrapper
+
+@alogin_required
+async def dashboard(request):
+	summary = await aget_summary(request.user.pk)
+	return render(request, "interface/dashboard.html", {'summary': summary})
+
+@alogin_required
+async def profile(request):
+	return render(request, template_name="interface/profile.html")
+
+@alogin_required
+async def evaluate(request):
+	academic = [
+		evaluation async for evaluation in
+		Evaluation.objects.filter(account=request.user).select_related('document', 'account')
+	]
+	totals = await aget_account_totals(request.user)
+	evidence = [
+		item async for item in
+		Evidence.objects.filter(account=request.user).select_related('file').order_by('-date_uploaded')
+	]
+	return render(request, "interface/evaluate.html", {'academic': academic, 'totals': totals, 'evidence': evidence})
@@ -0,0 +1,59 @@
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from account.history import currentrank_changed
+from account.models import Account, FacultyRankHistory
+from evaluation.models import Evaluation
+from evaluation.rollup import totals_changed
+from evaluation.signals import is_cascading
+from integration.sync import accounts_synced
+
+from . import summary
+
+
+def _invalidate(*account_ids):
+    transaction.on_commit(lambda: summary.invalidate(*account_ids))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def account_changed(sender, instance, update_fields=None, **kwargs):
+    # Logging in only touches last_login, which the summary does not show.
+    if update_fields and set(update_fields) == {'last_login'}:
+        return
+    _invalidate(instance.pk)
+
+
+@receiver(post_save, sender=FacultyRankHistory)
+@receiver(post_delete, sender=FacultyRankHistory)
+def rank_history_changed(sender, instance, **kwargs):
+    account_ids = set(Account.objects.filter(currentrank_id=instance.pk).values_list('pk', flat=True))
+    _invalidate(instance.user_id, *account_ids)
+
+
+@receiver(post_save, sender=Evaluation)
+@receiver(post_delete, sender=Evaluation)
+def evaluation_changed(sender, instance, **kwargs):
+    if is_cascading(instance):
+        return
+    previous = getattr(instance, '_rollup_previous', None)
+    _invalidate(instance.account_id, previous[0] if previous else None)
+
+
+@receiver(currentrank_changed)
+def currentrank_rebuilt(sender, account_ids, **kwargs):
+    summary.invalidate(*account_ids)
+
+
+@receiver(accounts_synced)
+def accounts_synced_changed(sender, account_ids, **kwargs):
+    summary.invalidate(*account_ids)
+
+
+@receiver(totals_changed)
+def rollup_changed(sender, account_ids, **kwargs):
+    if account_ids is None:
+        account_ids = Account.objects.values_list('pk', flat=True)
+    summary.invalidate(*account_ids)
@@ -0,0 +1,173 @@
+import threading
+from collections import namedtuple
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import caches
+
+from account.models import FacultyRankHistory
+from evaluation.rollup import aget_account_totals, get_account_totals
+from report.models import FacultyStanding
+from report.rollups import STANDINGS
+from utility.versioning import get_version
+
+
+DashboardSummary = namedtuple('DashboardSummary', [
+    'account_id', 'email', 'first_name', 'last_name', 'faculty_id', 'college', 'department',
+    'rank', 'salary_grade', 'employment_status', 'hiring_nature',
+    'totals', 'total_points', 'total_max_points',
+    'college_position', 'department_position', 'standing_refreshed',
+    'pending_requests', 'pending_targets',
+])
+
+_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_stats_lock = threading.Lock()
+
+
+def _count(name):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def stats():
+    """
+    Returns the hit, miss and invalidation counters of this process.
+    """
+    with _stats_lock:
+        counters = dict(_stats)
+    lookups = counters['hits'] + counters['misses']
+    counters['hit_ratio'] = counters['hits'] / lookups if lookups else None
+    return counters
+
+
+def _cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'default')]
+
+
+def _key(account_id):
+    return 'dashboard-summary:%s' % account_id
+
+
+def _accounts():
+    return get_user_model().objects.select_related(
+        'college', 'department',
+        'currentrank__targetrank__rank', 'currentrank__targetrank__salarygrade',
+        'currentrank__currentrank__rank', 'currentrank__currentrank__salarygrade',
+        'currentrank__targetstatus', 'currentrank__currentstatus',
+        'currentrank__targetnature', 'currentrank__currentnature',
+    )
+
+
+def _pending(account_id):
+    return (
+        FacultyRankHistory.objects.filter(user_id=account_id, is_active=True, is_successful=False, date_of_promotion__isnull=True)
+        .select_related('targetrank').order_by('-date_of_request')
+    )
+
+
+def _summary(account, totals, standing, pending):
+    rank = salary_grade = status = nature = None
+    history = account.currentrank
+    if history is not None:
+        # A successful request means the faculty member now holds the target.
+        if history.is_successful:
+            facultyrank, status, nature = history.targetrank, history.targetstatus, history.targetnature
+        else:
+            facultyrank, status, nature = history.currentrank, history.currentstatus, history.currentnature
+        if facultyrank is not None:
+            rank = str(facultyrank)
+            salary_grade = str(facultyrank.salarygrade)
+
+    return DashboardSummary(
+        account_id=account.pk,
+        email=account.email,
+        first_name=account.first_name,
+        last_name=account.last_name,
+        faculty_id=account.faculty_id,
+        college=str(account.college) if account.college else None,
+        department=str(account.department) if account.department else None,
+        rank=rank,
+        salary_grade=salary_grade,
+        employment_status=status.empstatus_name if status else None,
+        hiring_nature=nature.hiringnature_name if nature else None,
+        totals=totals,
+        total_points=sum(total.points for total in totals),
+        total_max_points=sum(total.max_points for total in totals),
+        college_position=standing.college_position if standing else None,
+        department_position=standing.department_position if standing else None,
+        standing_refreshed=standing.date_refreshed if standing else None,
+        pending_requests=len(pending),
+        pending_targets=[str(request.targetrank) for request in pending if request.targetrank is not None][:5],
+    )
+
+
+def build_summary(account_id):
+    """
+    Builds the dashboard summary of an account from the database.
+    """
+    return _summary(
+        _accounts().get(pk=account_id),
+        get_account_totals(account_id),
+        FacultyStanding.objects.filter(account_id=account_id).first(),
+        list(_pending(account_id)),
+    )
+
+
+async def abuild_summary(account_id):
+    """
+    The async version of build_summary, using the async ORM.
+    """
+    return _summary(
+        await _accounts().aget(pk=account_id),
+        await aget_account_totals(account_id),
+        await FacultyStanding.objects.filter(account_id=account_id).afirst(),
+        [request async for request in _pending(account_id)],
+    )
+
+
+def get_summary(account_id):
+    """
+    Returns the dashboard summary of an account, from the cache when possible.
+    Cached summaries are keyed by the standings version too, so a leaderboard
+    refresh is picked up without touching every key.
+    """
+    cache = _cache()
+    key = _key(account_id)
+    version = get_version(STANDINGS)
+    cached = cache.get(key)
+    if cached is not None and cached[0] == version:
+        _count('hits')
+        return cached[1]
+    _count('misses')
+    summary = build_summary(account_id)
+    cache.set(key, (version, summary), getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return summary
+
+
+async def aget_summary(account_id):
+    """
+    The async version of get_summary.
+    """
+    cache = _cache()
+    key = _key(account_id)
+    version = await sync_to_async(get_version)(STANDINGS)
+    cached = await cache.aget(key)
+    if cached is not None and cached[0] == version:
+        _count('hits')
+        return cached[1]
+    _count('misses')
+    summary = await abuild_summary(account_id)
+    await cache.aset(key, (version, summary), getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return summary
+
+
+def invalidate(*account_ids):
+    """
+    Drops the cached summaries of the given accounts.
+    """
+    account_ids = [account_id for account_id in account_ids if account_id is not None]
+    if account_ids:
+        _cache().delete_many([_key(account_id) for account_id in account_ids])
+        with _stats_lock:
+            _stats['invalidations'] += len(account_ids)
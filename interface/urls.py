@@ -1,6 +1,12 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
+if getattr(settings, 'INTERFACE_ASYNC_VIEWS', False):
+    from . import async_views as served
+else:
+    served = views
+
 app_name = "interface"   
 
 
@@ -8,9 +14,11 @@ urlpatterns = [
     path("", views.homepage, name="homepage"),
     path('logout/', views.logout_view, name="logout"),
     path('signup/', views.signup, name="signup"),
-    path('dashboard/', views.dashboard, name="dashboard"),
-    path('profile/', views.profile, name="profile"),
-    path('evaluate/', views.evaluate, name="evaluate"),
+    path('dashboard/', served.dashboard, name="dashboard"),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name="dashboard_cache_stats"),
+    path('dashboard/next-rank/', views.planner, name="planner"),
+    path('profile/', served.profile, name="profile"),
+    path('evaluate/', served.evaluate, name="evaluate"),
     path('evaluate/manual', views.manual_add, name="manual_add"),
     path('evaluate/success', views.duga, name="duga"),
 ]
\ No newline at end of file
@@ -1,15 +1,22 @@
 from django.shortcuts import redirect, render
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse
 from account.forms import AccountLoginForm
 
 from account.models import *
 from evaluation.models import *
+from evaluation.planner import plan_next_rank
+from evaluation.rollup import get_account_totals
+from document.rubric import get_rubric
+from .summary import get_summary, stats as summary_stats
 
 # Create your views here.
 def homepage(request):
 	if request.user.is_authenticated:
-		return render(request, "interface/dashboard.html")
+		return redirect('interface:dashboard')
 	else:
 		form = AccountLoginForm(request.POST or None)
 		if request.method == 'POST':
@@ -17,7 +24,7 @@ def homepage(request):
 				user = authenticate(email=form.cleaned_data['email'], password=form.cleaned_data['password'])
 				if user is not None:
 					login(request, user)
-					return render(request = request, template_name="interface/dashboard.html")
+					return redirect('interface:dashboard')
 				else:
 					messages.success(request, 'Invalid email or password.')
 					return render(request, "interface/home.html", {"form": form})
@@ -31,24 +38,39 @@ def homepage(request):
 def signup(request):
 	return render(request, template_name="interface/signup.html")
 
+@login_required
 def dashboard(request):
-	user = get_user_model().objects.get(email=request.user.email)
-	return render(request, "interface/dashboard.html", {'user': user})
+	summary = get_summary(request.user.pk)
+	return render(request, "interface/dashboard.html", {'summary': summary})
+
+@login_required
+def planner(request):
+	plan = plan_next_rank(request.user)
+	return render(request, "interface/planner.html", {'plan': plan})
+
+@staff_member_required
+def dashboard_cache_stats(request):
+	return JsonResponse(summary_stats())
 
 def logout_view(request):
 	logout(request)
 	messages.success(request, 'You have been logged out.')
 	return redirect('interface:homepage')
 
+@login_required
 def profile(request):
 	return render(request, template_name="interface/profile.html")
 
+@login_required
 def evaluate(request):
-	academic = Evaluation.objects.filter(account=request.user)
-	return render(request, "interface/evaluate.html", {'academic': academic})
+	academic = Evaluation.objects.filter(account=request.user).select_related('document', 'account')
+	totals = get_account_totals(request.user)
+	evidence = Evidence.objects.filter(account=request.user).select_related('file').order_by('-date_uploaded')
+	return render(request, "interface/evaluate.html", {'academic': academic, 'totals': totals, 'evidence': evidence})
 
 def manual_add(request):
-	return render(request, template_name="interface/manual_add.html")
+	rubric = get_rubric()
+	return render(request, "interface/manual_add.html", {'rubric': rubric})
 
 def duga(request):
 	return render(request, template_name="interface/duga.html")
@@ -0,0 +1,68 @@
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from . import classifier
+from .extract import extract_text
+
+
+# The model of a worker process, opened once by _open_model. Workers import
+# this module on their own, so it must not import any models: with the spawn
+# start method Django is not set up in them.
+_model = None
+
+
+def _open_model(path):
+    global _model
+    _model = classifier.Model(path)
+
+
+def _classify(path, top=3):
+    try:
+        return path, _model.predict(extract_text(path), top=top), None
+    except OSError as error:
+        return path, [], str(error)
+
+
+def iter_files(paths):
+    """
+    Yields the files among the given paths, walking into directories.
+    """
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for filename in sorted(filenames):
+                    yield os.path.join(directory, filename)
+        else:
+            yield path
+
+
+def classify_files(paths, model_path=None, workers=None, chunk_size=32, top=3, on_result=None):
+    """
+    Classifies files in a pool of worker processes. Every worker maps the
+    same model file, so the weights are loaded once per machine rather than
+    once per worker. Calls on_result(path, predictions, error) as results
+    come in, in input order, and returns the number of files and the files
+    per second.
+    """
+    files = list(iter_files(paths))
+    started = time.perf_counter()
+    path = model_path or classifier.model_path()
+    # Spawned workers start clean instead of inheriting the caller's
+    # database connections and threads, as a fork would.
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+        initializer=_open_model, initargs=(path,),
+    ) as pool:
+        for result in pool.map(partial(_classify, top=top), files, chunksize=chunk_size):
+            if on_result:
+                on_result(*result)
+    elapsed = time.perf_counter() - started
+    return {
+        'files': len(files),
+        'seconds': round(elapsed, 3),
+        'files_per_second': round(len(files) / elapsed, 2) if elapsed else None,
+    }
@@ -0,0 +1,161 @@
+import json
+import math
+import mmap
+import os
+import re
+import struct
+import zlib
+from array import array
+from collections import Counter, defaultdict
+
+from django.conf import settings
+
+
+MAGIC = b'PLMCLS01'
+
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has have in is it of on or that the this to was were with '
+    'ng sa mga ang'.split()
+)
+
+_WORDS = re.compile(r'[a-z0-9]+')
+
+
+def model_path():
+    return getattr(settings, 'ML_MODEL_PATH', os.path.join(settings.BASE_DIR, 'ml', 'models', 'evidence.model'))
+
+
+def tokenize(text):
+    """
+    Returns the unigrams and bigrams of a text, lowercased and without stop words.
+    """
+    words = [word for word in _WORDS.findall(text.lower()) if word not in STOPWORDS and (len(word) > 1 or word.isdigit())]
+    return words + ['%s %s' % pair for pair in zip(words, words[1:])]
+
+
+def _feature(token, dims):
+    # crc32 rather than hash(): features must be stable across processes.
+    return zlib.crc32(token.encode('utf-8')) % dims
+
+
+def term_counts(text, dims):
+    return Counter(_feature(token, dims) for token in tokenize(text))
+
+
+def _normalize(vector):
+    norm = math.sqrt(sum(value * value for value in vector.values()))
+    if norm:
+        for feature in vector:
+            vector[feature] /= norm
+    return vector
+
+
+def train(examples, dims=1 << 16):
+    """
+    Trains a nearest-centroid classifier over hashed TF-IDF features from
+    (text, label) examples, where labels are Document ids. Returns
+    (labels, idf, weights): idf has dims floats and weights holds the
+    centroids feature by feature (dims rows of len(labels) floats), so
+    scoring a text only reads the rows of the features it contains.
+    """
+    counts = []
+    document_frequency = Counter()
+    for text, label in examples:
+        terms = term_counts(text, dims)
+        if terms:
+            counts.append((terms, label))
+            document_frequency.update(terms.keys())
+
+    total = len(counts)
+    idf = array('f', [0.0]) * dims
+    for feature, frequency in document_frequency.items():
+        idf[feature] = math.log((1 + total) / (1 + frequency)) + 1
+
+    centroids = defaultdict(Counter)
+    for terms, label in counts:
+        vector = _normalize({feature: (1 + math.log(count)) * idf[feature] for feature, count in terms.items()})
+        centroids[label].update(vector)
+
+    labels = sorted(centroids)
+    weights = array('f', [0.0]) * (dims * len(labels))
+    for column, label in enumerate(labels):
+        for feature, value in _normalize(dict(centroids[label])).items():
+            weights[feature * len(labels) + column] = value
+    return labels, idf, weights
+
+
+def save(path, labels, idf, weights, metadata=None):
+    """
+    Writes a model file: the magic, a JSON header padded to a multiple of
+    four bytes, then the float32 idf and weight arrays.
+    """
+    header = json.dumps(dict(metadata or {}, dims=len(idf), labels=labels)).encode('utf-8')
+    header += b' ' * (-(len(MAGIC) + 4 + len(header)) % 4)
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    partial = path + '.partial'
+    with open(partial, 'wb') as target:
+        target.write(MAGIC)
+        target.write(struct.pack('<I', len(header)))
+        target.write(header)
+        idf.tofile(target)
+        weights.tofile(target)
+    os.replace(partial, path)
+
+
+class Model:
+    """
+    A trained classifier read from a model file through a read-only memory
+    map, so every process using the same file shares one copy of the
+    weights in the page cache.
+
+    Attributes:
+        labels (list): The Document id of every column.
+        dims (int): The number of hashed features.
+        metadata (dict): The header of the model file.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or model_path()
+        with open(self.path, 'rb') as source:
+            self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._map[:len(MAGIC)] != MAGIC:
+            raise ValueError('%s is not a classifier model' % self.path)
+        (length,) = struct.unpack_from('<I', self._map, len(MAGIC))
+        start = len(MAGIC) + 4
+        self.metadata = json.loads(self._map[start:start + length])
+        self.labels = self.metadata['labels']
+        self.dims = self.metadata['dims']
+        self._view = memoryview(self._map)
+        self._floats = self._view[start + length:].cast('f')
+        self._idf = self._floats[:self.dims]
+        self._weights = self._floats[self.dims:]
+
+    def scores(self, text):
+        """
+        Returns the cosine similarity of the text to every label's centroid.
+        """
+        width = len(self.labels)
+        scores = [0.0] * width
+        vector = _normalize({
+            feature: (1 + math.log(count)) * self._idf[feature]
+            for feature, count in term_counts(text, self.dims).items()
+        })
+        for feature, value in vector.items():
+            if value:
+                row = self._weights[feature * width:(feature + 1) * width]
+                for column, weight in enumerate(row):
+                    if weight:
+                        scores[column] += value * weight
+        return scores
+
+    def predict(self, text, top=3):
+        """
+        Returns the top (document_id, score) pairs for a text, best first.
+        """
+        ranked = sorted(zip(self.labels, self.scores(text)), key=lambda pair: -pair[1])
+        return [(label, round(score, 4)) for label, score in ranked[:top] if score > 0]
+
+    def close(self):
+        for view in (self._idf, self._weights, self._floats, self._view):
+            view.release()
+        self._map.close()
@@ -0,0 +1,48 @@
+import os
+import re
+import zlib
+
+
+TEXT_EXTENSIONS = {'.txt', '.csv', '.md', '.json', '.xml', '.html', '.htm'}
+
+_PDF_STREAM = re.compile(rb'stream\r?\n(.*?)\r?\nendstream', re.S)
+_PDF_STRING = re.compile(rb'\(((?:[^()\\]|\\.)*)\)')
+_PRINTABLE = re.compile(rb'[A-Za-z][A-Za-z0-9 ,.\'-]{3,}')
+_SEPARATORS = re.compile(r'[_\-.]+')
+
+
+def _pdf_text(data):
+    """
+    Pulls the text operands out of the (possibly Flate compressed) content
+    streams of a PDF. Good enough for generated certificates; scanned ones
+    carry no text and only contribute their file name.
+    """
+    parts = []
+    for stream in _PDF_STREAM.findall(data):
+        try:
+            stream = zlib.decompress(stream)
+        except zlib.error:
+            pass
+        parts.extend(match.decode('latin-1') for match in _PDF_STRING.findall(stream))
+    return ' '.join(parts)
+
+
+def extract_text(path, name=None, max_bytes=4 << 20):
+    """
+    Returns the text the classifier sees for an uploaded file: the words of
+    its file name (name, when it is stored under another one) followed by
+    whatever text can be read from its content.
+    """
+    name, extension = os.path.splitext(os.path.basename(name or path))
+    extension = extension.lower()
+    with open(path, 'rb') as source:
+        data = source.read(max_bytes)
+
+    if extension in TEXT_EXTENSIONS:
+        content = data.decode('utf-8', errors='ignore')
+    elif extension == '.pdf':
+        content = _pdf_text(data)
+    else:
+        # Office documents and other binaries: keep the readable runs.
+        content = ' '.join(match.decode('ascii') for match in _PRINTABLE.findall(data))
+    return '%s %s' % (_SEPARATORS.sub(' ', name), content)
@@ -0,0 +1,38 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from ml import classifier
+from ml.batch import classify_files
+
+
+class Command(BaseCommand):
+    help = 'Classifies evidence files into rubric documents in a process pool, one JSON line per file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', metavar='PATH', help='Files or directories to classify.')
+        parser.add_argument('--model', help='Model file to use (default: ML_MODEL_PATH).')
+        parser.add_argument('--workers', type=int, help='Worker processes (default: one per CPU).')
+        parser.add_argument('--chunk-size', type=int, default=32, help='Files handed to a worker at a time.')
+        parser.add_argument('--top', type=int, default=3)
+
+    def handle(self, *args, **options):
+        path = options['model'] or classifier.model_path()
+        try:
+            model = classifier.Model(path)
+        except (OSError, ValueError) as error:
+            raise CommandError('Cannot open the model: %s. Run train_classifier first.' % error)
+        model.close()
+
+        def write(path, predictions, error):
+            self.stdout.write(json.dumps({
+                'path': path,
+                'documents': [{'document_id': label, 'score': score} for label, score in predictions],
+                'error': error,
+            }))
+
+        stats = classify_files(
+            options['paths'], model_path=path, workers=options['workers'],
+            chunk_size=options['chunk_size'], top=options['top'], on_result=write,
+        )
+        self.stderr.write('Classified %(files)d file(s) in %(seconds)ss (%(files_per_second)s files/sec).' % stats)
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from ml import classifier
+from ml.training import train_model
+
+
+class Command(BaseCommand):
+    help = 'Trains the evidence classifier from the rubric documents and past evaluations.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', '-o', help='Model file to write (default: ML_MODEL_PATH).')
+        parser.add_argument('--dims', type=int, default=1 << 16, help='Number of hashed features.')
+        parser.add_argument('--per-document', type=int, default=200,
+                            help='Past evaluations used per document at most.')
+
+    def handle(self, *args, **options):
+        path = options['output'] or classifier.model_path()
+        labels = train_model(path=path, dims=options['dims'], per_document=options['per_document'])
+        self.stdout.write(self.style.SUCCESS('Trained %d document(s) into %s.' % (labels, path)))
@@ -0,0 +1,24 @@
+from utility.jobs import set_progress, task
+
+from .batch import classify_files, iter_files
+from .training import train_model
+
+
+@task('ml.train_classifier', max_attempts=1)
+def train_classifier(job, per_document=200):
+    return {'labels': train_model(per_document=per_document)}
+
+
+@task('ml.classify_files')
+def classify(job, paths, workers=None, top=3):
+    # Directories are walked up front, so progress is a share of the files.
+    files = list(iter_files(paths))
+    predictions = {}
+
+    def collect(path, documents, error):
+        predictions[path] = {'documents': documents, 'error': error}
+        if len(predictions) % 100 == 0:
+            set_progress(job, len(predictions) / len(files), '%d files classified' % len(predictions))
+
+    stats = classify_files(files, workers=workers, top=top, on_result=collect)
+    return dict(stats, predictions=predictions)
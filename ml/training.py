@@ -0,0 +1,54 @@
+import time
+
+from document.models import Document
+from document.rubric import get_rubric
+from evaluation.models import Evaluation
+
+from . import classifier
+
+
+def _flatten(value):
+    if isinstance(value, dict):
+        return ' '.join(_flatten(item) for item in value.values())
+    if isinstance(value, list):
+        return ' '.join(_flatten(item) for item in value)
+    return '' if value is None else str(value)
+
+
+def training_examples(per_document=200, chunk_size=2000):
+    """
+    Yields (text, document_id) examples: one per active document from its
+    name, description and rubric path, then up to per_document past
+    evaluations of it from their comment and details.
+    """
+    rubric = get_rubric()
+    active = set()
+    for document in Document.objects.filter(is_active=True).only('document_name', 'document_description'):
+        node = rubric.document(document.pk)
+        path = node.path.replace('/', ' ').replace('-', ' ') if node else ''
+        active.add(document.pk)
+        yield '%s %s %s' % (document.document_name, document.document_description or '', path), document.pk
+
+    seen = {}
+    evaluations = Evaluation.objects.filter(is_active=True, document_id__in=active).values_list('document_id', 'comment', 'details')
+    for document_id, comment, details in evaluations.iterator(chunk_size=chunk_size):
+        if seen.get(document_id, 0) >= per_document:
+            continue
+        seen[document_id] = seen.get(document_id, 0) + 1
+        yield '%s %s' % (comment, _flatten(details)), document_id
+
+
+def train_model(path=None, dims=1 << 16, per_document=200):
+    """
+    Trains the evidence classifier from the database and writes it to the
+    model file. Returns the number of labels.
+    """
+    started = time.perf_counter()
+    examples = list(training_examples(per_document=per_document))
+    labels, idf, weights = classifier.train(examples, dims=dims)
+    classifier.save(path or classifier.model_path(), labels, idf, weights, metadata={
+        'examples': len(examples),
+        'trained_at': time.time(),
+        'training_seconds': round(time.perf_counter() - started, 3),
+    })
+    return len(labels)
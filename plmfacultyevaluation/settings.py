@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/4.2/ref/settings/
 
 from pathlib import Path
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -60,6 +61,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'utility.middleware.ReplicaPinningMiddleware', # read-only requests read from replicas
+    'utility.middleware.VersionScopeMiddleware', # one version lookup per data set per request
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -69,6 +72,7 @@ MIDDLEWARE = [
     'django_browser_reload.middleware.BrowserReloadMiddleware', # browser reload
     
     'corsheaders.middleware.CorsMiddleware',    # cross origin resource sharing
+    'utility.middleware.QueryInspectorMiddleware', # per-request query counts
 ]
 
 ROOT_URLCONF = 'plmfacultyevaluation.urls'
@@ -106,6 +110,51 @@ DATABASES = {
     }
 }
 
+# Read replicas of the primary, one per host in DATABASE_REPLICA_HOSTS
+# (comma separated). Tests give each its own database.
+for number, host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES['replica%d' % number] = dict(
+        DATABASES['default'], HOST=host.strip(), TEST={'NAME': 'test_plmfacultyevaluation_replica%d' % number},
+    )
+
+DATABASE_REPLICAS = [alias for alias in DATABASES if alias != 'default']
+
+# A second database the replica routing tests (utility.tests) use as their
+# replica. It is only configured for `manage.py test` (or with
+# DATABASE_TEST_REPLICA=1 for other runners), so nothing else can route to it.
+DATABASE_TEST_REPLICA = 'replica_test'
+if sys.argv[1:2] == ['test'] or os.environ.get('DATABASE_TEST_REPLICA') == '1':
+    DATABASES[DATABASE_TEST_REPLICA] = dict(DATABASES['default'], TEST={'NAME': 'test_plmfacultyevaluation_replica'})
+DATABASE_ROUTERS = ['utility.routers.ReplicaRouter']
+
+# Replicas the read-only requests of each app (URL namespace) may read from,
+# and how long a client stays on the primary after it writes
+DATABASE_REPLICA_APPS = {
+    'report': DATABASE_REPLICAS,
+    'interface': DATABASE_REPLICAS,
+    'api': DATABASE_REPLICAS,
+}
+DATABASE_REPLICA_PIN_SECONDS = 10
+DATABASE_REPLICA_PIN_COOKIE = 'db_primary'
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Compiled data such as the rubric is versioned through this cache, so it has
+# to be shared by every worker process; point CACHE_BACKEND and CACHE_LOCATION
+# at Redis or Memcached in production. The database cache needs
+# `manage.py createcachetable`.
+
+CACHES = {
+    'default': {
+        'BACKEND': os.environ.get('CACHE_BACKEND', 'django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': os.environ.get('CACHE_LOCATION', 'plm_cache'),
+    }
+}
+
+# The cache holding the versions of compiled data (see utility.versioning);
+# a process-local backend fails the utility.E001 check
+VERSION_CACHE_ALIAS = 'default'
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -146,6 +195,18 @@ STATICFILES_DIRS = [
 ]
 MEDIA_URL = '/images/'
 
+# Stream multipart uploads to temporary files instead of memory
+FILE_UPLOAD_HANDLERS = ['django.core.files.uploadhandler.TemporaryFileUploadHandler']
+
+# Evidence files, stored once per content hash (evaluation.evidence)
+EVIDENCE_ROOT = os.path.join(BASE_DIR, 'media', 'evidence')
+EVIDENCE_CHUNK_SIZE = 1024 * 1024
+EVIDENCE_MAX_SIZE = 50 * 1024 * 1024
+
+# Evidence previews, rendered on first request (evaluation.previews)
+EVIDENCE_PREVIEW_ROOT = os.path.join(BASE_DIR, 'media', 'previews')
+EVIDENCE_PREVIEW_CACHE_BYTES = 512 * 1024 * 1024
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -162,4 +223,45 @@ INTERNAL_IPS = [
 # For creating custom user model
 AUTH_USER_MODEL = 'account.Account'
 
+# Loads request.user with its college, department and rank in one query and
+# caches it per account for IDENTITY_CACHE_TIMEOUT seconds (0 disables the cache)
+AUTHENTICATION_BACKENDS = ['account.backends.IdentityBackend']
+IDENTITY_CACHE_ALIAS = 'default'
+IDENTITY_CACHE_TIMEOUT = 60
+
+# Where login_required sends anonymous users
+LOGIN_URL = 'interface:homepage'
+
+# Cache holding the per-account dashboard summaries
+DASHBOARD_CACHE_ALIAS = 'default'
+DASHBOARD_CACHE_TIMEOUT = 300
+
+# Share of requests whose queries are recorded, and how often one query shape
+# has to repeat in a request to be reported as a likely N+1
+SQL_INSPECTOR_SAMPLE_RATE = 1.0 if DEBUG else 0.01
+SQL_INSPECTOR_THRESHOLD = 5
+
+# Serve the async dashboard, profile and evaluate views. Turn on for the ASGI
+# deployment (asgi.py), leave off under WSGI.
+INTERFACE_ASYNC_VIEWS = os.environ.get('INTERFACE_ASYNC_VIEWS', '') == '1'
+
+# Evidence classifier written by train_classifier
+ML_MODEL_PATH = os.path.join(BASE_DIR, 'ml', 'models', 'evidence.model')
+
+# Background jobs (utility.jobs): how long a claim lasts without progress
+# before another worker takes the job over, and the first retry delay
+JOB_LEASE_SECONDS = 300
+JOB_RETRY_DELAY_SECONDS = 30
+
+# Largest batch accepted by the bulk evaluation endpoint (api/evaluations/bulk/)
+API_BULK_MAX_ITEMS = 1000
+
+# How long a reviewer's claim on a review item lasts unless renewed, and how
+# many items one claim may take (evaluation.review)
+REVIEW_LEASE_SECONDS = 15 * 60
+REVIEW_CLAIM_MAX = 50
+
+# Upstream HR feed applied by sync_hr (integration.sync): a JSON/JSONL file or an http(s) URL
+HR_SYNC_FEED = os.environ.get('HR_SYNC_FEED', '')
+
 # NPM_BIN_PATH = r'C:\Program Files\nodejs\npm.cmd'
\ No newline at end of file
@@ -22,4 +22,7 @@ urlpatterns = [
     path('', include ('interface.urls')),
     path("__reload__/", include("django_browser_reload.urls")),
     path('api/', include('api.urls')),
+    path('evaluation/', include('evaluation.urls')),
+    path('report/', include('report.urls')),
+    path('utility/', include('utility.urls')),
 ]
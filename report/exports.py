@@ -0,0 +1,211 @@
+import csv
+import re
+import zipfile
+from datetime import datetime, time, timedelta
+from xml.sax.saxutils import escape
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.utils import timezone
+
+from document.rubric import get_rubric
+from evaluation.models import Evaluation
+
+
+# (header, Evaluation lookup) of every exported column, in order. The rubric
+# path is not a column of the query; it is filled in from the compiled rubric.
+COLUMNS = (
+    ('evaluation_id', 'evaluation_id'),
+    ('email', 'account__email'),
+    ('faculty_id', 'account__faculty_id'),
+    ('first_name', 'account__first_name'),
+    ('last_name', 'account__last_name'),
+    ('college', 'account__college__college_name'),
+    ('department', 'account__department__department_name'),
+    ('document_id', 'document_id'),
+    ('document_name', 'document__document_name'),
+    ('rubric_path', None),
+    ('score', 'score'),
+    ('comment', 'comment'),
+    ('details', 'details'),
+    ('is_active', 'is_active'),
+    ('date_created', 'date_created'),
+    ('date_updated', 'date_updated'),
+)
+
+HEADER = [header for header, lookup in COLUMNS]
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def _start_of_day(date):
+    return timezone.make_aware(datetime.combine(date, time.min))
+
+
+def export_queryset(college=None, department=None, date_from=None, date_to=None, is_active=None):
+    """
+    Returns the evaluations to export as a values_list queryset in id order.
+    """
+    queryset = Evaluation.objects.all()
+    if college is not None:
+        queryset = queryset.filter(account__college=college)
+    if department is not None:
+        queryset = queryset.filter(account__department=department)
+    if date_from is not None:
+        queryset = queryset.filter(date_created__gte=_start_of_day(date_from))
+    if date_to is not None:
+        queryset = queryset.filter(date_created__lt=_start_of_day(date_to + timedelta(days=1)))
+    if is_active is not None:
+        queryset = queryset.filter(is_active=is_active)
+    return queryset.order_by('evaluation_id').values_list(*[lookup for header, lookup in COLUMNS if lookup])
+
+
+def iter_rows(queryset, chunk_size=2000):
+    """
+    Yields export rows from a server-side cursor, chunk_size rows at a time,
+    so memory use does not depend on the number of rows.
+    """
+    rubric = get_rubric()
+    path_index = HEADER.index('rubric_path')
+    document_index = HEADER.index('document_id')
+    encoder = DjangoJSONEncoder()
+    details_index = HEADER.index('details') - 1
+    for row in queryset.iterator(chunk_size=chunk_size):
+        row = list(row)
+        row[details_index] = encoder.encode(row[details_index])
+        document = rubric.document(row[document_index])
+        row.insert(path_index, document.path if document else '')
+        yield row
+
+
+class Echo:
+    """
+    A file-like object that returns what is written to it, for csv.writer.
+    """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(rows):
+    writer = csv.writer(Echo())
+    yield writer.writerow(HEADER)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+class _ZipStream:
+    """
+    A write-only, non-seekable buffer that zipfile can write to while the
+    written bytes are drained as they are produced.
+    """
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_INVALID_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_PARTS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Evaluations" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _xlsx_cell(value):
+    if isinstance(value, bool) or value is None:
+        value = '' if value is None else str(value)
+    elif isinstance(value, (int, float)) or hasattr(value, 'is_finite'):
+        return '<c><v>%s</v></c>' % value
+    return '<c t="inlineStr"><is><t xml:space="preserve">%s</t></is></c>' % escape(_INVALID_XML.sub('', str(value)))
+
+
+def iter_xlsx(rows, flush_every=500):
+    """
+    Yields an XLSX workbook with a single sheet as it is written. Cells are
+    inline strings and numbers, so no shared-string table has to be held in
+    memory.
+    """
+    stream = _ZipStream()
+    with zipfile.ZipFile(stream, 'w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _XLSX_PARTS.items():
+            workbook.writestr(name, content)
+        yield stream.drain()
+
+        with workbook.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+            sheet.write(
+                b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+            )
+            buffered = ['<row>%s</row>' % ''.join(_xlsx_cell(value) for value in HEADER)]
+            for row in rows:
+                buffered.append('<row>%s</row>' % ''.join(_xlsx_cell(value) for value in row))
+                if len(buffered) >= flush_every:
+                    sheet.write(''.join(buffered).encode('utf-8'))
+                    buffered = []
+                    yield stream.drain()
+            buffered.append('</sheetData></worksheet>')
+            sheet.write(''.join(buffered).encode('utf-8'))
+    yield stream.drain()
+
+
+def iter_export(format, rows):
+    """
+    Yields the encoded chunks of an export in the given format ('csv' or 'xlsx').
+    """
+    if format == 'csv':
+        return (chunk.encode('utf-8') for chunk in iter_csv(rows))
+    if format == 'xlsx':
+        return iter_xlsx(rows)
+    raise ValueError('Unknown export format %r' % format)
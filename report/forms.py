@@ -0,0 +1,18 @@
+from django import forms
+
+from account.models import College, Department
+
+
+class ExportFilterForm(forms.Form):
+    college = forms.ModelChoiceField(queryset=College.objects.all(), required=False)
+    department = forms.ModelChoiceField(queryset=Department.objects.all(), required=False)
+    date_from = forms.DateField(required=False)
+    date_to = forms.DateField(required=False)
+    is_active = forms.NullBooleanField(required=False)
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError('date_from must not be after date_to.')
+        return cleaned_data
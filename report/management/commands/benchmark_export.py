@@ -0,0 +1,65 @@
+import json
+import os
+import resource
+import time
+
+from django.core.management.base import BaseCommand
+
+from report.exports import export_queryset, iter_export, iter_rows
+
+from .export_evaluations import add_filter_arguments, filters_from_options
+
+
+def current_rss():
+    """
+    Returns the resident set size of this process in bytes, falling back to
+    the peak RSS where /proc is not available.
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+class Command(BaseCommand):
+    help = 'Runs an evaluation export to /dev/null and reports throughput and memory use as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--sample-every', type=int, default=10000, help='Rows between RSS samples.')
+        add_filter_arguments(parser)
+
+    def handle(self, *args, **options):
+        counted = {'rows': 0, 'peak_rss': current_rss()}
+        baseline = counted['peak_rss']
+
+        def counting(rows):
+            for row in rows:
+                counted['rows'] += 1
+                if counted['rows'] % options['sample_every'] == 0:
+                    counted['peak_rss'] = max(counted['peak_rss'], current_rss())
+                yield row
+
+        queryset = export_queryset(**filters_from_options(options))
+        started = time.perf_counter()
+        written = 0
+        with open(os.devnull, 'wb') as sink:
+            for chunk in iter_export(options['format'], counting(iter_rows(queryset, chunk_size=options['chunk_size']))):
+                written += len(chunk)
+                sink.write(chunk)
+        elapsed = time.perf_counter() - started
+        counted['peak_rss'] = max(counted['peak_rss'], current_rss())
+
+        self.stdout.write(json.dumps({
+            'benchmark': 'export_evaluations',
+            'format': options['format'],
+            'rows': counted['rows'],
+            'bytes': written,
+            'seconds': round(elapsed, 3),
+            'rows_per_second': round(counted['rows'] / elapsed, 1) if elapsed else None,
+            'baseline_rss_bytes': baseline,
+            'peak_rss_bytes': counted['peak_rss'],
+            'rss_growth_bytes': counted['peak_rss'] - baseline,
+        }))
@@ -0,0 +1,41 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand
+
+from report.exports import export_queryset, iter_export, iter_rows
+
+
+def add_filter_arguments(parser):
+    parser.add_argument('--college', type=int, help='College id.')
+    parser.add_argument('--department', type=int, help='Department id.')
+    parser.add_argument('--from', dest='date_from', type=date.fromisoformat, help='First day of the cycle (YYYY-MM-DD).')
+    parser.add_argument('--to', dest='date_to', type=date.fromisoformat, help='Last day of the cycle (YYYY-MM-DD).')
+    parser.add_argument('--active', dest='is_active', action='store_true', default=None)
+    parser.add_argument('--inactive', dest='is_active', action='store_false')
+
+
+def filters_from_options(options):
+    return {name: options[name] for name in ('college', 'department', 'date_from', 'date_to', 'is_active')}
+
+
+class Command(BaseCommand):
+    help = 'Streams evaluation results joined with account, college, department and rubric path to a file.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=['csv', 'xlsx'], default='csv')
+        parser.add_argument('--output', '-o', help='Output file. Defaults to stdout.')
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        add_filter_arguments(parser)
+
+    def handle(self, *args, **options):
+        rows = iter_rows(export_queryset(**filters_from_options(options)), chunk_size=options['chunk_size'])
+        chunks = iter_export(options['format'], rows)
+        if options['output']:
+            with open(options['output'], 'wb') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
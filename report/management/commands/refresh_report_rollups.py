@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from report import rollups
+
+
+class Command(BaseCommand):
+    help = 'Refreshes the college/department leaderboards and score histograms. Meant to run on a schedule.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucket-width', type=float, help='Width of the histogram buckets in points.')
+
+    def handle(self, *args, **options):
+        standings = rollups.refresh_standings()
+        buckets = rollups.refresh_histograms(bucket_width=options['bucket_width'])
+        self.stdout.write(self.style.SUCCESS('Refreshed %d standings and %d histogram buckets.' % (standings, buckets)))
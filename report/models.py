@@ -1,3 +1,90 @@
 from django.db import models
+from django.conf import settings
 
-# Create your models here.
+from account.models import College, Department
+from document.models import DocMajorComponent
+
+
+class FacultyStanding(models.Model):
+    """
+    A model holding the precomputed total points and position of a faculty
+    member within their college and department.
+
+    Attributes:
+        facultystanding_id (int): The primary key of the standing.
+        account (int): The foreign key referencing the AUTH_USER_MODEL.
+        college (int): The college of the account when the standing was computed.
+        department (int): The department of the account when the standing was computed.
+        total_points (Decimal): The capped points of the account over all major components.
+        college_position (int): The position of the account within its college, 1 being the highest.
+        department_position (int): The position of the account within its department, 1 being the highest.
+        date_refreshed (datetime): The date when the standing was computed.
+    """
+    facultystanding_id = models.AutoField(primary_key=True)
+    account = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
+    college = models.ForeignKey(College, on_delete=models.CASCADE, null=True, blank=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, null=True, blank=True)
+    
+    total_points = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    college_position = models.IntegerField(null=True, blank=True)
+    department_position = models.IntegerField(null=True, blank=True)
+    
+    date_refreshed = models.DateTimeField()
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['college', 'college_position'], name='standing_college_pos_idx'),
+            models.Index(fields=['department', 'department_position'], name='standing_department_pos_idx'),
+        ]
+    
+    def __str__(self):
+        return f'{self.account_id} : {self.total_points}'
+
+
+class ScoreBucket(models.Model):
+    """
+    A model holding one bar of the score histogram of a major component.
+
+    Attributes:
+        scorebucket_id (int): The primary key of the bucket.
+        docmajor (int): The foreign key referencing the DocMajorComponent model.
+        lower_bound (Decimal): The lowest points counted in the bucket.
+        upper_bound (Decimal): The points the bucket ends before.
+        faculty_count (int): The number of faculty whose points fall in the bucket.
+        date_refreshed (datetime): The date when the bucket was computed.
+    """
+    scorebucket_id = models.AutoField(primary_key=True)
+    docmajor = models.ForeignKey(DocMajorComponent, on_delete=models.CASCADE)
+    lower_bound = models.DecimalField(max_digits=12, decimal_places=2)
+    upper_bound = models.DecimalField(max_digits=12, decimal_places=2)
+    faculty_count = models.IntegerField(default=0)
+    date_refreshed = models.DateTimeField()
+    
+    class Meta:
+        ordering = ['docmajor', 'lower_bound']
+        constraints = [
+            models.UniqueConstraint(fields=['docmajor', 'lower_bound'], name='unique_scorebucket_docmajor_lower_bound'),
+        ]
+    
+    def __str__(self):
+        return f'{self.docmajor_id} : {self.lower_bound}-{self.upper_bound} = {self.faculty_count}'
+
+
+class RollupRefresh(models.Model):
+    """
+    A model recording when each report rollup was last refreshed, so readers
+    can tell how stale it is.
+
+    Attributes:
+        name (str): The name of the rollup.
+        date_refreshed (datetime): The date when the rollup was last refreshed.
+        duration (float): The number of seconds the refresh took.
+        rows (int): The number of rows the refresh wrote.
+    """
+    name = models.CharField(max_length=100, primary_key=True)
+    date_refreshed = models.DateTimeField()
+    duration = models.FloatField(default=0)
+    rows = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return self.name
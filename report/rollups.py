@@ -0,0 +1,174 @@
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Sum
+from django.utils import timezone
+
+from account.promotion import roster
+from evaluation.models import EvaluationRollup
+from utility.versioning import bump_version
+
+from .models import FacultyStanding, ScoreBucket, RollupRefresh
+
+
+ZERO = Decimal('0.00')
+
+STANDINGS = 'standings'
+HISTOGRAMS = 'histograms'
+
+
+def _positions(totals):
+    """
+    Returns {account_id: position} for (account_id, points) pairs, ranking the
+    highest points first. Ties share a position and the next one is skipped.
+    """
+    positions = {}
+    ordered = sorted(totals, key=lambda total: (-total[1], total[0]))
+    previous = None
+    for index, (account_id, points) in enumerate(ordered, start=1):
+        if points != previous:
+            position = index
+            previous = points
+        positions[account_id] = position
+    return positions
+
+
+def _record(name, started, rows):
+    RollupRefresh.objects.update_or_create(
+        name=name,
+        defaults={'date_refreshed': timezone.now(), 'duration': time.perf_counter() - started, 'rows': rows},
+    )
+
+
+def refresh_standings(batch_size=2000):
+    """
+    Recomputes the standing of every faculty member on the promotion roster
+    from the evaluation rollups. The totals come from a single GROUP BY over
+    the (small) rollup table, never from the raw evaluations.
+    """
+    started = time.perf_counter()
+    points = dict(
+        EvaluationRollup.objects.values('account_id').annotate(total=Sum('points')).order_by()
+        .values_list('account_id', 'total')
+    )
+    accounts = roster().values_list('pk', 'college_id', 'department_id')
+
+    by_college = defaultdict(list)
+    by_department = defaultdict(list)
+    rows = []
+    for account_id, college_id, department_id in accounts.iterator(chunk_size=batch_size):
+        total = points.get(account_id) or ZERO
+        rows.append((account_id, college_id, department_id, total))
+        if college_id is not None:
+            by_college[college_id].append((account_id, total))
+        if department_id is not None:
+            by_department[department_id].append((account_id, total))
+
+    college_positions = {}
+    for totals in by_college.values():
+        college_positions.update(_positions(totals))
+    department_positions = {}
+    for totals in by_department.values():
+        department_positions.update(_positions(totals))
+
+    now = timezone.now()
+    with transaction.atomic():
+        FacultyStanding.objects.all().delete()
+        FacultyStanding.objects.bulk_create(
+            (
+                FacultyStanding(
+                    account_id=account_id,
+                    college_id=college_id,
+                    department_id=department_id,
+                    total_points=total,
+                    college_position=college_positions.get(account_id),
+                    department_position=department_positions.get(account_id),
+                    date_refreshed=now,
+                )
+                for account_id, college_id, department_id, total in rows
+            ),
+            batch_size=batch_size,
+        )
+        _record(STANDINGS, started, len(rows))
+        transaction.on_commit(lambda: bump_version(STANDINGS))
+    return len(rows)
+
+
+def refresh_histograms(bucket_width=None):
+    """
+    Recomputes the score histogram of every major component from the
+    evaluation rollups. Faculty on the promotion roster without points in a
+    component count towards its lowest bucket.
+    """
+    started = time.perf_counter()
+    width = Decimal(str(bucket_width or getattr(settings, 'REPORT_HISTOGRAM_BUCKET_WIDTH', 5)))
+    faculty = roster().count()
+    totals = (
+        EvaluationRollup.objects.filter(account__in=roster())
+        .values('docmajor_id', 'account_id').annotate(total=Sum('points')).order_by()
+        .values_list('docmajor_id', 'total')
+    )
+
+    counts = defaultdict(Counter)
+    for docmajor_id, total in totals.iterator():
+        counts[docmajor_id][(total // width) * width] += 1
+
+    now = timezone.now()
+    buckets = []
+    for docmajor_id, counter in counts.items():
+        counter[ZERO] += faculty - sum(counter.values())
+        for lower_bound, faculty_count in counter.items():
+            if faculty_count > 0:
+                buckets.append(ScoreBucket(
+                    docmajor_id=docmajor_id,
+                    lower_bound=lower_bound,
+                    upper_bound=lower_bound + width,
+                    faculty_count=faculty_count,
+                    date_refreshed=now,
+                ))
+
+    with transaction.atomic():
+        ScoreBucket.objects.all().delete()
+        ScoreBucket.objects.bulk_create(buckets)
+        _record(HISTOGRAMS, started, len(buckets))
+    return len(buckets)
+
+
+def refresh_all():
+    return {STANDINGS: refresh_standings(), HISTOGRAMS: refresh_histograms()}
+
+
+def last_refreshed(name):
+    """
+    Returns when the named rollup was last refreshed, or None if it never was.
+    """
+    return RollupRefresh.objects.filter(name=name).values_list('date_refreshed', flat=True).first()
+
+
+def leaderboard(college=None, department=None, limit=50):
+    """
+    Returns the top standings of a college or department, by position.
+    """
+    standings = FacultyStanding.objects.select_related('account')
+    if department is not None:
+        return standings.filter(department=department, department_position__isnull=False).order_by('department_position', 'account_id')[:limit]
+    if college is not None:
+        return standings.filter(college=college, college_position__isnull=False).order_by('college_position', 'account_id')[:limit]
+    return standings.order_by('-total_points', 'account_id')[:limit]
+
+
+def histograms():
+    """
+    Returns (DocMajorComponent, [ScoreBucket, ...], largest faculty_count) for
+    every component with a histogram.
+    """
+    result = defaultdict(list)
+    for bucket in ScoreBucket.objects.select_related('docmajor'):
+        result[bucket.docmajor].append(bucket)
+    return [
+        (docmajor, buckets, max(bucket.faculty_count for bucket in buckets))
+        for docmajor, buckets in result.items()
+    ]
@@ -0,0 +1,38 @@
+import os
+from datetime import date
+
+from utility.jobs import set_progress, task
+
+from . import rollups
+from .exports import export_queryset, iter_export, iter_rows
+
+
+@task('report.refresh_rollups', max_attempts=1)
+def refresh_rollups(job):
+    return rollups.refresh_all()
+
+
+@task('report.export_evaluations')
+def export_evaluations(job, path, format='csv', college=None, department=None, date_from=None, date_to=None, is_active=None):
+    queryset = export_queryset(
+        college=college, department=department, is_active=is_active,
+        date_from=date.fromisoformat(date_from) if date_from else None,
+        date_to=date.fromisoformat(date_to) if date_to else None,
+    )
+    total = queryset.count()
+    written = 0
+
+    def counted(rows):
+        nonlocal written
+        for row in rows:
+            written += 1
+            if written % 10000 == 0:
+                set_progress(job, written / total if total else 1, '%d of %d rows' % (written, total))
+            yield row
+
+    partial = path + '.partial'
+    with open(partial, 'wb') as target:
+        for chunk in iter_export(format, counted(iter_rows(queryset))):
+            target.write(chunk)
+    os.replace(partial, path)
+    return {'path': path, 'rows': written}
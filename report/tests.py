@@ -1,3 +1,30 @@
 from django.test import TestCase
 
-# Create your tests here.
+from account.models import Account, College
+from document.models import DocMajorComponent, Document
+from evaluation.models import Evaluation
+
+from . import rollups
+from .models import FacultyStanding, ScoreBucket
+
+
+class RollupRefreshTests(TestCase):
+
+    def setUp(self):
+        college = College.objects.create(college_name='Engineering', college_abbreviation='CET')
+        self.faculty = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw', college=college, faculty_id='F-1')
+        self.idle = Account.objects.create_user(email='idle@plm.edu.ph', password='pw', college=college, faculty_id='F-2')
+        self.staff = Account.objects.create_user(email='staff@plm.edu.ph', password='pw', college=college)
+        self.major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        for account in (self.faculty, self.staff):
+            document = Document.objects.create(docmajor=self.major, document_name='Diploma', points=10, max_points=25)
+            Evaluation.objects.create(account=account, document=document, score=10, comment='', details={})
+
+    def test_only_the_roster_is_ranked(self):
+        rollups.refresh_standings()
+        standings = FacultyStanding.objects.order_by('college_position').values_list('account_id', 'college_position')
+        self.assertEqual(list(standings), [(self.faculty.pk, 1), (self.idle.pk, 2)])
+
+        rollups.refresh_histograms(bucket_width=5)
+        buckets = ScoreBucket.objects.filter(docmajor=self.major).order_by('lower_bound')
+        self.assertEqual([(bucket.lower_bound, bucket.faculty_count) for bucket in buckets], [(0, 1), (10, 1)])
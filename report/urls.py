@@ -0,0 +1,10 @@
+from django.urls import path
+from . import views
+
+app_name = "report"
+
+
+urlpatterns = [
+    path('leaderboard/', views.leaderboard, name="leaderboard"),
+    path('export/evaluations.<str:format>', views.export_evaluations, name="export_evaluations"),
+]
@@ -1,3 +1,60 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.contrib.auth.decorators import login_required
+from django.http import Http404, HttpResponseBadRequest, StreamingHttpResponse
+from django.shortcuts import get_object_or_404, render
+from django.utils import timezone
 
-# Create your views here.
+from account.models import College, Department
+
+from . import rollups
+from .exports import CONTENT_TYPES, export_queryset, iter_export, iter_rows
+from .forms import ExportFilterForm
+
+
+@staff_member_required
+def export_evaluations(request, format):
+    """
+    Streams the evaluations matching the filters in the query string as CSV or XLSX.
+    """
+    if format not in CONTENT_TYPES:
+        raise Http404
+    form = ExportFilterForm(request.GET)
+    if not form.is_valid():
+        return HttpResponseBadRequest(form.errors.as_text())
+
+    rows = iter_rows(export_queryset(**form.cleaned_data))
+    response = StreamingHttpResponse(iter_export(format, rows), content_type=CONTENT_TYPES[format])
+    filename = 'evaluations-%s.%s' % (timezone.localdate().isoformat(), format)
+    response['Content-Disposition'] = 'attachment; filename="%s"' % filename
+    return response
+
+
+def _object_or_404(model, pk):
+    try:
+        pk = int(pk)
+    except ValueError:
+        raise Http404
+    return get_object_or_404(model, pk=pk)
+
+
+@login_required
+def leaderboard(request):
+    """
+    Shows the leaderboard of a college or department and the score histograms,
+    read only from the precomputed report rollups.
+    """
+    college = department = None
+    if request.GET.get('department'):
+        department = _object_or_404(Department, request.GET['department'])
+    elif request.GET.get('college'):
+        college = _object_or_404(College, request.GET['college'])
+    elif request.user.college_id:
+        college = request.user.college
+
+    return render(request, "report/leaderboard.html", {
+        'college': college,
+        'department': department,
+        'standings': rollups.leaderboard(college=college, department=department),
+        'histograms': rollups.histograms(),
+        'date_refreshed': rollups.last_refreshed(rollups.STANDINGS),
+    })
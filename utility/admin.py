@@ -1,3 +1,132 @@
+from django.conf import settings
 from django.contrib import admin
+from django.contrib.admin.options import IncorrectLookupParameters
+from django.contrib.admin.views.main import ChangeList, ORDER_VAR
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
 
-# Register your models here.
+from .models import Job
+
+
+CURSOR_VAR = 'cursor'
+
+
+def estimate_count(queryset):
+    """
+    Returns the planner's estimate of the number of rows in the queryset, or
+    None when the backend cannot estimate or the estimate is small enough
+    that an exact COUNT(*) is cheap.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+    with connection.cursor() as cursor:
+        if queryset.query.where:
+            sql, params = queryset.query.sql_with_params()
+            cursor.execute('EXPLAIN (FORMAT JSON) ' + sql, params)
+            plan = cursor.fetchone()[0]
+            rows = plan[0]['Plan']['Plan Rows']
+        else:
+            cursor.execute('SELECT reltuples FROM pg_class WHERE oid = %s::regclass', [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+            rows = row[0] if row else -1
+    if rows < getattr(settings, 'ADMIN_ESTIMATED_COUNT_THRESHOLD', 100000):
+        return None
+    return int(rows)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    A paginator that uses the planner's row estimate instead of COUNT(*) on
+    large tables.
+    """
+
+    estimated = False
+
+    @cached_property
+    def count(self):
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            return super().count
+        self.estimated = True
+        return estimate
+
+
+class KeysetChangeList(ChangeList):
+    """
+    A changelist that pages by primary key instead of OFFSET while the list
+    is in its default (newest first) order: each page asks for the rows
+    below the last key of the previous one. Sorting by a column falls back
+    to the usual numbered pages.
+    """
+
+    def __init__(self, request, *args, **kwargs):
+        self.cursor = request.GET.get(CURSOR_VAR)
+        self.next_cursor = None
+        super().__init__(request, *args, **kwargs)
+
+    def get_filters_params(self, params=None):
+        lookup_params = super().get_filters_params(params)
+        lookup_params.pop(CURSOR_VAR, None)
+        return lookup_params
+
+    @property
+    def is_keyset(self):
+        return ORDER_VAR not in self.params
+
+    def get_results(self, request):
+        if not self.is_keyset:
+            return super().get_results(request)
+
+        queryset = self.queryset.order_by('-pk')
+        if self.cursor:
+            try:
+                queryset = queryset.filter(pk__lt=int(self.cursor))
+            except ValueError:
+                raise IncorrectLookupParameters
+        rows = list(queryset[:self.list_per_page + 1])
+        if len(rows) > self.list_per_page:
+            rows = rows[:self.list_per_page]
+            self.next_cursor = rows[-1].pk
+
+        self.paginator = self.model_admin.get_paginator(request, self.queryset, self.list_per_page)
+        self.result_count = self.paginator.count
+        self.show_full_result_count = False
+        self.full_result_count = None
+        self.show_admin_actions = True
+        self.result_list = rows
+        self.can_show_all = False
+        self.multi_page = self.next_cursor is not None or bool(self.cursor)
+
+    def first_page_url(self):
+        return self.get_query_string(remove=[CURSOR_VAR])
+
+    def next_page_url(self):
+        if self.next_cursor is None:
+            return None
+        return self.get_query_string({CURSOR_VAR: self.next_cursor})
+
+
+class ScalableModelAdmin(admin.ModelAdmin):
+    """
+    A ModelAdmin for tables with millions of rows: no exact full count,
+    estimated counts on PostgreSQL and keyset pagination newest first.
+    Subclasses should also set list_select_related for whatever __str__
+    and list_display touch.
+    """
+    ordering = ('-pk',)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    change_list_template = 'admin/keyset_change_list.html'
+
+    def get_changelist(self, request, **kwargs):
+        return KeysetChangeList
+
+
+@admin.register(Job)
+class JobAdmin(ScalableModelAdmin):
+    list_display = ('job_id', 'task', 'status', 'priority', 'progress', 'attempts', 'run_after', 'date_finished')
+    list_filter = ('status', 'task')
+    search_fields = ('=dedupe_key',)
+    readonly_fields = ('locked_by', 'locked_until', 'date_started', 'date_finished', 'result', 'error')
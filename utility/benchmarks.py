@@ -0,0 +1,238 @@
+import platform
+import random
+import statistics
+import time
+from itertools import cycle
+
+import django
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from account.models import College
+from api.views import EvaluationBulkView
+from account.ranking import get_rank_index
+from document.models import Document
+from evaluation.models import Evaluation, EvaluationRollup
+from evaluation.rollup import get_account_totals
+from interface.summary import build_summary
+from report.exports import export_queryset, iter_rows
+
+
+BENCHMARKS = {}
+
+
+def benchmark(name):
+    """
+    Registers a benchmark. The function receives a BenchmarkContext and runs
+    the measured operation once.
+    """
+    def register(function):
+        BENCHMARKS[name] = function
+        return function
+    return register
+
+
+class BenchmarkContext:
+    """
+    Sample data shared by the benchmarks of a run, chosen once so every run
+    over the same dataset and seed measures the same rows.
+    """
+
+    def __init__(self, sample_size=50, seed=0):
+        rng = random.Random(seed)
+        account_ids = list(EvaluationRollup.objects.values_list('account_id', flat=True).distinct().order_by('account_id')[:10000])
+        if not account_ids:
+            account_ids = list(get_user_model().objects.values_list('pk', flat=True).order_by('pk')[:10000])
+        self.account_ids = rng.sample(account_ids, min(sample_size, len(account_ids)))
+        college_ids = list(College.objects.values_list('pk', flat=True).order_by('pk'))
+        self.college_ids = rng.sample(college_ids, min(sample_size, len(college_ids)))
+        self.document_ids = list(Document.objects.filter(is_active=True).values_list('pk', flat=True).order_by('pk'))
+        self.rng = rng
+        self._accounts = cycle(self.account_ids or [None])
+        self._colleges = cycle(self.college_ids or [None])
+
+    def next_account(self):
+        return next(self._accounts)
+
+    def next_college(self):
+        return next(self._colleges)
+
+
+@benchmark('totals.raw')
+def totals_raw(context):
+    list(
+        Evaluation.objects.filter(account_id=context.next_account(), is_active=True)
+        .values('document__docmajor_id').annotate(total=Sum('score')).order_by()
+    )
+
+
+@benchmark('totals.rollup')
+def totals_rollup(context):
+    get_account_totals(context.next_account())
+
+
+@benchmark('dashboard.summary')
+def dashboard_summary(context):
+    account_id = context.next_account()
+    if account_id is not None:
+        build_summary(account_id)
+
+
+@benchmark('rank.roster')
+def rank_roster(context):
+    totals = dict(
+        EvaluationRollup.objects.values('account_id').annotate(total=Sum('points')).order_by()
+        .values_list('account_id', 'total')
+    )
+    get_rank_index().resolve_many(totals)
+
+
+@benchmark('worklist.college')
+def worklist_college(context):
+    list(
+        Evaluation.objects.filter(account__college_id=context.next_college(), is_active=True)
+        .select_related('account', 'document').order_by('-date_updated')[:50]
+    )
+
+
+@benchmark('details.json')
+def details_json(context):
+    # The same filter as details.indexed, read out of the JSON: a full scan.
+    list(
+        Evaluation.objects.filter(details__role='Author', details__year__gte=2020, is_active=True)
+        .values_list('evaluation_id', flat=True)[:500]
+    )
+
+
+@benchmark('details.indexed')
+def details_indexed(context):
+    list(
+        Evaluation.objects.with_details(role='Author', year__gte=2020).filter(is_active=True)
+        .values_list('evaluation_id', flat=True)[:500]
+    )
+
+
+@benchmark('details.institution')
+def details_institution(context):
+    Evaluation.objects.with_details(institution='University of the Philippines', role='Speaker').count()
+
+
+def _records(context, count):
+    return [
+        {
+            'account_id': context.next_account(),
+            'document_id': context.rng.choice(context.document_ids),
+            'score': '1.00',
+            'details': {'institution': 'Pamantasan ng Lungsod ng Maynila', 'year': 2024, 'role': 'Author'},
+        }
+        for i in range(count)
+    ]
+
+
+def _post_bulk(records):
+    request = APIRequestFactory().post('/api/evaluations/bulk/', records, format='json')
+    force_authenticate(request, user=get_user_model()(email='benchmark@example.com', is_staff=True))
+    response = EvaluationBulkView.as_view()(request)
+    assert response.status_code == 200, response.data
+
+
+@benchmark('api.upsert_single')
+def upsert_single(context, count=100):
+    # One request, and so one transaction and rollup refresh, per evaluation.
+    # Rolled back so runs do not grow the dataset.
+    records = _records(context, count)
+    with transaction.atomic():
+        for record in records:
+            _post_bulk([record])
+        transaction.set_rollback(True)
+
+
+@benchmark('api.upsert_bulk')
+def upsert_bulk(context, count=100):
+    records = _records(context, count)
+    with transaction.atomic():
+        _post_bulk(records)
+        transaction.set_rollback(True)
+
+
+@benchmark('export.college')
+def export_college(context, rows=10000):
+    queryset = export_queryset(college=context.next_college())[:rows]
+    for row in iter_rows(queryset):
+        pass
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run(names=None, repeat=5, warmup=1, sample_size=50, seed=0):
+    """
+    Runs the named benchmarks (all by default) and returns the results as a
+    JSON-serializable dict.
+    """
+    context = BenchmarkContext(sample_size=sample_size, seed=seed)
+    results = []
+    for name in names or sorted(BENCHMARKS):
+        function = BENCHMARKS[name]
+        for i in range(warmup):
+            function(context)
+        timings = []
+        queries = 0
+        for i in range(repeat):
+            with CaptureQueriesContext(connection) as captured:
+                started = time.perf_counter()
+                function(context)
+                timings.append((time.perf_counter() - started) * 1000)
+            queries = max(queries, len(captured.captured_queries))
+        results.append({
+            'name': name,
+            'runs': repeat,
+            'median_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(_percentile(timings, 0.95), 3),
+            'min_ms': round(min(timings), 3),
+            'max_ms': round(max(timings), 3),
+            'queries': queries,
+        })
+
+    return {
+        'timestamp': timezone.now().isoformat(),
+        'django': django.get_version(),
+        'python': platform.python_version(),
+        'database': connection.vendor,
+        'dataset': {
+            'faculty': get_user_model().objects.count(),
+            'evaluations': Evaluation.objects.count(),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline, current, threshold=0.2):
+    """
+    Returns the benchmarks whose median got slower than the baseline by more
+    than threshold (a fraction), or that now issue more queries.
+    """
+    previous = {result['name']: result for result in baseline.get('results', [])}
+    regressions = []
+    for result in current['results']:
+        before = previous.get(result['name'])
+        if before is None:
+            continue
+        ratio = result['median_ms'] / before['median_ms'] if before['median_ms'] else None
+        if (ratio is not None and ratio > 1 + threshold) or result['queries'] > before['queries']:
+            regressions.append({
+                'name': result['name'],
+                'baseline_median_ms': before['median_ms'],
+                'median_ms': result['median_ms'],
+                'ratio': round(ratio, 3) if ratio is not None else None,
+                'baseline_queries': before['queries'],
+                'queries': result['queries'],
+            })
+    return regressions
@@ -0,0 +1,21 @@
+from django.conf import settings
+from django.core.checks import Error, register
+
+from .versioning import PROCESS_LOCAL_CACHES
+
+
+@register()
+def check_version_cache(app_configs, **kwargs):
+    """
+    Versions are how one worker tells the others their compiled data is
+    stale, so the cache holding them has to be shared between processes.
+    """
+    alias = getattr(settings, 'VERSION_CACHE_ALIAS', 'default')
+    backend = settings.CACHES.get(alias, {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            'VERSION_CACHE_ALIAS (%r) uses %s, which is not shared between worker processes.' % (alias, backend),
+            hint='Use a shared cache backend such as Redis, Memcached or the database cache.',
+            id='utility.E001',
+        )]
+    return []
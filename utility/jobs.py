@@ -0,0 +1,177 @@
+import traceback
+import uuid
+from collections import namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import autodiscover_modules
+
+from .models import Job
+
+
+Task = namedtuple('Task', ['name', 'function', 'max_attempts', 'priority'])
+
+TASKS = {}
+
+
+def task(name, max_attempts=3, priority=0):
+    """
+    Registers a function as a task. The function is called with the Job and
+    the job's arguments as keyword arguments, and may return a
+    JSON-serializable result. Tasks live in the tasks.py module of their app.
+    """
+    def register(function):
+        TASKS[name] = Task(name, function, max_attempts, priority)
+        return function
+    return register
+
+
+def autodiscover():
+    autodiscover_modules('tasks')
+
+
+def lease_seconds():
+    return getattr(settings, 'JOB_LEASE_SECONDS', 300)
+
+
+def _lease():
+    return timedelta(seconds=lease_seconds())
+
+
+def enqueue(name, arguments=None, priority=None, dedupe_key=None, run_after=None, max_attempts=None):
+    """
+    Queues a job and returns it. When a queued or running job already holds
+    the dedupe_key, that job is returned instead of queueing a second one.
+    """
+    if name not in TASKS:
+        # Web processes never run a worker, so load the tasks modules here.
+        autodiscover()
+    registered = TASKS.get(name)
+    if registered is None:
+        raise KeyError('Unknown task %r' % name)
+    if dedupe_key is not None:
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=[Job.QUEUED, Job.RUNNING]).first()
+        if existing is not None:
+            return existing
+    try:
+        with transaction.atomic():
+            return Job.objects.create(
+                task=name,
+                arguments=arguments or {},
+                priority=registered.priority if priority is None else priority,
+                dedupe_key=dedupe_key,
+                run_after=run_after or timezone.now(),
+                max_attempts=registered.max_attempts if max_attempts is None else max_attempts,
+            )
+    except IntegrityError:
+        # Another process queued the same key in the meantime.
+        existing = Job.objects.filter(dedupe_key=dedupe_key, status__in=[Job.QUEUED, Job.RUNNING]).first()
+        if existing is None:
+            raise
+        return existing
+
+
+def enqueue_on_commit(name, **kwargs):
+    """
+    Queues a job once the current transaction commits, so workers never see
+    a job for rows they cannot read yet.
+    """
+    transaction.on_commit(lambda: enqueue(name, **kwargs))
+
+
+def claim(worker, limit=1):
+    """
+    Claims up to limit runnable jobs for a worker, best priority first, and
+    returns them. On PostgreSQL concurrent workers skip each other's locked
+    rows (FOR UPDATE SKIP LOCKED); elsewhere the claim is a conditional
+    update, so two workers can never both win the same job.
+    """
+    now = timezone.now()
+    token = '%s:%s' % (worker, uuid.uuid4().hex[:12])
+    with transaction.atomic():
+        queued = Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('-priority', 'run_after', 'job_id')
+        if connection.features.has_select_for_update_skip_locked:
+            queued = queued.select_for_update(skip_locked=True)
+        job_ids = list(queued.values_list('job_id', flat=True)[:limit])
+        if not job_ids:
+            return []
+        Job.objects.filter(job_id__in=job_ids, status=Job.QUEUED).update(
+            status=Job.RUNNING, attempts=F('attempts') + 1,
+            locked_by=token, locked_until=now + _lease(), date_started=now,
+        )
+    return list(Job.objects.filter(locked_by=token, status=Job.RUNNING).order_by('-priority', 'run_after', 'job_id'))
+
+
+def set_progress(job, progress, message=''):
+    """
+    Records how far a running job is and renews its claim.
+    """
+    job.progress = max(0.0, min(1.0, progress))
+    job.progress_message = message[:255]
+    job.locked_until = timezone.now() + _lease()
+    Job.objects.filter(job_id=job.job_id, locked_by=job.locked_by).update(
+        progress=job.progress, progress_message=job.progress_message, locked_until=job.locked_until,
+    )
+
+
+def renew(job_ids):
+    """
+    Renews the claims of running jobs, so a job that never reports progress
+    is not taken for one whose worker died. Returns how many were renewed.
+    """
+    if not job_ids:
+        return 0
+    return Job.objects.filter(job_id__in=job_ids, status=Job.RUNNING).update(locked_until=timezone.now() + _lease())
+
+
+def _retry_delay(attempts):
+    base = getattr(settings, 'JOB_RETRY_DELAY_SECONDS', 30)
+    return timedelta(seconds=base * 2 ** (attempts - 1))
+
+
+def run(job):
+    """
+    Runs a claimed job and records its outcome. A failed attempt is queued
+    again with an exponential delay until the job runs out of attempts.
+    Returns True when the job succeeded.
+    """
+    registered = TASKS.get(job.task)
+    try:
+        if registered is None:
+            raise KeyError('Unknown task %r' % job.task)
+        result = registered.function(job, **job.arguments)
+    except Exception:
+        now = timezone.now()
+        failed = job.attempts >= job.max_attempts or registered is None
+        Job.objects.filter(job_id=job.job_id, locked_by=job.locked_by).update(
+            status=Job.FAILED if failed else Job.QUEUED,
+            error=traceback.format_exc(),
+            run_after=now if failed else now + _retry_delay(job.attempts),
+            locked_by='', locked_until=None,
+            date_finished=now if failed else None,
+        )
+        return False
+
+    Job.objects.filter(job_id=job.job_id, locked_by=job.locked_by).update(
+        status=Job.SUCCEEDED, result=result, progress=1.0, error='',
+        locked_by='', locked_until=None, date_finished=timezone.now(),
+    )
+    return True
+
+
+def requeue_stale():
+    """
+    Puts running jobs whose claim lapsed (their worker died) back in the
+    queue, or fails them when they are out of attempts. Returns how many
+    jobs were recovered.
+    """
+    now = timezone.now()
+    stale = Job.objects.filter(status=Job.RUNNING, locked_until__lt=now)
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status=Job.FAILED, error='The worker running the job stopped.', locked_by='', locked_until=None, date_finished=now,
+    )
+    requeued = stale.update(status=Job.QUEUED, locked_by='', locked_until=None)
+    return failed + requeued
@@ -0,0 +1,105 @@
+import http.client
+import statistics
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY, get_user_model
+from django.contrib.sessions.backends.db import SessionStore
+
+from .synthetic import SYNTHETIC_DOMAIN
+
+
+def create_sessions(count, backend='django.contrib.auth.backends.ModelBackend'):
+    """
+    Logs in the first count synthetic faculty by creating their sessions
+    directly, and returns the session keys. Synthetic accounts have unusable
+    passwords, so going through the login form is not an option.
+    """
+    sessions = []
+    for account in get_user_model().objects.filter(email__endswith='@' + SYNTHETIC_DOMAIN).order_by('pk')[:count]:
+        session = SessionStore()
+        session[SESSION_KEY] = account._meta.pk.value_to_string(account)
+        session[BACKEND_SESSION_KEY] = backend
+        session[HASH_SESSION_KEY] = account.get_session_auth_hash()
+        session.create()
+        sessions.append(session.session_key)
+    return sessions
+
+
+def delete_sessions(session_keys):
+    SessionStore.get_model_class().objects.filter(session_key__in=session_keys).delete()
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(fraction * (len(values) - 1))))]
+
+
+def run(base_url, paths, sessions, requests=1000, concurrency=20, timeout=30):
+    """
+    Sends requests GETs spread over the paths from concurrency clients, each
+    with a keep-alive connection and cycling through the sessions, and
+    returns the throughput and latency as a JSON-serializable dict.
+    """
+    url = urlsplit(base_url)
+    connection_class = http.client.HTTPSConnection if url.scheme == 'https' else http.client.HTTPConnection
+    cookie = settings.SESSION_COOKIE_NAME
+    lock = threading.Lock()
+    remaining = [requests]
+    latencies = []
+    statuses = Counter()
+    errors = Counter()
+
+    def client(number):
+        connection = connection_class(url.netloc, timeout=timeout)
+        sent = 0
+        while True:
+            with lock:
+                if remaining[0] <= 0:
+                    break
+                remaining[0] -= 1
+            path = url.path.rstrip('/') + paths[sent % len(paths)]
+            headers = {'Cookie': '%s=%s' % (cookie, sessions[(number + sent * concurrency) % len(sessions)])} if sessions else {}
+            sent += 1
+            started = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=headers)
+                response = connection.getresponse()
+                response.read()
+            except (OSError, http.client.HTTPException) as error:
+                connection.close()
+                connection = connection_class(url.netloc, timeout=timeout)
+                with lock:
+                    errors[type(error).__name__] += 1
+                continue
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies.append(elapsed)
+                statuses[response.status] += 1
+        connection.close()
+
+    threads = [threading.Thread(target=client, args=(number,)) for number in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+
+    return {
+        'base_url': base_url,
+        'paths': paths,
+        'concurrency': concurrency,
+        'requests': len(latencies),
+        'duration_s': round(duration, 3),
+        'requests_per_s': round(len(latencies) / duration, 2) if duration else None,
+        'median_ms': round(statistics.median(latencies) * 1000, 3) if latencies else None,
+        'p95_ms': round(_percentile(latencies, 0.95) * 1000, 3) if latencies else None,
+        'p99_ms': round(_percentile(latencies, 0.99) * 1000, 3) if latencies else None,
+        'max_ms': round(max(latencies) * 1000, 3) if latencies else None,
+        'statuses': {str(status): count for status, count in sorted(statuses.items())},
+        'errors': dict(errors),
+    }
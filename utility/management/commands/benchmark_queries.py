@@ -0,0 +1,51 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utility import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Times the key queries against the current database and emits the results as JSON.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--only', action='append', metavar='NAME', help='Run only the given benchmark. May be repeated.')
+        parser.add_argument('--list', action='store_true', help='List the available benchmarks.')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--warmup', type=int, default=1)
+        parser.add_argument('--sample', type=int, default=50, help='Number of accounts and colleges to sample.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--output', '-o', help='Write the results to this file instead of stdout.')
+        parser.add_argument('--baseline', help='Results of an earlier run to compare against.')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='Slowdown of the median, as a fraction, that counts as a regression.')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name in sorted(benchmarks.BENCHMARKS):
+                self.stdout.write(name)
+            return
+
+        unknown = set(options['only'] or []) - set(benchmarks.BENCHMARKS)
+        if unknown:
+            raise CommandError('Unknown benchmark(s): %s' % ', '.join(sorted(unknown)))
+
+        results = benchmarks.run(
+            names=options['only'], repeat=options['repeat'], warmup=options['warmup'],
+            sample_size=options['sample'], seed=options['seed'],
+        )
+        if options['baseline']:
+            with open(options['baseline']) as baseline:
+                results['regressions'] = benchmarks.compare(json.load(baseline), results, options['threshold'])
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                target.write(output)
+        else:
+            self.stdout.write(output)
+
+        if results.get('regressions'):
+            raise CommandError('%d benchmark(s) regressed: %s' % (
+                len(results['regressions']), ', '.join(regression['name'] for regression in results['regressions']),
+            ))
@@ -0,0 +1,56 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from utility import loadtest
+
+
+class Command(BaseCommand):
+    help = (
+        'Load tests running deployments of the site with the synthetic faculty logged in, and prints the '
+        'throughput and latency of each as JSON. Seed with seed_synthetic first, then serve the same '
+        'database twice, e.g. "gunicorn -w 4 plmfacultyevaluation.wsgi" and '
+        '"uvicorn --workers 4 plmfacultyevaluation.asgi:application", and pass both as --target.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--target', action='append', required=True, metavar='LABEL=URL',
+                            help='A deployment to test, e.g. wsgi=http://127.0.0.1:8000. May be repeated.')
+        parser.add_argument('--path', action='append', dest='paths', metavar='PATH',
+                            help='A path to request. May be repeated (default: the dashboard, evaluate and profile pages).')
+        parser.add_argument('--requests', type=int, default=2000)
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=100, help='Requests sent to each target before measuring.')
+        parser.add_argument('--sessions', type=int, default=200, help='Number of synthetic faculty to log in.')
+        parser.add_argument('--output', '-o', help='Write the results to this file instead of stdout.')
+
+    def handle(self, *args, **options):
+        targets = []
+        for target in options['target']:
+            label, separator, url = target.partition('=')
+            if not separator or not url:
+                raise CommandError('Targets look like LABEL=URL, got %r.' % target)
+            targets.append((label, url))
+        paths = options['paths'] or ['/dashboard/', '/evaluate/', '/profile/']
+
+        sessions = loadtest.create_sessions(options['sessions'])
+        if not sessions:
+            raise CommandError('There are no synthetic faculty to log in; run seed_synthetic first.')
+        try:
+            results = {}
+            for label, url in targets:
+                self.stderr.write('Testing %s at %s...' % (label, url))
+                if options['warmup']:
+                    loadtest.run(url, paths, sessions, requests=options['warmup'], concurrency=options['concurrency'])
+                results[label] = loadtest.run(
+                    url, paths, sessions, requests=options['requests'], concurrency=options['concurrency'],
+                )
+        finally:
+            loadtest.delete_sessions(sessions)
+
+        output = json.dumps(results, indent=2)
+        if options['output']:
+            with open(options['output'], 'w') as target:
+                target.write(output)
+        else:
+            self.stdout.write(output)
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+
+from utility.worker import Worker
+
+
+class Command(BaseCommand):
+    help = 'Runs background jobs from the database queue until stopped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--concurrency', type=int, default=4, help='Jobs run at the same time.')
+        parser.add_argument('--mode', choices=['thread', 'process'], default='thread',
+                            help='Run jobs in threads (I/O bound work) or processes (CPU bound work).')
+        parser.add_argument('--poll-interval', type=float, default=1.0, help='Seconds between polls of an empty queue.')
+        parser.add_argument('--burst', action='store_true', help='Exit once the queue is empty.')
+        parser.add_argument('--max-jobs', type=int, help='Exit after running this many jobs.')
+
+    def handle(self, *args, **options):
+        worker = Worker(concurrency=options['concurrency'], mode=options['mode'], poll_interval=options['poll_interval'])
+        self.stdout.write('Worker %s running up to %d jobs in %s.' % (
+            worker.name, worker.concurrency, 'processes' if options['mode'] == 'process' else 'threads',
+        ))
+        done = worker.run(burst=options['burst'], max_jobs=options['max_jobs'])
+        self.stdout.write(self.style.SUCCESS('Ran %d job(s).' % done))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand
+
+from evaluation import rollup
+from report import rollups
+from utility import synthetic
+
+
+class Command(BaseCommand):
+    help = 'Seeds a synthetic dataset of colleges, faculty, rubric documents and evaluations for benchmarking.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--colleges', type=int, default=10)
+        parser.add_argument('--departments', type=int, default=5, help='Departments per college.')
+        parser.add_argument('--faculty', type=int, default=1000)
+        parser.add_argument('--documents', type=int, default=120)
+        parser.add_argument('--evaluations', type=int, default=100000)
+        parser.add_argument('--batch-size', type=int, default=5000)
+        parser.add_argument('--seed', type=int, help='Random seed, for reproducible datasets.')
+        parser.add_argument('--clear', action='store_true', help='Delete the synthetic data of an earlier run first.')
+        parser.add_argument('--skip-rollups', action='store_true', help='Do not rebuild the rollups afterwards.')
+
+    def handle(self, *args, **options):
+        if options['clear']:
+            deleted, per_model = synthetic.clear()
+            self.stdout.write('Deleted %d rows of earlier synthetic data.' % deleted)
+
+        counts = synthetic.seed(
+            colleges=options['colleges'],
+            departments_per_college=options['departments'],
+            faculty=options['faculty'],
+            documents=options['documents'],
+            evaluations=options['evaluations'],
+            batch_size=options['batch_size'],
+            seed=options['seed'],
+            log=self.stdout.write,
+        )
+
+        if not options['skip_rollups']:
+            self.stdout.write('Rebuilt %d evaluation totals.' % rollup.rebuild())
+            rollups.refresh_all()
+            self.stdout.write('Refreshed the report rollups.')
+        self.stdout.write(self.style.SUCCESS('Seeded %s.' % ', '.join('%d %s' % (n, name) for name, n in counts.items())))
@@ -0,0 +1,281 @@
+import random
+import re
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.utils import timezone
+
+from . import routers, versioning
+
+
+_LITERALS = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER_LISTS = re.compile(r'\((?:\s*\?\s*,)+\s*\?\s*\)')
+_WHITESPACE = re.compile(r'\s+')
+
+
+@lru_cache(maxsize=1024)
+def query_shape(sql):
+    """
+    Returns the SQL with literals and placeholder lists collapsed, so queries
+    that only differ by their parameters share a shape.
+    """
+    shape = _LITERALS.sub('?', sql).replace('%s', '?')
+    shape = _PLACEHOLDER_LISTS.sub('(...)', shape)
+    return _WHITESPACE.sub(' ', shape).strip()
+
+
+class QueryRecorder:
+    """
+    A database execute wrapper that counts the queries of a request, their
+    total time and how often each query shape was repeated.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.shapes = Counter()
+        self.shape_durations = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            shape = query_shape(sql)
+            self.count += 1
+            self.duration += elapsed
+            self.shapes[shape] += 1
+            self.shape_durations[shape] += elapsed
+
+    def repeated(self, threshold):
+        """
+        Returns (shape, count, seconds) of every shape run at least threshold
+        times, the usual sign of a query issued once per row (N+1).
+        """
+        return [
+            (shape, count, self.shape_durations[shape])
+            for shape, count in self.shapes.most_common()
+            if count >= threshold
+        ]
+
+
+_recorder = ContextVar('query_recorder', default=None)
+
+
+def dispatch(execute, sql, params, many, context):
+    """
+    An execute wrapper installed on every connection (see utility.signals)
+    that hands the query to the recorder of the current request, if any. The
+    recorder travels in a context variable, so it follows a request into the
+    threads the async ORM runs its queries in.
+    """
+    recorder = _recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+def install(connection):
+    if dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.insert(0, dispatch)
+
+
+_reports = deque(maxlen=getattr(settings, 'SQL_INSPECTOR_HISTORY', 200))
+_reports_lock = threading.Lock()
+
+
+def recent_reports():
+    """
+    Returns the reports of the most recently inspected requests, newest first.
+    """
+    with _reports_lock:
+        return list(reversed(_reports))
+
+
+def clear_reports():
+    with _reports_lock:
+        _reports.clear()
+
+
+class QueryInspectorMiddleware:
+    """
+    Records the queries of a sample of requests. Inspected responses carry
+    the query count, the database time and the number of repeated query
+    shapes in the X-DB-Queries header, and a report is kept in memory for
+    the staff endpoint. Outside the sample a query costs one context variable
+    lookup.
+
+    Settings:
+        SQL_INSPECTOR_SAMPLE_RATE: fraction of requests to inspect (default 1.0 with DEBUG, else 0.01)
+        SQL_INSPECTOR_THRESHOLD: repetitions of a shape flagged as N+1 (default 5)
+        SQL_INSPECTOR_HISTORY: number of reports kept in memory (default 200)
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'SQL_INSPECTOR_SAMPLE_RATE', 1.0 if settings.DEBUG else 0.01)
+        self.threshold = getattr(settings, 'SQL_INSPECTOR_THRESHOLD', 5)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def _sampled(self):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not self._sampled():
+            return self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            response = self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._report(request, response, recorder, started)
+
+    async def __acall__(self, request):
+        if not self._sampled():
+            return await self.get_response(request)
+
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        token = _recorder.set(recorder)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _recorder.reset(token)
+        return self._report(request, response, recorder, started)
+
+    def _report(self, request, response, recorder, started):
+        elapsed = time.perf_counter() - started
+        repeated = recorder.repeated(self.threshold)
+        response['X-DB-Queries'] = 'count=%d; time=%.1fms; repeated=%d' % (
+            recorder.count, recorder.duration * 1000, len(repeated),
+        )
+        match = getattr(request, 'resolver_match', None)
+        report = {
+            'timestamp': timezone.now().isoformat(),
+            'method': request.method,
+            'path': request.path,
+            'view': match.view_name if match else None,
+            'status': response.status_code,
+            'duration_ms': round(elapsed * 1000, 3),
+            'queries': recorder.count,
+            'db_ms': round(recorder.duration * 1000, 3),
+            'repeated': [
+                {'shape': shape, 'count': count, 'db_ms': round(seconds * 1000, 3)}
+                for shape, count, seconds in repeated
+            ],
+        }
+        with _reports_lock:
+            _reports.append(report)
+        return response
+
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+class ReplicaPinningMiddleware:
+    """
+    Lets the read-only requests of the apps in DATABASE_REPLICA_APPS read
+    from a replica (see utility.routers). A request that writes sets a
+    cookie pinning its client to the primary for DATABASE_REPLICA_PIN_SECONDS,
+    long enough for the replicas to catch up, so users always see their own
+    writes.
+
+    It sits above SessionMiddleware so session writes pin the client too.
+
+    Settings:
+        DATABASE_REPLICA_APPS: URL namespace -> replica aliases its reads may use
+        DATABASE_REPLICA_PIN_SECONDS: how long a client stays on the primary after a write (default 10)
+        DATABASE_REPLICA_PIN_COOKIE: name of the pinning cookie (default "db_primary")
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.pin_seconds = getattr(settings, 'DATABASE_REPLICA_PIN_SECONDS', 10)
+        self.cookie = getattr(settings, 'DATABASE_REPLICA_PIN_COOKIE', 'db_primary')
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = routers.begin()
+        try:
+            response = self.get_response(request)
+            return self._pin(response, routers.current())
+        finally:
+            routers.end(token)
+
+    async def __acall__(self, request):
+        token = routers.begin()
+        try:
+            response = await self.get_response(request)
+            return self._pin(response, routers.current())
+        finally:
+            routers.end(token)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # The app is only known once the URL is resolved; anything read
+        # before this goes to the primary.
+        state = routers.current()
+        if state is None or state.wrote or request.method not in SAFE_METHODS or self.cookie in request.COOKIES:
+            return None
+        match = request.resolver_match
+        app = match.app_names[0] if match and match.app_names else None
+        state.replica = routers.choose_replica(routers.replicas_for(app))
+        return None
+
+    def _pin(self, response, state):
+        if state.wrote and self.pin_seconds:
+            response.set_cookie(self.cookie, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+
+class VersionScopeMiddleware:
+    """
+    Looks up each version (see utility.versioning) at most once per request,
+    so a page reading several compiled data sets, or one several times, pays
+    for one cache round trip per data set. A version bumped by the request
+    itself is seen at once.
+    """
+
+    async_capable = True
+    sync_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = versioning.begin()
+        try:
+            return self.get_response(request)
+        finally:
+            versioning.end(token)
+
+    async def __acall__(self, request):
+        token = versioning.begin()
+        try:
+            return await self.get_response(request)
+        finally:
+            versioning.end(token)
@@ -1,3 +1,81 @@
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
+class Job(models.Model):
+    """
+    A model representing a background job, run by the workers of utility.jobs.
+
+    Attributes:
+        job_id (int): The primary key of the job.
+        task (str): The registered name of the task to run.
+        arguments (dict): The keyword arguments of the task.
+        status (str): Whether the job is queued, running, succeeded or failed.
+        priority (int): Jobs with a higher priority are claimed first.
+        dedupe_key (str): At most one queued or running job may hold a given key.
+        progress (float): How far the job is, from 0 to 1.
+        progress_message (str): A description of the current step.
+        attempts (int): How many times the job has been claimed.
+        max_attempts (int): How many attempts the job gets before it fails.
+        run_after (datetime): The job is not claimed before this date.
+        locked_by (str): The claim token of the worker running the job.
+        locked_until (datetime): When the claim lapses if the worker stops renewing it.
+        result (dict): What the task returned.
+        error (str): The traceback of the last failed attempt.
+        date_created (datetime): The date when the job was enqueued.
+        date_started (datetime): The date when the last attempt started.
+        date_finished (datetime): The date when the job succeeded or failed.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    job_id = models.AutoField(primary_key=True)
+    task = models.CharField(max_length=100)
+    arguments = models.JSONField(default=dict, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    priority = models.IntegerField(default=0)
+    dedupe_key = models.CharField(max_length=255, null=True, blank=True)
+    
+    progress = models.FloatField(default=0)
+    progress_message = models.CharField(max_length=255, blank=True, default='')
+    
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+    
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True, default='')
+    
+    date_created = models.DateTimeField(auto_now_add=True)
+    date_started = models.DateTimeField(null=True, blank=True)
+    date_finished = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            # What claim() scans: the queued jobs, best first
+            models.Index(
+                fields=['-priority', 'run_after', 'job_id'],
+                condition=models.Q(status='queued'), name='job_claim_idx',
+            ),
+            models.Index(fields=['status', 'locked_until'], name='job_status_lease_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['dedupe_key'], condition=models.Q(status__in=['queued', 'running']),
+                name='job_active_dedupe_key',
+            ),
+        ]
+    
+    def __str__(self):
+        return f'{self.task} #{self.job_id} ({self.status})'
@@ -0,0 +1,21 @@
+# The spellings of a boolean accepted in imported files and upstream feeds,
+# compared in lower case.
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'n', 'f'}
+
+
+def parse_bool(value, default=True):
+    """
+    Parses a boolean read from a file or feed. A missing or empty value gives
+    default; anything not in TRUE_VALUES or FALSE_VALUES raises ValueError.
+    """
+    if value is None or value == '':
+        return default
+    if isinstance(value, bool):
+        return value
+    value = str(value).strip().lower()
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError('invalid boolean %r' % value)
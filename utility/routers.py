@@ -0,0 +1,111 @@
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+
+class RoutingState:
+    """
+    How the current request (or replica_reads block) reads the database.
+
+    Attributes:
+        replica (str): The replica alias reads go to, or None for the primary.
+        wrote (bool): Whether anything was written, after which reads stay on the primary.
+    """
+
+    def __init__(self, replica=None):
+        self.replica = replica
+        self.wrote = False
+
+
+# The app label of the model DatabaseCache reads and writes its table through.
+CACHE_APP_LABEL = 'django_cache'
+
+# The state travels in a context variable, so it follows a request into the
+# threads the async ORM runs its queries in; it is mutated rather than reset
+# so a write made in one of those threads is seen by the request too.
+_state = ContextVar('db_routing', default=None)
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def replicas_for(app):
+    """
+    Returns the replica aliases the read-only requests of an app (a URL
+    namespace such as report, interface or api) may read from.
+    """
+    return list(getattr(settings, 'DATABASE_REPLICA_APPS', {}).get(app, []))
+
+
+def choose_replica(aliases):
+    return random.choice(aliases) if aliases else None
+
+
+def begin(replica=None):
+    """
+    Starts routing for the current context and returns the token to end() it with.
+    """
+    return _state.set(RoutingState(replica))
+
+
+def end(token):
+    _state.reset(token)
+
+
+def current():
+    return _state.get()
+
+
+@contextmanager
+def replica_reads(alias=None):
+    """
+    Sends the reads of the block to a replica (alias, or a random one), for
+    tasks and commands that only read, such as report exports. Reads made
+    after the block writes go back to the primary.
+    """
+    token = begin(alias or choose_replica(replicas()))
+    try:
+        yield current()
+    finally:
+        end(token)
+
+
+class ReplicaRouter:
+    """
+    Sends reads to a replica while the current request or block is routed
+    to one (see ReplicaPinningMiddleware and replica_reads), and everything
+    else to the primary. Once anything is written, or inside a transaction
+    on the primary, reads stay on the primary so the code can read its own
+    writes.
+
+    The database cache always uses the primary, and its writes do not count
+    as the request writing.
+    """
+
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is None:
+            return None
+        if model._meta.app_label == CACHE_APP_LABEL:
+            return DEFAULT_DB_ALIAS
+        # Rows already read from the replica would otherwise keep pulling
+        # their relations from it.
+        if state.replica is None or state.wrote or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _state.get()
+        if state is not None and model._meta.app_label != CACHE_APP_LABEL:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        aliases = {DEFAULT_DB_ALIAS, *replicas()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
@@ -0,0 +1,9 @@
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from . import middleware
+
+
+@receiver(connection_created)
+def install_query_recorder(sender, connection, **kwargs):
+    middleware.install(connection)
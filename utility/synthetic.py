@@ -0,0 +1,267 @@
+import random
+from collections import Counter
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from account.models import *
+from document.models import *
+from evaluation.models import Evaluation
+
+
+SYNTHETIC_DOMAIN = 'synthetic.plm.edu.ph'
+
+# The description of every synthetic college, department, rank, salary grade
+# and rubric component, so clear() can find them again.
+SYNTHETIC_MARKER = 'Synthetic data (seed_synthetic).'
+
+MAJORS = {
+    'Academic Qualifications': ['Highest Relevant Degree', 'Additional Degree', 'Additional Credits'],
+    'Experience and Professional Services': ['Academic Experience', 'Industry Experience', 'Administrative Designation'],
+    'Professional Development': ['Research', 'Training and Seminars', 'Awards and Recognition', 'Expert Services'],
+}
+
+RANKS = [
+    ('Instructor', 3),
+    ('Assistant Professor', 4),
+    ('Associate Professor', 5),
+    ('Professor', 6),
+]
+
+INSTITUTIONS = [
+    'Pamantasan ng Lungsod ng Maynila', 'University of the Philippines', 'Ateneo de Manila University',
+    'De La Salle University', 'University of Santo Tomas', 'Mapua University', 'Polytechnic University of the Philippines',
+]
+
+ROLES = ['Author', 'Co-author', 'Participant', 'Speaker', 'Organizer', 'Adviser']
+
+DETAILS_SCHEMA = {
+    'institution': {'type': 'string', 'required': True},
+    'year': {'type': 'integer', 'required': True},
+    'role': {'type': 'string', 'choices': ROLES},
+}
+
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def clear():
+    """
+    Deletes the synthetic faculty (and with them their evaluations and
+    history), then the colleges, departments, ranks and rubric seeded with
+    them. Returns the number of rows deleted and the count per model.
+    """
+    deleted = Counter()
+
+    def delete(queryset):
+        total, per_model = queryset.delete()
+        deleted.update(per_model)
+
+    with transaction.atomic():
+        delete(get_user_model().objects.filter(email__endswith='@' + SYNTHETIC_DOMAIN))
+        subranks = list(
+            FacultyRank.objects.filter(rank__rank_description=SYNTHETIC_MARKER).values_list('subrank_id', flat=True)
+        )
+        delete(Rank.objects.filter(rank_description=SYNTHETIC_MARKER))
+        delete(SubRank.objects.filter(pk__in=subranks))
+        delete(SalaryGrade.objects.filter(salarygrade_description=SYNTHETIC_MARKER))
+        delete(College.objects.filter(college_description=SYNTHETIC_MARKER))
+        delete(Department.objects.filter(department_description=SYNTHETIC_MARKER))
+        delete(DocMajorComponent.objects.filter(docmajorcomponent_description=SYNTHETIC_MARKER))
+        delete(DocCategory.objects.filter(doccategory_description=SYNTHETIC_MARKER))
+    return sum(deleted.values()), dict(deleted)
+
+
+def seed_organization(colleges, departments_per_college):
+    created = []
+    for c in range(colleges):
+        college = College.objects.create(
+            college_name='College %d' % (c + 1), college_abbreviation='C%d' % (c + 1),
+            college_description=SYNTHETIC_MARKER,
+        )
+        departments = Department.objects.bulk_create([
+            Department(
+                department_name='Department %d-%d' % (c + 1, d + 1), department_abbreviation='D%d-%d' % (c + 1, d + 1),
+                department_description=SYNTHETIC_MARKER,
+            )
+            for d in range(departments_per_college)
+        ])
+        created.append((college, departments))
+    return created
+
+
+def seed_ranks(points_per_band=20):
+    """
+    Creates contiguous FacultyRank bands from Instructor I up to Professor VI.
+    """
+    bands = []
+    minpoints = 0
+    grade = 12
+    for rank_name, tiers in RANKS:
+        rank = Rank.objects.create(rank_name=rank_name, rank_description=SYNTHETIC_MARKER)
+        for tier in range(1, tiers + 1):
+            subrank = SubRank.objects.create(subrank_tier=str(tier), subrank_description='%s %s' % (rank_name, tier))
+            salarygrade = SalaryGrade.objects.create(
+                salarygrade_tier='SG %d' % grade, salary_grade_value=Decimal(25000 + 2500 * (grade - 12)),
+                salarygrade_description=SYNTHETIC_MARKER,
+            )
+            bands.append(FacultyRank.objects.create(
+                rank=rank, subrank=subrank, salarygrade=salarygrade,
+                facultyrank_description='%s %s' % (rank_name, tier),
+                minpoints=minpoints, maxpoints=minpoints + points_per_band - 1,
+            ))
+            minpoints += points_per_band
+            grade += 1
+    return bands
+
+
+def seed_rubric(documents, rng):
+    """
+    Creates the three major components with their categories and spreads the
+    given number of documents across them.
+    """
+    leaves = []
+    for major_name, categories in MAJORS.items():
+        major = DocMajorComponent.objects.create(
+            docmajorcomponent_name=major_name, docmajorcomponent_description=SYNTHETIC_MARKER,
+        )
+        for category_name in categories:
+            category = DocCategory.objects.create(
+                doccategory_name=category_name, doccategory_description=SYNTHETIC_MARKER,
+            )
+            leaves.append((major, category))
+
+    created = []
+    for i in range(documents):
+        major, category = leaves[i % len(leaves)]
+        points = rng.choice([1, 2, 3, 5, 8, 10])
+        created.append(Document(
+            docmajor=major, doccategory=category,
+            document_name='%s Document %d' % (category.doccategory_name, i + 1),
+            document_description='Synthetic evidence of %s.' % category.doccategory_name.lower(),
+            points=points, max_points=points * rng.choice([1, 2, 3, 5]),
+            has_multiplier=rng.random() < 0.3, multiplier_unit='per year',
+            details_schema=DETAILS_SCHEMA,
+        ))
+    return Document.objects.bulk_create(created)
+
+
+def seed_faculty(faculty, organization, rng, batch_size):
+    password = make_password(None)
+    User = get_user_model()
+    now = timezone.now()
+
+    def accounts():
+        for i in range(faculty):
+            college, departments = organization[i % len(organization)]
+            yield User(
+                email='faculty%06d@%s' % (i + 1, SYNTHETIC_DOMAIN),
+                password=password,
+                first_name='Faculty',
+                last_name='%06d' % (i + 1),
+                faculty_id='SYN-%06d' % (i + 1),
+                college=college,
+                department=rng.choice(departments),
+                date_added=now,
+            )
+
+    for batch in _batched(accounts(), batch_size):
+        with transaction.atomic():
+            User.objects.bulk_create(batch)
+    return list(User.objects.filter(email__endswith='@' + SYNTHETIC_DOMAIN).values_list('pk', flat=True))
+
+
+def seed_history(account_ids, bands, rng, batch_size):
+    """
+    Gives every faculty member a successful promotion into a random band and
+    points their currentrank at it.
+    """
+    User = get_user_model()
+    now = timezone.now()
+    for batch in _batched(account_ids, batch_size):
+        with transaction.atomic():
+            histories = FacultyRankHistory.objects.bulk_create([
+                FacultyRankHistory(
+                    user_id=account_id,
+                    targetrank=rng.choice(bands),
+                    date_of_request=now - timedelta(days=rng.randint(200, 2000)),
+                    date_of_promotion=now - timedelta(days=rng.randint(0, 199)),
+                    is_successful=True,
+                )
+                for account_id in batch
+            ])
+            if histories and histories[0].pk is None:
+                # Backends that cannot return ids from bulk inserts.
+                histories = list(FacultyRankHistory.objects.filter(user_id__in=batch))
+            User.objects.bulk_update(
+                [User(pk=history.user_id, currentrank_id=history.pk) for history in histories], ['currentrank'],
+            )
+
+
+def seed_evaluations(evaluations, account_ids, documents, rng, batch_size):
+    def rows():
+        for i in range(evaluations):
+            document = rng.choice(documents)
+            evaluation = Evaluation(
+                account_id=rng.choice(account_ids),
+                document_id=document.pk,
+                score=Decimal(str(document.points)),
+                comment='',
+                details={
+                    'institution': rng.choice(INSTITUTIONS),
+                    'year': rng.randint(1995, 2024),
+                    'role': rng.choice(ROLES),
+                },
+                is_active=rng.random() > 0.05,
+            )
+            evaluation.sync_details()
+            yield evaluation
+
+    written = 0
+    for batch in _batched(rows(), batch_size):
+        with transaction.atomic():
+            Evaluation.objects.bulk_create(batch)
+        written += len(batch)
+    return written
+
+
+def seed(colleges=10, departments_per_college=5, faculty=1000, documents=120, evaluations=100000,
+         batch_size=5000, seed=None, log=None):
+    """
+    Seeds a synthetic dataset and returns the number of rows created per model.
+    Evaluations are bulk inserted, so the rollups have to be rebuilt afterwards.
+    """
+    rng = random.Random(seed)
+    log = log or (lambda message: None)
+
+    organization = seed_organization(colleges, departments_per_college)
+    log('Created %d colleges.' % len(organization))
+    bands = seed_ranks()
+    log('Created %d faculty rank bands.' % len(bands))
+    rubric = seed_rubric(documents, rng)
+    log('Created %d documents.' % len(rubric))
+    account_ids = seed_faculty(faculty, organization, rng, batch_size)
+    log('Created %d faculty.' % len(account_ids))
+    seed_history(account_ids, bands, rng, batch_size)
+    log('Created rank history.')
+    written = seed_evaluations(evaluations, account_ids, rubric, rng, batch_size)
+    log('Created %d evaluations.' % written)
+    return {
+        'colleges': len(organization),
+        'faculty_ranks': len(bands),
+        'documents': len(rubric),
+        'faculty': len(account_ids),
+        'evaluations': written,
+    }
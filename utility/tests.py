@@ -1,3 +1,199 @@
-from django.test import TestCase
+import json
+import time
+from datetime import timedelta
+from unittest import skipUnless
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.sessions.models import Session
+from django.test import Client, TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+
+from account.models import Account
+from document.models import DocMajorComponent, Document
+from evaluation.models import Evaluation
+
+from . import jobs, routers, versioning
+from .models import Job
+from .worker import Worker
+
+
+REPLICA = settings.DATABASE_TEST_REPLICA
+
+
+def _copy(*objects):
+    """
+    Copies rows to the replica the way replication would: without signals.
+    """
+    for obj in objects:
+        type(obj)._base_manager.using(REPLICA).bulk_create([obj])
+
+
+@skipUnless(REPLICA in settings.DATABASES, 'the test replica is only configured for manage.py test')
+@override_settings(
+    DATABASE_REPLICAS=[REPLICA], DATABASE_REPLICA_APPS={'api': [REPLICA]}, DATABASE_REPLICA_PIN_SECONDS=10,
+)
+class ReplicaRoutingTests(TransactionTestCase):
+    # Each alias is its own database here, so a row only written to one of
+    # them shows which one a request read.
+    databases = {'default', REPLICA}
+
+    def setUp(self):
+        self.account = Account.objects.create_user(email='faculty@plm.edu.ph', password='pw', is_staff=True)
+        major = DocMajorComponent.objects.create(docmajorcomponent_name='Academic')
+        self.document = Document.objects.create(docmajor=major, document_name='Diploma', points=10, max_points=25)
+        self.client = Client()
+        self.client.force_login(self.account)
+        _copy(self.account, major, self.document, Session.objects.get())
+
+    def _replica_evaluation(self):
+        evaluation = Evaluation(account=self.account, document=self.document, score=5, comment='', details={})
+        Evaluation.objects.using(REPLICA).bulk_create([evaluation])
+        return evaluation
+
+    def _listed(self):
+        response = self.client.get('/api/evaluations/')
+        self.assertEqual(response.status_code, 200)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_reads_go_to_replica(self):
+        evaluation = self._replica_evaluation()
+        self.assertEqual(self._listed(), [evaluation.pk])
+        self.assertNotIn(settings.DATABASE_REPLICA_PIN_COOKIE, self.client.cookies)
+
+    def test_apps_without_replicas_read_primary(self):
+        self._replica_evaluation()
+        with override_settings(DATABASE_REPLICA_APPS={'report': [REPLICA]}):
+            self.assertEqual(self._listed(), [])
+
+    def test_write_pins_client_to_primary(self):
+        response = self.client.post('/api/evaluations/bulk/', json.dumps([
+            {'account_id': self.account.pk, 'document_id': self.document.pk, 'score': '3'},
+        ]), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        created = response.json()['results'][0]['id']
+        self.assertTrue(Evaluation.objects.filter(pk=created).exists())
+        self.assertFalse(Evaluation.objects.using(REPLICA).filter(pk=created).exists())
+
+        cookie = response.cookies[settings.DATABASE_REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], 10)
+        self.assertEqual(self._listed(), [created])
+
+        del self.client.cookies[settings.DATABASE_REPLICA_PIN_COOKIE]
+        self.assertEqual(self._listed(), [])
+
+    def test_replica_reads_return_to_primary_after_write(self):
+        self._replica_evaluation()
+        with routers.replica_reads(REPLICA):
+            self.assertEqual(Evaluation.objects.count(), 1)
+            Document.objects.create(docmajor=self.document.docmajor, document_name='Award', points=5, max_points=10)
+            self.assertEqual(Evaluation.objects.count(), 0)
+            self.assertEqual(Document.objects.count(), 2)
+        self.assertEqual(Evaluation.objects.count(), 0)
+
+
+@jobs.task('utility.tests.echo')
+def echo(job, value=None):
+    return {'value': value}
+
+
+@jobs.task('utility.tests.fail')
+def fail(job):
+    raise RuntimeError('failed on purpose')
+
+
+@jobs.task('utility.tests.outlive_lease', max_attempts=1)
+def outlive_lease(job, seconds):
+    # Runs past its lease without reporting progress, then sweeps for stale
+    # jobs the way another worker would.
+    time.sleep(seconds)
+    return {'recovered': jobs.requeue_stale()}
+
+
+class JobQueueTests(TestCase):
+
+    def test_claims_best_priority_first_and_once(self):
+        low = jobs.enqueue('utility.tests.echo', priority=0)
+        high = jobs.enqueue('utility.tests.echo', priority=5)
+        jobs.enqueue('utility.tests.echo', run_after=timezone.now() + timedelta(hours=1))
+
+        self.assertEqual([job.pk for job in jobs.claim('first')], [high.pk])
+        self.assertEqual([job.pk for job in jobs.claim('second', limit=5)], [low.pk])
+        self.assertEqual(jobs.claim('third'), [])
+
+    def test_dedupe_key_holds_one_active_job(self):
+        first = jobs.enqueue('utility.tests.echo', dedupe_key='echo')
+        self.assertEqual(jobs.enqueue('utility.tests.echo', dedupe_key='echo').pk, first.pk)
+
+        job, = jobs.claim('worker')
+        self.assertEqual(jobs.enqueue('utility.tests.echo', dedupe_key='echo').pk, first.pk)
+        self.assertTrue(jobs.run(job))
+        self.assertNotEqual(jobs.enqueue('utility.tests.echo', dedupe_key='echo').pk, first.pk)
+
+    @override_settings(JOB_RETRY_DELAY_SECONDS=10)
+    def test_failed_attempts_retry_with_backoff(self):
+        queued = jobs.enqueue('utility.tests.fail', max_attempts=3)
+        for attempt, delay in ((1, 10), (2, 20)):
+            job, = jobs.claim('worker')
+            started = timezone.now()
+            self.assertFalse(jobs.run(job))
+            job.refresh_from_db()
+            self.assertEqual((job.status, job.attempts, job.locked_by), (Job.QUEUED, attempt, ''))
+            self.assertAlmostEqual((job.run_after - started).total_seconds(), delay, delta=1)
+            self.assertEqual(jobs.claim('worker'), [])
+            Job.objects.filter(pk=queued.pk).update(run_after=timezone.now())
+
+        job, = jobs.claim('worker')
+        self.assertFalse(jobs.run(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIn('failed on purpose', job.error)
+
+    def test_lapsed_claims_are_recovered(self):
+        retried = jobs.enqueue('utility.tests.echo', max_attempts=2)
+        last = jobs.enqueue('utility.tests.echo', max_attempts=1)
+        renewed = jobs.enqueue('utility.tests.echo')
+        claimed = jobs.claim('worker', limit=3)
+        Job.objects.update(locked_until=timezone.now() - timedelta(seconds=1))
+        self.assertEqual(jobs.renew([renewed.pk]), 1)
+
+        self.assertEqual(jobs.requeue_stale(), 2)
+        statuses = dict(Job.objects.values_list('pk', 'status'))
+        self.assertEqual(statuses, {retried.pk: Job.QUEUED, last.pk: Job.FAILED, renewed.pk: Job.RUNNING})
+
+        # The worker that lost its claim cannot record an outcome any more.
+        job = next(job for job in claimed if job.pk == retried.pk)
+        self.assertTrue(jobs.run(job))
+        self.assertEqual(Job.objects.get(pk=retried.pk).status, Job.QUEUED)
+
+
+@override_settings(JOB_LEASE_SECONDS=1)
+class WorkerTests(TransactionTestCase):
+
+    def test_worker_renews_claims_of_jobs_in_flight(self):
+        queued = jobs.enqueue('utility.tests.outlive_lease', arguments={'seconds': 2})
+        self.assertEqual(Worker(concurrency=1, poll_interval=0.05).run(burst=True), 1)
+        job = Job.objects.get(pk=queued.pk)
+        self.assertEqual((job.status, job.result), (Job.SUCCEEDED, {'recovered': 0}))
+
+
+class VersioningTests(TestCase):
+
+    def setUp(self):
+        token = versioning.begin()
+        self.addCleanup(versioning.end, token)
+
+    def test_versions_are_looked_up_once_per_scope(self):
+        loads = []
+        compiled = versioning.Versioned('tests', lambda version: loads.append(version) or version)
+        version = compiled.get()
+        with self.assertNumQueries(0):
+            self.assertEqual(compiled.get(), version)
+            self.assertEqual(versioning.get_version('tests'), version)
+        self.assertEqual(loads, [version])
+
+    def test_bump_is_seen_within_the_scope(self):
+        compiled = versioning.Versioned('tests', lambda version: version)
+        version = compiled.get()
+        compiled.invalidate()
+        with self.assertNumQueries(0):
+            self.assertNotEqual(compiled.get(), version)
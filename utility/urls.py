@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = "utility"
+
+
+urlpatterns = [
+    path('queries/', views.query_report, name="query_report"),
+]
@@ -0,0 +1,103 @@
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# Backends that keep a separate cache in every process (or none at all), so a
+# version bumped in one worker is never seen by the others.
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def _cache():
+    return caches[getattr(settings, 'VERSION_CACHE_ALIAS', 'default')]
+
+
+def _key(name):
+    return 'version:%s' % name
+
+
+# The versions already looked up by the current request (see
+# VersionScopeMiddleware), or None outside of one.
+_seen = ContextVar('versions', default=None)
+
+
+def begin():
+    """
+    Starts a scope in which every version is looked up at most once, and
+    returns the token to end() it with.
+    """
+    return _seen.set({})
+
+
+def end(token):
+    _seen.reset(token)
+
+
+def get_version(name):
+    """
+    Returns the current version of a named data set. A missing version (never
+    set, or evicted from the cache) is seeded from the clock so it can never
+    match a version a worker loaded earlier. Inside a scope the version is
+    only fetched from the cache the first time.
+    """
+    seen = _seen.get()
+    if seen is not None and name in seen:
+        return seen[name]
+    cache = _cache()
+    version = cache.get(_key(name))
+    if version is None:
+        cache.add(_key(name), time.time_ns(), timeout=None)
+        version = cache.get(_key(name))
+    if seen is not None:
+        seen[name] = version
+    return version
+
+
+def bump_version(name):
+    """
+    Moves a named data set to a new version, invalidating every worker's copy.
+    """
+    cache = _cache()
+    try:
+        version = cache.incr(_key(name))
+    except ValueError:
+        cache.set(_key(name), time.time_ns(), timeout=None)
+        version = cache.get(_key(name))
+    seen = _seen.get()
+    if seen is not None:
+        seen[name] = version
+    return version
+
+
+class Versioned:
+    """
+    A process-local value that is rebuilt by its loader whenever the named
+    version changes. While the version is unchanged a read costs one lookup
+    of the version number in the version cache, made once per request, which
+    is a query when that cache is the database cache.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self._value = None
+        self._version = None
+        self._lock = threading.Lock()
+
+    def get(self):
+        version = get_version(self.name)
+        if self._value is None or self._version != version:
+            with self._lock:
+                if self._value is None or self._version != version:
+                    self._value = self.loader(version)
+                    self._version = version
+        return self._value
+
+    def invalidate(self):
+        bump_version(self.name)
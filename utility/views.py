@@ -1,3 +1,16 @@
-from django.shortcuts import render
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
 
-# Create your views here.
+from .middleware import recent_reports
+
+
+@staff_member_required
+def query_report(request):
+    """
+    Returns the query reports of the most recently inspected requests. With
+    ?repeated=1 only the requests with likely N+1 patterns are listed.
+    """
+    reports = recent_reports()
+    if request.GET.get('repeated'):
+        reports = [report for report in reports if report['repeated']]
+    return JsonResponse({'reports': reports})
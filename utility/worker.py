@@ -0,0 +1,149 @@
+import logging
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+# Process pool workers import this module before Django is set up, so the
+# models and utility.jobs are only imported inside functions.
+
+logger = logging.getLogger(__name__)
+
+
+def setup_process():
+    """
+    Initializes a spawned pool process: sets Django up and loads the tasks.
+    """
+    import django
+    from django.apps import apps
+    if not apps.ready:
+        django.setup()
+    from utility import jobs
+    jobs.autodiscover()
+
+
+def _run_job(job_id):
+    """
+    Runs a claimed job by id and returns whether it succeeded. Used by both
+    pools; each call leaves the database connections of its thread usable.
+    """
+    from django.db import close_old_connections
+    from utility import jobs
+    from utility.models import Job
+
+    close_old_connections()
+    try:
+        job = Job.objects.filter(job_id=job_id, status=Job.RUNNING).first()
+        return job is not None and jobs.run(job)
+    finally:
+        close_old_connections()
+
+
+class Worker:
+    """
+    Claims jobs from the database and runs them in a pool of threads or
+    processes, keeping at most concurrency jobs in flight.
+    """
+
+    def __init__(self, concurrency=4, mode='thread', poll_interval=1.0, name=None):
+        self.concurrency = concurrency
+        self.mode = mode
+        self.poll_interval = poll_interval
+        self.name = name or '%s:%s' % (socket.gethostname(), os.getpid())
+        self.stopping = threading.Event()
+
+    def stop(self, *args):
+        self.stopping.set()
+
+    def _pool(self):
+        if self.mode == 'process':
+            # Spawned rather than forked, so children never inherit the
+            # parent's open database connections.
+            return ProcessPoolExecutor(
+                max_workers=self.concurrency, mp_context=multiprocessing.get_context('spawn'),
+                initializer=setup_process,
+            )
+        return ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='job')
+
+    def _renew(self, running, last_renewal):
+        """
+        Renews the claims of the jobs in flight every third of the lease, as
+        most tasks never report progress. Returns when it last renewed.
+        """
+        from django.db import DatabaseError
+        from utility import jobs
+
+        if not running or time.monotonic() - last_renewal < jobs.lease_seconds() / 3:
+            return last_renewal
+        try:
+            jobs.renew(list(running.values()))
+        except DatabaseError:
+            logger.warning('Could not renew job claims', exc_info=True)
+            return last_renewal
+        return time.monotonic()
+
+    def _collect(self, running):
+        """
+        Waits up to poll_interval for jobs in flight to finish, drops them
+        from running and returns how many did.
+        """
+        finished, _ = wait(running, timeout=self.poll_interval, return_when=FIRST_COMPLETED)
+        for future in finished:
+            del running[future]
+            if future.exception() is not None:
+                logger.error('Job runner crashed', exc_info=future.exception())
+        return len(finished)
+
+    def run(self, burst=False, max_jobs=None):
+        """
+        Runs jobs until stopped (SIGINT/SIGTERM), or, with burst, until the
+        queue is empty. Returns the number of jobs run.
+        """
+        from django.db import DatabaseError
+        from utility import jobs
+
+        jobs.autodiscover()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGINT, self.stop)
+            signal.signal(signal.SIGTERM, self.stop)
+
+        done = 0
+        # Future -> id of the job it runs.
+        running = {}
+        last_recovery = 0.0
+        last_renewal = time.monotonic()
+        with self._pool() as pool:
+            while not self.stopping.is_set():
+                if time.monotonic() - last_recovery > 60:
+                    jobs.requeue_stale()
+                    last_recovery = time.monotonic()
+                last_renewal = self._renew(running, last_renewal)
+
+                claimed = []
+                free = self.concurrency - len(running)
+                if max_jobs is not None:
+                    free = min(free, max_jobs - done - len(running))
+                if free > 0:
+                    try:
+                        claimed = jobs.claim(self.name, limit=free)
+                    except DatabaseError:
+                        # e.g. SQLite reporting the database as locked by another worker.
+                        logger.warning('Could not claim jobs', exc_info=True)
+                for job in claimed:
+                    running[pool.submit(_run_job, job.job_id)] = job.job_id
+
+                if not running:
+                    if burst or (max_jobs is not None and done >= max_jobs):
+                        break
+                    self.stopping.wait(self.poll_interval)
+                    continue
+                done += self._collect(running)
+
+            # Stopping: let the jobs in flight finish, still holding their claims.
+            while running:
+                last_renewal = self._renew(running, last_renewal)
+                done += self._collect(running)
+        return done